@@ -0,0 +1,248 @@
+"""
+Compressão de respostas (gzip e brotli) com cache dos corpos comprimidos.
+
+Respostas com ETag são comprimidas uma vez por versão: os bytes ficam num
+cache LRU limitado em bytes, indexado por (caminho e query, ETag,
+codificação), já que um ETag só identifica a versão dentro do próprio
+recurso. Uma listagem quente é comprimida uma vez por mudança, não uma vez
+por requisição.
+
+ETags fracos seguem iguais em todas as codificações; um ETag forte ganha o
+sufixo da codificação (`"7-3"` vira `"7-3-gzip"`), pois os bytes servidos
+são outros.
+"""
+import asyncio
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.singleflight import SingleFlight
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependência opcional
+    brotli = None
+
+ENCODINGS = ("br", "gzip")
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+
+# Acima disso a compressão roda numa thread para não travar o loop
+THREAD_THRESHOLD = 64 * 1024
+
+
+def body_etag(body: bytes) -> str:
+    """
+    ETag fraco derivado do conteúdo. Fraco porque o mesmo recurso é servido
+    em várias codificações (identidade, gzip, brotli) com o mesmo validador.
+    """
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparação fraca de If-None-Match (RFC 9110, 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag da resposta comprimida: fraco como está, forte com o sufixo da codificação"""
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def brotli_available() -> bool:
+    return brotli is not None
+
+
+def choose_encoding(accept_encoding: str, available: tuple[str, ...]) -> Optional[str]:
+    """
+    Codificação preferida pelo cliente entre as disponíveis (maior q;
+    empate resolvido pela ordem de `available`). None = identidade.
+    """
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressedBodyCache:
+    """LRU de corpos comprimidos limitado pelo total de bytes armazenados"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[tuple[str, ...], bytes] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple[str, ...]) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: tuple[str, ...], body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime respostas completas com gzip ou brotli,
+    conforme o Accept-Encoding do cliente.
+
+    Só comprime respostas 200 de tipos textuais com pelo menos
+    `minimum_size` bytes e sem Content-Encoding próprio. Respostas em
+    streaming (ex: exportação) passam sem alteração. Respostas de GET com
+    ETag usam o cache de corpos comprimidos.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = CompressedBodyCache(cache_max_bytes)
+        self.encodings = ENCODINGS if brotli_available() else ("gzip",)
+        self._flight = SingleFlight()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(self, scope, encoding, send).run(receive)
+
+    def _compress_now(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def _compress(self, body: bytes, encoding: str) -> bytes:
+        if len(body) >= THREAD_THRESHOLD:
+            return await asyncio.to_thread(self._compress_now, body, encoding)
+        return self._compress_now(body, encoding)
+
+    async def compress(
+        self, body: bytes, encoding: str, etag: Optional[str], resource: str = ""
+    ) -> bytes:
+        """Corpo comprimido; com ETag, reaproveitado por (resource, etag, codificação)"""
+        if etag is None:
+            return await self._compress(body, encoding)
+        key = (resource, etag, encoding)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Requisições simultâneas da mesma versão comprimem uma vez só
+        async def run() -> bytes:
+            compressed = await self._compress(body, encoding)
+            self.cache.put(key, compressed)
+            return compressed
+
+        return await self._flight.do(key, run)
+
+
+def _resource(scope: Scope) -> str:
+    query = scope.get("query_string", b"")
+    return scope["path"] + ("?" + query.decode("latin-1") if query else "")
+
+
+class _CompressingResponder:
+    """Retém o início da resposta até saber se o corpo será comprimido"""
+
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, encoding: str, send: Send):
+        self.middleware = middleware
+        self.scope = scope
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.passthrough = False
+
+    async def run(self, receive: Receive) -> None:
+        await self.middleware.app(self.scope, receive, self.intercept)
+
+    async def intercept(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.start = message
+            self.passthrough = (
+                message["status"] != 200
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        body = message.get("body", b"")
+        if message.get("more_body", False) or len(body) < self.middleware.minimum_size:
+            # Streaming ou corpo pequeno: segue sem compressão
+            self.passthrough = True
+            await self.send(self.start)
+            await self.send(message)
+            return
+
+        etag = headers.get("etag") if self.scope["method"] == "GET" else None
+        compressed = await self.middleware.compress(body, self.encoding, etag, _resource(self.scope))
+        if "etag" in headers:
+            headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        await self.send(self.start)
+        await self.send({"type": "http.response.body", "body": compressed})
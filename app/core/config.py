@@ -15,11 +15,131 @@ class Settings(BaseSettings):
     # URL do serviço de vendas para comunicação HTTP
     SALES_SERVICE_URL: str = "http://localhost:8001"
     
+    # Log de SQL: echo completo (depuração) ou só consultas lentas amostradas
+    SQL_ECHO: bool = False
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    SLOW_QUERY_SAMPLE_RATE: float = 1.0
+    SLOW_QUERY_MAX_FINGERPRINTS: int = 500
+    SQL_COMPILED_CACHE_SIZE: int = 500  # instruções compiladas mantidas por engine
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 256  # prepared statements por conexão (asyncpg)
+
+    # Perfil de produção do SQLite em arquivo (WAL, synchronous, mmap, cache, busy_timeout)
+    SQLITE_PROFILE_ENABLED: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    
+    # Escritor único do SQLite: escritas de veículos numa fila, uma conexão dedicada (opt-in)
+    SQLITE_WRITE_QUEUE_ENABLED: bool = False
+    SQLITE_WRITE_QUEUE_MAX_SIZE: int = 1000
+
+    # Group commit de escritas de veículos (opt-in)
+    VEHICLE_WRITE_BATCH_ENABLED: bool = False
+    VEHICLE_WRITE_BATCH_WINDOW_MS: float = 2.0
+    VEHICLE_WRITE_BATCH_MAX_SIZE: int = 100
+    
+    # Arquivamento de veículos vendidos (tabela quente x arquivo)
+    VEHICLE_ARCHIVE_ENABLED: bool = True
+    VEHICLE_ARCHIVE_INTERVAL_SECONDS: float = 300.0
+    VEHICLE_ARCHIVE_BATCH_SIZE: int = 500
+    
+    # Shards adicionais do banco de veículos (shard 0 = DATABASE_URL), por faixa de id
+    VEHICLE_SHARD_URLS: list[str] = []
+    VEHICLE_SHARD_ID_SPAN: int = 100_000_000  # ids por shard (cabe em INTEGER de 32 bits)
+    
+    # Catálogo de marcas e modelos (GET /vehicles/catalog)
+    VEHICLE_CATALOG_MAX_AGE_SECONDS: int = 300  # cache do corpo e Cache-Control max-age
+    
+    # Busca de veículos em lote (POST /vehicles/batch-get)
+    VEHICLE_BATCH_GET_MAX_IDS: int = 500
+    
+    # Reserva de veículo antes da venda (POST /vehicles/{id}/reserve)
+    VEHICLE_RESERVATION_TTL_SECONDS: int = 300
+    VEHICLE_RESERVATION_MAX_SECONDS: int = 1800
+    
+    # Índice em memória de disponíveis por preço (opt-in)
+    VEHICLE_PRICE_INDEX_ENABLED: bool = False
+    VEHICLE_PRICE_INDEX_MAX_AGE_SECONDS: float = 60.0
+
+    # Stream de mudanças do estoque (GET /vehicles/events, Server-Sent Events)
+    VEHICLE_EVENTS_ENABLED: bool = True
+    VEHICLE_EVENTS_REPLAY_SIZE: int = 1000  # eventos guardados para retomar pelo Last-Event-ID
+    VEHICLE_EVENTS_SUBSCRIBER_BUFFER: int = 100  # eventos pendentes antes de desligar a conexão
+    VEHICLE_EVENTS_MAX_SUBSCRIBERS: int = 10000
+    VEHICLE_EVENTS_KEEPALIVE_SECONDS: float = 15.0
+
+    # Invalidação de caches entre réplicas
+    INVALIDATION_BUS_ENABLED: bool = False
+    INVALIDATION_BUS_BACKEND: str = "postgres"  # "local" ou "modulo:Classe"
+    INVALIDATION_BUS_CHANNEL: str = "vehicle_invalidation"
+    INVALIDATION_BUS_WINDOW_MS: float = 50.0
+    INVALIDATION_BUS_HEALTH_INTERVAL_SECONDS: float = 5.0  # verificação da escuta LISTEN
+
+    # Exportação do estoque em streaming
+    VEHICLE_EXPORT_BATCH_SIZE: int = 5000
+    VEHICLE_EXPORT_GZIP_LEVEL: int = 6
+
+    # Compressão de respostas (gzip/brotli)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+
+    # Rastreamento distribuído (W3C traceparent), exportado em lotes (opt-in)
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATE: float = 0.01  # traces novos; traces recebidos seguem a decisão do chamador
+    TRACING_EXPORTER: str = "stdout"  # "file" ou "modulo:Classe"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_BATCH_SIZE: int = 512
+    TRACING_EXPORT_INTERVAL_SECONDS: float = 5.0
+    TRACING_MAX_QUEUE_SIZE: int = 2048  # spans aguardando exportação; excedentes são descartados
+
+    # Tempo de posse de conexões por rota (/admin/connection-hold e header Server-Timing)
+    CONNECTION_HOLD_METRICS_ENABLED: bool = True
+
+    # Readiness (/ready): pinger único em segundo plano
+    READINESS_INTERVAL_SECONDS: float = 5.0
+    READINESS_TIMEOUT_SECONDS: float = 2.0
+    READINESS_MAX_POOL_USAGE: float = 1.0  # fração do pool em uso que tira a réplica do ar
+
+    # Servidor de produção (app/server.py)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: Optional[int] = None  # padrão: cota de CPU do cgroup
+    SERVER_PRELOAD_APP: bool = True
+    SERVER_MAX_REQUESTS: int = 10000
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    
     # JWT
     SECRET_KEY: str = "development-secret-key"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     ALGORITHM: str = "HS256"
     
+    # Custo BCrypt: fixo (BCRYPT_ROUNDS) ou calibrado para BCRYPT_TARGET_MS por hash
+    BCRYPT_ROUNDS: Optional[int] = None
+    BCRYPT_TARGET_MS: float = 100.0
+    BCRYPT_MIN_ROUNDS: int = 10
+    BCRYPT_MAX_ROUNDS: int = 14
+    BCRYPT_ROUNDS_TOLERANCE: int = 1
+
+    # Cadastro em lote de usuários (/auth/register/bulk)
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # padrão: um processo por núcleo
+    USER_BULK_MAX_SIZE: int = 5000
+    
+    # Limite de tentativas de login com falha (antes do BCrypt)
+    LOGIN_THROTTLE_ENABLED: bool = True
+    LOGIN_THROTTLE_BACKEND: str = "memory"  # ou "modulo:Classe" compartilhado
+    LOGIN_THROTTLE_MAX_KEYS: int = 100_000
+    LOGIN_THROTTLE_EMAIL_LIMIT: int = 5
+    LOGIN_THROTTLE_EMAIL_WINDOW_SECONDS: float = 300.0
+    LOGIN_THROTTLE_CLIENT_LIMIT: int = 20
+    LOGIN_THROTTLE_CLIENT_WINDOW_SECONDS: float = 60.0
+    # Proxies/ingress (IPs ou redes) cujo X-Forwarded-For identifica o cliente
+    LOGIN_THROTTLE_TRUSTED_PROXIES: list[str] = []
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
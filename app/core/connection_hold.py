@@ -0,0 +1,155 @@
+"""
+Tempo de posse de conexões do pool, por banco e por rota.
+
+Cada conexão é cronometrada do checkout ao checkin (eventos do pool), e o
+tempo é somado à requisição que a retirou. Com isso dá para ver quanto
+tempo cada rota segura conexões, e não só quanto tempo leva: a ocupação do
+pool é a soma desses tempos, não a duração das requisições.
+
+O middleware abre a contabilidade de cada requisição, acrescenta o header
+`Server-Timing: db-hold;dur=<ms>` e acumula o resumo por rota.
+"""
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class _Hold:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+class _RouteHold:
+    __slots__ = ("requests", "holding", "checkouts", "total", "max")
+
+    def __init__(self):
+        self.requests = 0
+        self.holding = 0
+        self.checkouts = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+# Posse acumulada pela requisição em andamento (None fora de requisições)
+_request_hold: ContextVar[Optional[_Hold]] = ContextVar("connection_hold", default=None)
+
+
+class ConnectionHoldMetrics:
+    """Posse de conexões acumulada por banco (eventos do pool) e por rota (middleware)"""
+
+    def __init__(self):
+        self._databases: dict[str, _Hold] = {}
+        self._routes: dict[str, _RouteHold] = {}
+
+    def attach(self, engine: AsyncEngine, database: str) -> None:
+        """Cronometra as conexões do pool do engine"""
+        self._databases.setdefault(database, _Hold())
+
+        @event.listens_for(engine.sync_engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            connection_record.info["hold_started"] = time.perf_counter()
+            connection_record.info["hold_request"] = _request_hold.get()
+
+        @event.listens_for(engine.sync_engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            started = connection_record.info.pop("hold_started", None)
+            request = connection_record.info.pop("hold_request", None)
+            if started is None:
+                return
+            held = time.perf_counter() - started
+            self._databases[database].add(held)
+            if request is not None:
+                request.add(held)
+
+    def record_request(self, route: str, hold: _Hold) -> None:
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = _RouteHold()
+        stats.requests += 1
+        if hold.count:
+            stats.holding += 1
+            stats.checkouts += hold.count
+            stats.total += hold.total
+            if hold.total > stats.max:
+                stats.max = hold.total
+
+    def summary(self) -> dict:
+        """Posse por banco e por rota (maior tempo total primeiro)"""
+        routes = sorted(self._routes.items(), key=lambda item: item[1].total, reverse=True)
+        return {
+            "databases": {
+                database: {
+                    "checkouts": stats.count,
+                    "total_ms": round(stats.total * 1000, 3),
+                    "mean_ms": round(stats.total / stats.count * 1000, 3) if stats.count else None,
+                    "max_ms": round(stats.max * 1000, 3),
+                }
+                for database, stats in self._databases.items()
+            },
+            "routes": [
+                {
+                    "route": route,
+                    "requests": stats.requests,
+                    "requests_holding": stats.holding,
+                    "checkouts": stats.checkouts,
+                    "total_ms": round(stats.total * 1000, 3),
+                    "mean_ms": round(stats.total / stats.requests * 1000, 3),
+                    "max_ms": round(stats.max * 1000, 3),
+                }
+                for route, stats in routes
+            ],
+        }
+
+    def reset(self) -> None:
+        for database in self._databases:
+            self._databases[database] = _Hold()
+        self._routes.clear()
+
+
+class ConnectionHoldMiddleware:
+    """Contabiliza a posse de conexões de cada requisição HTTP"""
+
+    def __init__(self, app: ASGIApp, metrics: "ConnectionHoldMetrics"):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        hold = _Hold()
+        token = _request_hold.set(hold)
+
+        async def send_with_timing(message: Message) -> None:
+            # Com a liberação antecipada, a posse já terminou quando a resposta começa
+            if message["type"] == "http.response.start" and hold.count:
+                headers = MutableHeaders(raw=message.setdefault("headers", []))
+                headers.append("Server-Timing", f"db-hold;dur={hold.total * 1000:.3f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_hold.reset(token)
+            route = scope.get("route")
+            name = getattr(route, "path", None) or "<sem rota>"
+            self.metrics.record_request(f"{scope['method']} {name}", hold)
+
+
+connection_hold = ConnectionHoldMetrics()
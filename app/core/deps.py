@@ -1,11 +1,12 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
 from app.core.security import decode_access_token
+from app.core.sessions import release_session
 from app.database import get_auth_db
 from app.models.user import User
+from app.services.user_service import UserService
 
 security = HTTPBearer()
 
@@ -37,8 +38,9 @@ async def get_current_user(
         )
     
     # Busca usuário no banco de autenticação
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
+    user = await UserService(db).get_user_by_id(int(user_id))
+    # A sessão de auth não é parâmetro da rota: devolve a conexão aqui mesmo
+    await release_session(db)
     
     if user is None:
         raise HTTPException(
@@ -54,3 +56,19 @@ async def get_current_user(
         )
     
     return user
+
+
+async def get_current_admin(
+    current_user: User = Depends(get_current_user)
+) -> User:
+    """
+    Dependency dos endpoints administrativos (/admin): além do JWT válido,
+    exige usuário com is_admin.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores"
+        )
+    
+    return current_user
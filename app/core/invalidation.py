@@ -0,0 +1,331 @@
+"""
+Barramento de invalidação entre réplicas.
+
+Depois de cada commit, os serviços publicam (entidade, id, versão). Os
+eventos são acumulados por uma pequena janela (window_ms) e coalescidos
+por (entidade, id): uma rajada de escritas no mesmo veículo vira um único
+evento, e todos os eventos da janela seguem numa única mensagem. As outras
+réplicas recebem a mensagem e repassam os eventos aos assinantes da
+entidade (ex: o índice de preços), que descartam ou recarregam o que
+tiverem em memória.
+
+Se a réplica pode ter perdido mensagens (a conexão de escuta caiu e foi
+refeita), o barramento chama os handlers de reset dos assinantes: tudo o
+que estiver em memória é tratado como desatualizado.
+
+Backends:
+- "postgres": LISTEN/NOTIFY no banco de veículos.
+- "local": entrega em processo entre barramentos do mesmo canal (testes).
+- "modulo:Classe": backend externo com a mesma interface.
+"""
+import asyncio
+import importlib
+import json
+import logging
+import uuid
+from collections import defaultdict
+from typing import Awaitable, Callable, NamedTuple, Optional, Protocol
+
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Eventos por mensagem (NOTIFY aceita payloads de até 8000 bytes)
+MAX_EVENTS_PER_MESSAGE = 100
+
+
+class InvalidationEvent(NamedTuple):
+    entity: str
+    id: int
+    version: Optional[int] = None
+
+
+Handler = Callable[[list[InvalidationEvent]], Awaitable[None]]
+ResetHandler = Callable[[], None]
+
+
+class InvalidationBackend(Protocol):
+    """
+    Transporte das mensagens (texto) entre as réplicas. `on_reset` é chamado
+    quando mensagens podem ter sido perdidas (ex: escuta reconectada).
+    """
+
+    async def start(
+        self, callback: Callable[[str], None], on_reset: Optional[Callable[[], None]] = None
+    ) -> None: ...
+
+    async def publish(self, payload: str) -> None: ...
+
+    async def stop(self) -> None: ...
+
+
+class LocalInvalidationBackend:
+    """
+    Entrega em processo para todos os backends do mesmo canal, inclusive o
+    remetente. Cada instância faz o papel de uma réplica nos testes.
+    """
+
+    _channels: dict[str, set["LocalInvalidationBackend"]] = defaultdict(set)
+
+    def __init__(self, channel: str = "default"):
+        self.channel = channel
+        self._callback: Optional[Callable[[str], None]] = None
+
+    async def start(
+        self, callback: Callable[[str], None], on_reset: Optional[Callable[[], None]] = None
+    ) -> None:
+        # Entrega em processo não perde mensagens: on_reset nunca é chamado
+        self._callback = callback
+        self._channels[self.channel].add(self)
+
+    async def publish(self, payload: str) -> None:
+        loop = asyncio.get_running_loop()
+        for backend in list(self._channels[self.channel]):
+            if backend._callback is not None:
+                loop.call_soon(backend._callback, payload)
+
+    async def stop(self) -> None:
+        self._channels[self.channel].discard(self)
+        self._callback = None
+
+
+class PostgresInvalidationBackend:
+    """
+    LISTEN/NOTIFY numa conexão asyncpg dedicada.
+
+    Uma tarefa verifica a conexão a cada health_interval segundos (e na hora,
+    se o asyncpg avisar que ela terminou). Uma réplica que só lê nunca
+    publica, então sem essa verificação a escuta perdida passaria
+    despercebida e os caches ficariam desatualizados para sempre. Ao
+    reconectar, as mensagens do intervalo estão perdidas: on_reset é chamado.
+    """
+
+    def __init__(self, dsn: str, channel: str, health_interval: float = 5.0):
+        self.dsn = dsn
+        self.channel = channel
+        self.health_interval = health_interval
+        self.reconnects = 0
+        self._callback: Optional[Callable[[str], None]] = None
+        self._on_reset: Optional[Callable[[], None]] = None
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._lost = asyncio.Event()
+        self._watcher: Optional[asyncio.Task] = None
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        conn = await asyncpg.connect(self.dsn)
+        await conn.add_listener(self.channel, self._on_notify)
+        conn.add_termination_listener(lambda _: self._lost.set())
+        self._conn = conn
+        self._lost.clear()
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        if self._callback is not None:
+            self._callback(payload)
+
+    async def start(
+        self, callback: Callable[[str], None], on_reset: Optional[Callable[[], None]] = None
+    ) -> None:
+        self._callback = callback
+        self._on_reset = on_reset
+        await self._connect()
+        self._watcher = asyncio.ensure_future(self._watch())
+
+    async def _healthy(self) -> bool:
+        if self._conn is None or self._conn.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(self._conn.fetchval("SELECT 1"), self.health_interval)
+        except Exception:
+            return False
+        return True
+
+    async def _reconnect(self) -> None:
+        """Refaz a conexão (e a escuta) avisando da possível perda; com o lock"""
+        if self._conn is not None and not self._conn.is_closed():
+            self._conn.terminate()
+        self._conn = None
+        await self._connect()
+        self.reconnects += 1
+        logger.warning("Escuta de invalidações reconectada no canal %s", self.channel)
+        if self._on_reset is not None:
+            self._on_reset()
+
+    async def _watch(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), self.health_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                # A conexão não aceita operações simultâneas: o lock a
+                # divide entre a verificação e o publish
+                async with self._lock:
+                    if not await self._healthy():
+                        await self._reconnect()
+            except Exception:
+                # Banco fora do ar: tenta de novo no próximo intervalo
+                logger.exception("Falha ao reconectar a escuta de invalidações")
+
+    async def publish(self, payload: str) -> None:
+        async with self._lock:
+            if self._conn is None or self._conn.is_closed():
+                await self._reconnect()
+            await self._conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    async def stop(self) -> None:
+        self._callback = None
+        self._on_reset = None
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+
+class InvalidationBus:
+    """
+    Publica invalidações coalescidas e repassa as recebidas aos assinantes.
+    Mensagens publicadas por este barramento são ignoradas na volta: a
+    própria réplica já atualizou os seus caches ao escrever.
+    """
+
+    def __init__(self, backend: InvalidationBackend, window_ms: float = 50.0):
+        self.backend = backend
+        self.window = window_ms / 1000
+        self.origin = uuid.uuid4().hex
+        self.messages_published = 0
+        self.events_published = 0
+        self.resets = 0
+        self._pending: dict[tuple[str, int], Optional[int]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._handlers: dict[str, list[Handler]] = defaultdict(list)
+        self._reset_handlers: list[ResetHandler] = []
+        self._tasks: set[asyncio.Task] = set()
+
+    def subscribe(self, entity: str, handler: Handler, on_reset: Optional[ResetHandler] = None) -> None:
+        """
+        handler recebe os eventos da entidade; on_reset é chamado quando
+        mensagens podem ter se perdido e todo o estado em memória deve ser
+        descartado
+        """
+        self._handlers[entity].append(handler)
+        if on_reset is not None:
+            self._reset_handlers.append(on_reset)
+
+    async def start(self) -> None:
+        await self.backend.start(self._receive, self._reset)
+
+    def _reset(self) -> None:
+        self.resets += 1
+        for handler in self._reset_handlers:
+            try:
+                handler()
+            except Exception:
+                logger.exception("Falha ao descartar caches após perda de invalidações")
+
+    async def stop(self) -> None:
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.backend.stop()
+
+    def publish(self, entity: str, entity_id: int, version: Optional[int] = None) -> None:
+        """Agenda a invalidação; não bloqueia quem acabou de fazer o commit"""
+        key = (entity, entity_id)
+        previous = self._pending.get(key)
+        if previous is None or (version is not None and version > previous):
+            self._pending[key] = version
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush_later)
+
+    def _flush_later(self) -> None:
+        self._timer = None
+        self._track(self.flush())
+
+    async def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        events = [[entity, entity_id, version] for (entity, entity_id), version in self._pending.items()]
+        self._pending = {}
+        for start in range(0, len(events), MAX_EVENTS_PER_MESSAGE):
+            payload = json.dumps({
+                "origin": self.origin,
+                "events": events[start:start + MAX_EVENTS_PER_MESSAGE],
+            }, separators=(",", ":"))
+            try:
+                await self.backend.publish(payload)
+            except Exception:
+                # Melhor esforço: os caches ainda expiram pela validade própria
+                logger.exception("Falha ao publicar %d invalidações", len(events))
+                return
+            self.messages_published += 1
+        self.events_published += len(events)
+
+    def _receive(self, payload: str) -> None:
+        message = json.loads(payload)
+        if message.get("origin") == self.origin:
+            return
+        by_entity: dict[str, list[InvalidationEvent]] = defaultdict(list)
+        for entity, entity_id, version in message["events"]:
+            by_entity[entity].append(InvalidationEvent(entity, entity_id, version))
+        for entity, events in by_entity.items():
+            for handler in self._handlers.get(entity, ()):
+                self._track(self._deliver(handler, events))
+
+    async def _deliver(self, handler: Handler, events: list[InvalidationEvent]) -> None:
+        try:
+            await handler(events)
+        except Exception:
+            logger.exception("Falha ao aplicar invalidações de %s", events[0].entity)
+
+    def _track(self, coro) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+def _load_backend(path: str) -> InvalidationBackend:
+    channel = settings.INVALIDATION_BUS_CHANNEL
+    if path == "local":
+        return LocalInvalidationBackend(channel)
+    if path == "postgres":
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+        return PostgresInvalidationBackend(
+            dsn.render_as_string(hide_password=False), channel,
+            health_interval=settings.INVALIDATION_BUS_HEALTH_INTERVAL_SECONDS,
+        )
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)()
+
+
+_bus: Optional[InvalidationBus] = None
+
+
+def get_invalidation_bus() -> Optional[InvalidationBus]:
+    """Dependency: barramento de invalidação configurado (None se desabilitado)"""
+    global _bus
+    if not settings.INVALIDATION_BUS_ENABLED:
+        return None
+    if _bus is None:
+        _bus = InvalidationBus(
+            _load_backend(settings.INVALIDATION_BUS_BACKEND),
+            window_ms=settings.INVALIDATION_BUS_WINDOW_MS,
+        )
+    return _bus
+
+
+async def close_invalidation_bus() -> None:
+    global _bus
+    if _bus is not None:
+        await _bus.stop()
+        _bus = None
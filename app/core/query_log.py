@@ -0,0 +1,168 @@
+"""
+Log de consultas lentas com fingerprints, no lugar do echo=True.
+
+Cada instrução executada é normalizada num fingerprint (literais e
+parâmetros viram `?`, listas de IN/VALUES são colapsadas) e acumulada num
+resumo por banco + fingerprint: quantidade, tempo total e tempo máximo.
+Só as execuções acima do limite de duração, e dentre elas uma amostra,
+geram uma linha de log estruturada (JSON, sem os valores dos parâmetros).
+
+O resumo também separa as execuções que precisaram compilar a instrução
+das que reaproveitaram o cache de instruções compiladas do SQLAlchemy: em
+regime, as consultas quentes devem aparecer só como acertos no cache.
+"""
+import json
+import logging
+import random
+import re
+import time
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine.default import CACHE_HIT
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.slow_query")
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDERS = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+|\?")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.I)
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACES = re.compile(r"\s+")
+
+# Fingerprints distintos acima disso são agregados numa única entrada
+OTHER_FINGERPRINT = "<outros>"
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """
+    Forma normalizada da instrução: mesma consulta com valores diferentes
+    (ou com N itens num IN / N linhas num VALUES) gera o mesmo fingerprint.
+    """
+    text = _COMMENTS.sub(" ", statement)
+    text = _STRINGS.sub("?", text)
+    text = _PLACEHOLDERS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _LISTS.sub("(...)", text)
+    text = _ROWS.sub("(...)", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+class _Stats:
+    __slots__ = ("count", "total", "max", "compiles", "cache_hits")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.compiles = 0
+        self.cache_hits = 0
+
+
+class SlowQueryLog:
+    """
+    Resumo por fingerprint de todas as execuções + log amostrado das lentas.
+
+    O custo por instrução é uma consulta ao cache de fingerprints e a
+    atualização de três contadores; nada é formatado nem escrito no log
+    abaixo do limite.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 100.0,
+        sample_rate: float = 1.0,
+        max_fingerprints: int = 500,
+    ):
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.max_fingerprints = max_fingerprints
+        self._stats: dict[tuple[str, str], _Stats] = {}
+
+    def attach(self, engine: AsyncEngine, database: str) -> None:
+        """Registra os eventos de execução no engine (síncrono por baixo do async)"""
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["query_start"].pop()
+            cached = None if context is None else context.cache_hit == CACHE_HIT
+            self.record(database, statement, time.perf_counter() - started, cursor.rowcount, cached)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def on_error(context):
+            starts = context.connection.info.get("query_start") if context.connection else None
+            if starts:
+                starts.pop()
+
+    def record(
+        self,
+        database: str,
+        statement: str,
+        duration: float,
+        rowcount: int = -1,
+        cached: Optional[bool] = None,
+    ) -> None:
+        """cached: True = instrução veio do cache de compiladas, False = compilada agora"""
+        key = (database, fingerprint(statement))
+        stats = self._stats.get(key)
+        if stats is None:
+            if len(self._stats) >= self.max_fingerprints:
+                key = (database, OTHER_FINGERPRINT)
+                stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _Stats()
+        stats.count += 1
+        stats.total += duration
+        if duration > stats.max:
+            stats.max = duration
+        if cached:
+            stats.cache_hits += 1
+        elif cached is not None:
+            stats.compiles += 1
+
+        if duration >= self.threshold and random.random() < self.sample_rate:
+            logger.warning(json.dumps({
+                "event": "slow_query",
+                "database": database,
+                "fingerprint": key[1],
+                "duration_ms": round(duration * 1000, 3),
+                "rowcount": rowcount,
+            }, ensure_ascii=False))
+
+    def summary(self, limit: Optional[int] = 20) -> list[dict]:
+        """Fingerprints com maior tempo total primeiro"""
+        ranked = sorted(self._stats.items(), key=lambda item: item[1].total, reverse=True)
+        return [
+            {
+                "database": database,
+                "fingerprint": text,
+                "count": stats.count,
+                "total_ms": round(stats.total * 1000, 3),
+                "mean_ms": round(stats.total / stats.count * 1000, 3),
+                "max_ms": round(stats.max * 1000, 3),
+                "compiles": stats.compiles,
+                "cache_hits": stats.cache_hits,
+            }
+            for (database, text), stats in ranked[:limit]
+        ]
+
+    def reset(self) -> None:
+        self._stats.clear()
+
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    sample_rate=settings.SLOW_QUERY_SAMPLE_RATE,
+    max_fingerprints=settings.SLOW_QUERY_MAX_FINGERPRINTS,
+)
@@ -0,0 +1,132 @@
+"""
+Readiness barata: um único pinger em segundo plano testa os bancos a cada
+READINESS_INTERVAL_SECONDS e guarda o resultado. O /ready só lê esse
+resultado e o uso atual dos pools, então o custo de cada probe é O(1) e
+não depende de quantas vezes (nem de quantas réplicas) o k8s pergunta.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+def pool_usage(engine: AsyncEngine) -> dict:
+    """
+    Conexões em uso x capacidade (pool_size + max_overflow) do pool.
+    Pools sem limite (ex: StaticPool, NullPool) não têm saturação.
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"checked_out": None, "capacity": None, "saturation": None}
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    return {
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else None,
+    }
+
+
+class _Check:
+    __slots__ = ("reachable", "latency_ms", "error", "checked_at")
+
+    def __init__(self):
+        self.reachable = False
+        self.latency_ms: Optional[float] = None
+        self.error: Optional[str] = "ainda não verificado"
+        self.checked_at: Optional[float] = None
+
+
+class ReadinessMonitor:
+    """
+    Mantém o último resultado de um SELECT 1 por engine.
+
+    A réplica fica pronta quando todos os bancos responderam na última
+    verificação (e ela não está velha) e nenhum pool atingiu
+    max_pool_usage da capacidade: com o pool esgotado, novas requisições
+    só ficariam esperando conexão, então é melhor sair do balanceamento.
+    """
+
+    def __init__(
+        self,
+        engines: dict[str, AsyncEngine],
+        interval: float = 5.0,
+        timeout: float = 2.0,
+        max_pool_usage: float = 1.0,
+    ):
+        self.engines = engines
+        self.interval = interval
+        self.timeout = timeout
+        self.max_pool_usage = max_pool_usage
+        self._checks = {name: _Check() for name in engines}
+        self._task: Optional[asyncio.Task] = None
+
+    async def check_once(self) -> None:
+        await asyncio.gather(*(self._ping(name, engine) for name, engine in self.engines.items()))
+
+    async def _ping(self, name: str, engine: AsyncEngine) -> None:
+        check = self._checks[name]
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+        except Exception as exc:
+            if check.reachable:
+                logger.warning("Banco %s indisponível: %r", name, exc)
+            check.reachable = False
+            check.latency_ms = None
+            check.error = f"sem resposta em {self.timeout}s" if isinstance(exc, TimeoutError) else repr(exc)
+        else:
+            check.reachable = True
+            check.latency_ms = round((time.perf_counter() - started) * 1000, 3)
+            check.error = None
+        check.checked_at = time.monotonic()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.check_once()
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> tuple[bool, dict]:
+        """(pronto, detalhes) a partir do resultado em cache; não acessa o banco"""
+        now = time.monotonic()
+        ready = True
+        checks = {}
+        for name, engine in self.engines.items():
+            check = self._checks[name]
+            usage = pool_usage(engine)
+            age = None if check.checked_at is None else round(now - check.checked_at, 3)
+            # Pinger travado ou parado: o último resultado não vale mais
+            stale = age is None or age > self.interval * 3 + self.timeout
+            exhausted = usage["saturation"] is not None and usage["saturation"] >= self.max_pool_usage
+            ok = check.reachable and not stale and not exhausted
+            ready = ready and ok
+            checks[name] = {
+                "ok": ok,
+                "reachable": check.reachable,
+                "latency_ms": check.latency_ms,
+                "error": "verificação desatualizada" if stale and age is not None else check.error,
+                "checked_age_s": age,
+                "pool": {**usage, "exhausted": exhausted},
+            }
+        return ready, {"status": "ready" if ready else "unready", "checks": checks}
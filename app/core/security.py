@@ -1,21 +1,145 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.tracing import start_span
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
+def _time_hash(rounds: int, samples: int = 3) -> float:
+    """Mediana do tempo (s) de um hash BCrypt com o custo informado"""
+    handler = pwd_context.handler("bcrypt").using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        handler.hash("calibracao-bcrypt")
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2]
+
+
+def calibrate_bcrypt_rounds(
+    target_ms: float, min_rounds: int, max_rounds: int, base_rounds: int = 8
+) -> int:
+    """
+    Maior custo BCrypt cujo hash cabe em target_ms neste hardware.
+    
+    Mede um custo baixo e extrapola (cada round dobra o tempo), depois
+    confirma o custo escolhido e desce um nível se estourar o orçamento.
+    O resultado é limitado a [min_rounds, max_rounds].
+    """
+    target = target_ms / 1000
+    base = _time_hash(base_rounds)
+    rounds = base_rounds + math.floor(math.log2(target / base)) if base > 0 else max_rounds
+    rounds = max(min_rounds, min(max_rounds, rounds))
+    if rounds > min_rounds and _time_hash(rounds, samples=1) > target * 1.2:
+        rounds -= 1
+    return rounds
+
+
+def configure_bcrypt_rounds() -> int:
+    """
+    Define o custo BCrypt padrão (BCRYPT_ROUNDS fixo ou calibrado por
+    BCRYPT_TARGET_MS) e a faixa aceita; hashes fora da faixa são
+    regravados no próximo login bem-sucedido.
+    """
+    rounds = settings.BCRYPT_ROUNDS or calibrate_bcrypt_rounds(
+        settings.BCRYPT_TARGET_MS, settings.BCRYPT_MIN_ROUNDS, settings.BCRYPT_MAX_ROUNDS
+    )
+    tolerance = settings.BCRYPT_ROUNDS_TOLERANCE
+    pwd_context.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=max(settings.BCRYPT_MIN_ROUNDS, rounds - tolerance),
+        bcrypt__max_rounds=rounds + tolerance,
+    )
+    return rounds
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Indica se o hash usa um custo fora da faixa configurada"""
+    try:
+        return pwd_context.needs_update(hashed_password)
+    except ValueError:
+        # Hash em formato não reconhecido: não há como regravar com segurança
+        return False
+
+
 def get_password_hash(password: str) -> str:
     """Gera hash BCrypt da senha"""
-    return pwd_context.hash(password)
+    with start_span("bcrypt.hash"):
+        return pwd_context.hash(password)
+
+
+def _hash_chunk(passwords: list[str], rounds: int) -> list[str]:
+    """Executado nos processos do pool: hashes com o custo do processo pai"""
+    handler = pwd_context.handler("bcrypt").using(rounds=rounds)
+    return [handler.hash(password) for password in passwords]
+
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _hash_workers() -> int:
+    if settings.PASSWORD_HASH_WORKERS:
+        return settings.PASSWORD_HASH_WORKERS
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        # spawn: os filhos não herdam o loop de eventos nem conexões abertas
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=_hash_workers(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+
+async def hash_passwords(passwords: list[str]) -> list[str]:
+    """
+    Hashes BCrypt de muitas senhas em paralelo num pool de processos (um
+    por núcleo, ou PASSWORD_HASH_WORKERS), sem bloquear o loop de eventos.
+    A ordem do resultado é a mesma da entrada.
+    """
+    if not passwords:
+        return []
+    with start_span("bcrypt.hash_many", count=len(passwords)):
+        return await _hash_in_pool(passwords)
+
+
+async def _hash_in_pool(passwords: list[str]) -> list[str]:
+    pool = _get_hash_pool()
+    rounds = pwd_context.handler("bcrypt").default_rounds
+    # Alguns blocos por processo equilibram a carga sem multiplicar o IPC
+    chunk_size = max(1, math.ceil(len(passwords) / (_hash_workers() * 4)))
+    loop = asyncio.get_running_loop()
+    chunks = await asyncio.gather(*(
+        loop.run_in_executor(pool, _hash_chunk, passwords[start:start + chunk_size], rounds)
+        for start in range(0, len(passwords), chunk_size)
+    ))
+    return [hashed for chunk in chunks for hashed in chunk]
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha plain corresponde ao hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    with start_span("bcrypt.verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -28,14 +152,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    with start_span("jwt.encode"):
+        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
 def decode_access_token(token: str) -> Optional[dict]:
     """Decodifica e valida token JWT"""
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except JWTError:
-        return None
+    with start_span("jwt.decode") as span:
+        try:
+            return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            if span is not None:
+                span.attributes["jwt.valid"] = False
+            return None
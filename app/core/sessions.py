@@ -0,0 +1,51 @@
+"""
+Liberação antecipada das conexões das sessões das rotas.
+
+As sessões de get_db/get_auth_db só retiram uma conexão do pool na
+primeira instrução, mas a dependência só fecha a sessão depois que a
+resposta foi validada e serializada. Com EarlyReleaseRoute, as sessões
+recebidas pela rota são fechadas assim que a função da rota retorna:
+a conexão volta ao pool antes da serialização e do envio da resposta.
+
+Os objetos carregados continuam utilizáveis (expire_on_commit=False e o
+close não expira atributos), só deixam de estar ligados à sessão. Se a
+rota voltar a usar a sessão, uma nova conexão é retirada sob demanda.
+"""
+import asyncio
+from functools import wraps
+from typing import Any, Callable
+
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def release_session(session: AsyncSession) -> None:
+    """Devolve a conexão da sessão ao pool (encerra a transação de leitura em aberto)"""
+    await session.close()
+
+
+def _releasing(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    if getattr(endpoint, "releases_sessions", False):
+        # include_router recria a rota com a função já envolvida
+        return endpoint
+
+    @wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            for value in kwargs.values():
+                if isinstance(value, AsyncSession):
+                    await release_session(value)
+    wrapper.releases_sessions = True
+    return wrapper
+
+
+class EarlyReleaseRoute(APIRoute):
+    """Rota que fecha as sessões recebidas como parâmetro ao terminar a função"""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        # Rotas síncronas rodam numa thread e não recebem sessões assíncronas
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = _releasing(endpoint)
+        super().__init__(path, endpoint, **kwargs)
@@ -0,0 +1,75 @@
+"""
+Shards do banco de veículos por faixa de id.
+
+O shard i guarda os ids em [i * id_span + 1, (i + 1) * id_span]: cada banco
+gera ids só dentro da própria faixa (a sequência de ids é posicionada no
+início dela), então ids são únicos entre os shards sem coordenação e uma
+busca por id vai direto ao shard dono, com uma conta. O shard 0 é o banco de
+DATABASE_URL; os demais vêm de VEHICLE_SHARD_URLS, na ordem. Novos shards só
+podem ser acrescentados ao final.
+
+Cadastros são distribuídos em rodízio entre os shards.
+"""
+import itertools
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+
+class ShardMap:
+    def __init__(self, session_factories: list[sessionmaker], id_span: int):
+        if not session_factories:
+            raise ValueError("ShardMap requer pelo menos um shard")
+        self.session_factories = session_factories
+        self.id_span = id_span
+        self._next = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.session_factories)
+
+    def shard_for(self, vehicle_id: int) -> int:
+        """Shard dono do id (ids além da última faixa caem no último shard)"""
+        return min(max(vehicle_id - 1, 0) // self.id_span, len(self) - 1)
+
+    def first_id(self, shard: int) -> int:
+        return shard * self.id_span + 1
+
+    def group_by_shard(self, ids: Iterable[int]) -> dict[int, list[int]]:
+        groups: dict[int, list[int]] = defaultdict(list)
+        for vehicle_id in ids:
+            groups[self.shard_for(vehicle_id)].append(vehicle_id)
+        return groups
+
+    def next_shard(self) -> int:
+        """Shard do próximo cadastro (rodízio)"""
+        return next(self._next) % len(self)
+
+    def session(self, shard: int):
+        return self.session_factories[shard]()
+
+
+def seed_id_sequence(sync_conn, table: str, first_id: int) -> None:
+    """
+    Garante que o próximo id gerado pela tabela seja pelo menos first_id
+    (nunca recua a sequência). Chamado na inicialização dos shards além do 0.
+    """
+    dialect = sync_conn.dialect.name
+    last = first_id - 1
+    if dialect == "sqlite":
+        # Tabelas com AUTOINCREMENT guardam o último id em sqlite_sequence
+        sync_conn.execute(text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+        ), {"name": table, "seq": last})
+        sync_conn.execute(text(
+            "UPDATE sqlite_sequence SET seq = :seq WHERE name = :name AND seq < :seq"
+        ), {"name": table, "seq": last})
+    elif dialect == "postgresql":
+        sync_conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence(:name, 'id'), GREATEST(:seq, COALESCE("
+            "pg_sequence_last_value(pg_get_serial_sequence(:name, 'id')::regclass), 0)))"
+        ), {"name": table, "seq": last})
+    else:
+        raise NotImplementedError(f"Sequência de ids de shard não suportada em {dialect}")
@@ -0,0 +1,72 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Call:
+    """Execução em andamento compartilhada entre chamadores de uma mesma chave"""
+
+    __slots__ = ("task", "waiters", "abandoned")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False
+
+
+class SingleFlight:
+    """
+    Coalescência de chamadas concorrentes idênticas (single-flight).
+
+    Enquanto uma execução para uma chave estiver em andamento, novos
+    chamadores com a mesma chave aguardam o mesmo resultado em vez de
+    disparar outra execução. Nada é cacheado após a conclusão.
+
+    Cancelamento:
+    - Um chamador cancelado não cancela a execução dos demais.
+    - A execução só é cancelada quando todos os chamadores desistem.
+    - O líder (quem disparou a execução) é dono dos recursos usados por ela
+      (ex: a sessão do banco), então aguarda a execução terminar antes de
+      propagar o próprio cancelamento quando ainda há outros aguardando.
+    - Uma execução cancelada (abandonada) só libera a chave depois de
+      terminar: o último chamador espera por ela e quem chega nesse meio
+      tempo aguarda antes de disparar uma nova execução, para que duas
+      nunca usem os mesmos recursos ao mesmo tempo.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        while call is not None and call.abandoned:
+            await asyncio.wait([call.task])
+            self._forget(key, call)
+            call = self._calls.get(key)
+        leader = call is None
+        if leader:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.task.done():
+                raise
+            call.waiters -= 1
+            if call.waiters == 0:
+                call.abandoned = True
+                call.task.cancel()
+                # Só propaga depois que a execução cancelada terminou (o erro dela é descartado)
+                await asyncio.wait([call.task])
+            elif leader:
+                await asyncio.wait([call.task])
+            raise
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
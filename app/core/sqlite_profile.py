@@ -0,0 +1,63 @@
+"""
+Perfil de produção para bancos SQLite em arquivo.
+
+Aplicado a cada conexão nova (evento "connect" do engine):
+- journal_mode=WAL: leitores não bloqueiam o escritor nem são bloqueados
+  por ele; só escritas concorrentes disputam o lock do banco;
+- synchronous=NORMAL: em WAL, o fsync acontece só no checkpoint (um
+  commit pode se perder numa queda de energia, mas o banco não corrompe);
+- mmap_size/cache_size: leituras servidas do mapeamento e do cache de
+  páginas da conexão em vez de read() a cada página;
+- busy_timeout: uma escrita que encontra o lock ocupado espera até esse
+  tempo em vez de falhar na hora com "database is locked".
+
+Bancos em memória e outros dialetos não são alterados.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+
+def is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def sqlite_pragmas() -> dict:
+    return {
+        "journal_mode": "WAL",
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        # Negativo: tamanho em KiB em vez de número de páginas
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,
+        "temp_store": "MEMORY",
+    }
+
+
+def apply_sqlite_profile(engine: AsyncEngine) -> bool:
+    """Registra os PRAGMAs no engine; devolve False se ele não for SQLite em arquivo"""
+    if not settings.SQLITE_PROFILE_ENABLED or not is_sqlite_file(str(engine.url)):
+        return False
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return True
+
+
+def sqlite_settings(connection) -> dict:
+    """PRAGMAs em vigor numa conexão (síncrona), para diagnóstico e testes"""
+    return {
+        name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+        for name in sqlite_pragmas()
+    }
@@ -0,0 +1,39 @@
+"""
+Caches de instruções SQL.
+
+Dois níveis evitam trabalho repetido nas consultas quentes:
+- cache de instruções compiladas do SQLAlchemy (por engine, tamanho
+  SQL_COMPILED_CACHE_SIZE): a instrução montada com lambda_stmt é
+  reconhecida pela chave de cache e não é recompilada;
+- cache de prepared statements do asyncpg (por conexão, tamanho
+  DB_PREPARED_STATEMENT_CACHE_SIZE): o Postgres não precisa refazer o
+  parse/plano do mesmo SQL na mesma conexão.
+"""
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+
+def engine_options(url: str) -> dict:
+    """Argumentos de create_async_engine ligados aos caches de instruções"""
+    options = {"query_cache_size": settings.SQL_COMPILED_CACHE_SIZE}
+    if make_url(url).drivername == "postgresql+asyncpg":
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
+def statement_cache_usage(engine: AsyncEngine) -> dict:
+    """Ocupação do cache de compiladas e configuração do cache de prepared statements"""
+    compiled = engine.sync_engine._compiled_cache
+    prepared = None
+    if engine.dialect.driver == "asyncpg":
+        prepared = settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+    return {
+        "dialect": f"{engine.dialect.name}+{engine.dialect.driver}",
+        "compiled_entries": 0 if compiled is None else len(compiled),
+        "compiled_capacity": 0 if compiled is None else compiled.capacity,
+        "prepared_statement_cache_size": prepared,
+    }
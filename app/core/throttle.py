@@ -0,0 +1,219 @@
+import hashlib
+import importlib
+import ipaddress
+import math
+import time
+from typing import Optional, Protocol
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+
+
+class ThrottleBackend(Protocol):
+    """
+    Armazenamento dos contadores de janela deslizante.
+    Implementações compartilhadas (ex: Redis) permitem limitar entre réplicas.
+    """
+
+    async def hit(self, key: str, window: float, now: float) -> None: ...
+
+    async def estimate(self, key: str, window: float, now: float) -> float: ...
+
+    async def release(self, key: str, window: float, now: float) -> None:
+        """Desfaz um hit (tentativa reservada que não falhou)"""
+        ...
+
+
+class InMemoryThrottleBackend:
+    """
+    Contadores de janela deslizante aproximada (janela anterior ponderada +
+    janela atual) em um dict limitado a max_keys entradas.
+
+    Cada entrada ocupa dois inteiros: o hash de 64 bits da chave e um
+    inteiro com (índice da janela, contagem anterior, contagem atual)
+    empacotados. Quando o limite é atingido, as chaves usadas há mais tempo
+    são descartadas, então a memória fica limitada mesmo com milhões de
+    emails/clientes distintos.
+    """
+
+    _COUNT_BITS = 16
+    _COUNT_MAX = (1 << _COUNT_BITS) - 1
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._entries: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _digest(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+    def _unpack(self, packed: int) -> tuple[int, int, int]:
+        return (
+            packed >> (2 * self._COUNT_BITS),
+            (packed >> self._COUNT_BITS) & self._COUNT_MAX,
+            packed & self._COUNT_MAX,
+        )
+
+    def _pack(self, index: int, previous: int, current: int) -> int:
+        return (index << (2 * self._COUNT_BITS)) | (previous << self._COUNT_BITS) | current
+
+    def _aligned(self, packed: Optional[int], index: int) -> tuple[int, int]:
+        """Contagens (anterior, atual) vistas a partir da janela `index`"""
+        if packed is None:
+            return 0, 0
+        stored_index, previous, current = self._unpack(packed)
+        if stored_index == index:
+            return previous, current
+        if stored_index == index - 1:
+            return current, 0
+        return 0, 0
+
+    async def hit(self, key: str, window: float, now: float) -> None:
+        digest = self._digest(key)
+        index = int(now // window)
+        previous, current = self._aligned(self._entries.pop(digest, None), index)
+        # Reinserir no fim mantém o dict em ordem de uso (LRU)
+        self._entries[digest] = self._pack(index, previous, min(current + 1, self._COUNT_MAX))
+        while len(self._entries) > self.max_keys:
+            del self._entries[next(iter(self._entries))]
+
+    async def release(self, key: str, window: float, now: float) -> None:
+        digest = self._digest(key)
+        packed = self._entries.get(digest)
+        if packed is None:
+            return
+        index = int(now // window)
+        stored_index, previous, current = self._unpack(packed)
+        # O hit pode ter ficado na janela anterior se ela virou nesse meio tempo
+        if stored_index == index and current:
+            self._entries[digest] = self._pack(index, previous, current - 1)
+        elif stored_index == index and previous:
+            self._entries[digest] = self._pack(index, previous - 1, current)
+        elif stored_index == index - 1 and current:
+            self._entries[digest] = self._pack(stored_index, previous, current - 1)
+
+    async def estimate(self, key: str, window: float, now: float) -> float:
+        index = int(now // window)
+        previous, current = self._aligned(self._entries.get(self._digest(key)), index)
+        elapsed = (now % window) / window
+        return previous * (1 - elapsed) + current
+
+
+class LoginThrottle:
+    """
+    Limita tentativas de login com falha por email e por cliente (IP).
+
+    A verificação acontece antes de qualquer consulta ao banco ou
+    verificação BCrypt; uma chave acima do limite recebe 429 imediatamente.
+    `acquire` já reserva a tentativa, de modo que uma rajada simultânea não
+    passa inteira pela verificação antes da primeira falha ser registrada;
+    logins que não falham devolvem a reserva (`release`) e não consomem o
+    limite.
+    """
+
+    def __init__(
+        self,
+        backend: ThrottleBackend,
+        email_limit: int = 5,
+        email_window: float = 300.0,
+        client_limit: int = 20,
+        client_window: float = 60.0,
+    ):
+        self.backend = backend
+        self.email_limit = email_limit
+        self.email_window = email_window
+        self.client_limit = client_limit
+        self.client_window = client_window
+
+    def _rules(self, email: str, client: Optional[str]):
+        yield f"email:{email.lower()}", self.email_limit, self.email_window
+        if client:
+            yield f"client:{client}", self.client_limit, self.client_window
+
+    async def check(self, email: str, client: Optional[str]) -> None:
+        """Levanta 429 se o email ou o cliente excedeu o limite de falhas"""
+        now = time.time()
+        for key, limit, window in self._rules(email, client):
+            if await self.backend.estimate(key, window, now) >= limit:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Muitas tentativas de login. Tente novamente mais tarde.",
+                    headers={"Retry-After": str(math.ceil(window - now % window))},
+                )
+
+    async def record_failure(self, email: str, client: Optional[str]) -> None:
+        now = time.time()
+        for key, _, window in self._rules(email, client):
+            await self.backend.hit(key, window, now)
+
+    async def acquire(self, email: str, client: Optional[str]) -> None:
+        """
+        check + reserva da tentativa. No backend em memória nada cede o loop
+        entre as duas, então tentativas concorrentes se enxergam.
+        """
+        await self.check(email, client)
+        await self.record_failure(email, client)
+
+    async def release(self, email: str, client: Optional[str]) -> None:
+        """Devolve a reserva de uma tentativa que não falhou"""
+        now = time.time()
+        for key, _, window in self._rules(email, client):
+            await self.backend.release(key, window, now)
+
+
+def client_address(request: Request, trusted_proxies: list[str]) -> Optional[str]:
+    """
+    IP do cliente para o limite por cliente. Atrás de proxies confiáveis
+    (trusted_proxies, IPs ou redes), usa o último endereço do
+    X-Forwarded-For que não seja de um deles. Se o par da conexão é um proxy
+    confiável sem X-Forwarded-For útil, retorna None: o IP do proxy agruparia
+    todos os clientes numa chave só.
+    """
+    peer = request.client.host if request.client else None
+    networks = [ipaddress.ip_network(proxy, strict=False) for proxy in trusted_proxies]
+
+    def trusted(address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in networks)
+
+    if peer is None or not trusted(peer):
+        return peer
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not trusted(hop):
+            return hop
+    return None
+
+
+def _load_backend(path: str) -> ThrottleBackend:
+    """'memory' ou caminho 'modulo:Classe' de um backend compartilhado"""
+    if path == "memory":
+        return InMemoryThrottleBackend(max_keys=settings.LOGIN_THROTTLE_MAX_KEYS)
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)()
+
+
+_login_throttle: Optional[LoginThrottle] = None
+
+
+def get_login_throttle() -> Optional[LoginThrottle]:
+    """Dependency: throttle de login configurado (None se desabilitado)"""
+    global _login_throttle
+    if not settings.LOGIN_THROTTLE_ENABLED:
+        return None
+    if _login_throttle is None:
+        _login_throttle = LoginThrottle(
+            _load_backend(settings.LOGIN_THROTTLE_BACKEND),
+            email_limit=settings.LOGIN_THROTTLE_EMAIL_LIMIT,
+            email_window=settings.LOGIN_THROTTLE_EMAIL_WINDOW_SECONDS,
+            client_limit=settings.LOGIN_THROTTLE_CLIENT_LIMIT,
+            client_window=settings.LOGIN_THROTTLE_CLIENT_WINDOW_SECONDS,
+        )
+    return _login_throttle
@@ -0,0 +1,398 @@
+"""
+Rastreamento distribuído com propagação W3C `traceparent`.
+
+O middleware abre um span por requisição HTTP, continuando o trace do
+header `traceparent` quando ele vem do cliente. Dentro de um trace
+amostrado, viram spans filhos:
+- cada instrução SQL dos engines registrados (fingerprint, sem valores);
+- o trabalho de BCrypt e JWT (app.core.security).
+
+A amostragem é decidida na raiz: um trace que chega amostrado segue
+amostrado, um que chega não amostrado segue sem spans, e um trace novo é
+amostrado com probabilidade TRACING_SAMPLE_RATE. Fora de um trace
+amostrado, cada ponto de instrumentação custa uma leitura de ContextVar.
+
+Spans terminados vão para um buffer limitado (os excedentes são
+descartados e contados) e são exportados em lotes por uma tarefa em
+segundo plano, a cada TRACING_EXPORT_INTERVAL_SECONDS ou quando o buffer
+atinge TRACING_BATCH_SIZE.
+
+Exportadores:
+- "stdout": uma linha JSON por span na saída padrão (uso local);
+- "file": uma linha JSON por span em TRACING_FILE_PATH;
+- "modulo:Classe": exportador externo com a mesma interface.
+"""
+import asyncio
+import importlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, NamedTuple, Optional, Protocol
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.query_log import fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class TraceParent(NamedTuple):
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[TraceParent]:
+    """`00-<trace-id>-<parent-id>-<flags>`; None se ausente ou inválido"""
+    if not header:
+        return None
+    parts = header.strip().lower().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    version, trace_id, span_id, flags = parts[:4]
+    if version == "00" and len(parts) != 4:
+        return None
+    if len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        int(trace_id, 16), int(span_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return TraceParent(trace_id, span_id, sampled)
+
+
+def format_traceparent(trace_id: str, span_id: str, sampled: bool = True) -> str:
+    return f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}"
+
+
+class Span:
+    __slots__ = ("tracer", "trace_id", "span_id", "parent_id", "name", "kind",
+                 "attributes", "error", "start_ns", "end_ns")
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        kind: str = "internal",
+        attributes: Optional[dict] = None,
+    ):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def child(self, name: str, kind: str = "internal", attributes: Optional[dict] = None) -> "Span":
+        return Span(self.tracer, name, self.trace_id, self.span_id, kind, attributes)
+
+    def finish(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer.export_later(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": "error" if self.error else "ok",
+            **({"error": self.error} if self.error else {}),
+        }
+
+
+# Span em andamento no contexto atual (None fora de um trace amostrado)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, kind: str = "internal", **attributes) -> Iterator[Optional[Span]]:
+    """Span filho do span atual; sem trace amostrado em andamento, não faz nada"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    span = parent.child(name, kind, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.error = repr(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.finish()
+
+
+@contextmanager
+def use_span(span: Optional[Span]) -> Iterator[Optional[Span]]:
+    """Torna `span` o span atual (ex: trabalho feito por outra tarefa em nome da requisição)"""
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+
+def trace_sql(engine: AsyncEngine, database: str) -> None:
+    """Um span por instrução SQL executada no engine, dentro de traces amostrados"""
+    sync_engine = engine.sync_engine
+    system = engine.dialect.name
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        parent = _current_span.get()
+        if parent is None:
+            return
+        span = parent.child("SQL", "client", {
+            "db.system": system,
+            "db.name": database,
+            "db.statement": fingerprint(statement),
+        })
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            span = spans.pop()
+            span.attributes["db.rowcount"] = cursor.rowcount
+            span.finish()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def on_error(context):
+        spans = context.connection.info.get("trace_spans") if context.connection else None
+        if spans:
+            span = spans.pop()
+            span.error = repr(context.original_exception)
+            span.finish()
+
+
+class SpanExporter(Protocol):
+    """Destino dos lotes de spans (chamado numa thread, fora do loop de eventos)"""
+
+    def export(self, spans: list[dict]) -> None: ...
+
+    def shutdown(self) -> None: ...
+
+
+class StreamSpanExporter:
+    """Uma linha JSON por span num arquivo aberto (padrão: stdout)"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def export(self, spans: list[dict]) -> None:
+        self.stream.write("".join(json.dumps(span, ensure_ascii=False) + "\n" for span in spans))
+        self.stream.flush()
+
+    def shutdown(self) -> None:
+        pass
+
+
+class FileSpanExporter(StreamSpanExporter):
+    """Uma linha JSON por span, acrescentada ao arquivo `path`"""
+
+    def __init__(self, path: str):
+        super().__init__(open(path, "a", encoding="utf-8"))
+
+    def shutdown(self) -> None:
+        self.stream.close()
+
+
+class Tracer:
+    """Amostragem na raiz e exportação assíncrona em lotes"""
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        sample_rate: float = 0.01,
+        batch_size: int = 512,
+        export_interval: float = 5.0,
+        max_queue_size: int = 2048,
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.export_interval = export_interval
+        self._queue: deque[Span] = deque()
+        self._max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start_trace(self, name: str, parent: Optional[TraceParent], **attributes) -> Optional[Span]:
+        """Span raiz de uma requisição, ou None se o trace não for amostrado"""
+        if parent is not None:
+            if not parent.sampled:
+                return None
+            return Span(self, name, parent.trace_id, parent.span_id, "server", attributes)
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        return Span(self, name, os.urandom(16).hex(), None, "server", attributes)
+
+    def export_later(self, span: Span) -> None:
+        """Enfileira um span terminado (pode ser chamado de outras threads)"""
+        with self._lock:
+            if len(self._queue) >= self._max_queue_size:
+                self.dropped += 1
+                return
+            self._queue.append(span)
+            full = len(self._queue) >= self.batch_size
+        if full and self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self.exporter.shutdown()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.export_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Exporta tudo o que está no buffer, em lotes de batch_size"""
+        while True:
+            with self._lock:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            if not batch:
+                return
+            try:
+                await asyncio.to_thread(self.exporter.export, [span.to_dict() for span in batch])
+            except Exception:
+                # Melhor esforço: o trace se perde, a requisição não
+                logger.exception("Falha ao exportar %d spans", len(batch))
+                self.dropped += len(batch)
+                return
+            self.exported += len(batch)
+
+
+class TracingMiddleware:
+    """Span por requisição HTTP; continua o trace do `traceparent` recebido"""
+
+    def __init__(self, app: ASGIApp, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        span = self.tracer.start_trace(
+            f"HTTP {scope['method']}",
+            parse_traceparent(traceparent),
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        )
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+            await send(message)
+
+        token = _current_span.set(span)
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as exc:
+            span.error = repr(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                span.name = f"HTTP {scope['method']} {route.path}"
+                span.attributes["http.route"] = route.path
+            span.finish()
+
+
+def _load_exporter(path: str) -> SpanExporter:
+    if path == "stdout":
+        return StreamSpanExporter()
+    if path == "file":
+        return FileSpanExporter(settings.TRACING_FILE_PATH)
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)()
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Tracer configurado (None se TRACING_ENABLED estiver desligado)"""
+    global _tracer
+    if not settings.TRACING_ENABLED:
+        return None
+    if _tracer is None:
+        _tracer = Tracer(
+            _load_exporter(settings.TRACING_EXPORTER),
+            sample_rate=settings.TRACING_SAMPLE_RATE,
+            batch_size=settings.TRACING_BATCH_SIZE,
+            export_interval=settings.TRACING_EXPORT_INTERVAL_SECONDS,
+            max_queue_size=settings.TRACING_MAX_QUEUE_SIZE,
+        )
+    return _tracer
+
+
+async def close_tracer() -> None:
+    global _tracer
+    if _tracer is not None:
+        await _tracer.stop()
+        _tracer = None
@@ -1,13 +1,25 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
+from app.core.connection_hold import connection_hold
+from app.core.query_log import slow_query_log
+from app.core.sharding import ShardMap
+from app.core.sqlite_profile import apply_sqlite_profile
+from app.core.statement_cache import engine_options
+from app.core.tracing import trace_sql
 
 # Engine para banco transacional (Vehicles)
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=True,  # Set to False in production
-    future=True
+    echo=settings.SQL_ECHO,
+    future=True,
+    **engine_options(settings.DATABASE_URL)
 )
+slow_query_log.attach(engine, "vehicles")
+connection_hold.attach(engine, "vehicles")
+if settings.TRACING_ENABLED:
+    trace_sql(engine, "vehicles")
+apply_sqlite_profile(engine)
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
@@ -15,12 +27,42 @@ AsyncSessionLocal = sessionmaker(
 
 Base = declarative_base()
 
+# Shards adicionais do banco de veículos (o shard 0 é o engine acima)
+shard_engines = [engine]
+for _number, _url in enumerate(settings.VEHICLE_SHARD_URLS, start=1):
+    _shard_engine = create_async_engine(
+        _url,
+        echo=settings.SQL_ECHO,
+        future=True,
+        **engine_options(_url)
+    )
+    slow_query_log.attach(_shard_engine, f"vehicles_shard_{_number}")
+    connection_hold.attach(_shard_engine, f"vehicles_shard_{_number}")
+    if settings.TRACING_ENABLED:
+        trace_sql(_shard_engine, f"vehicles_shard_{_number}")
+    apply_sqlite_profile(_shard_engine)
+    shard_engines.append(_shard_engine)
+
+vehicle_shards = ShardMap(
+    [AsyncSessionLocal] + [
+        sessionmaker(shard_engine, class_=AsyncSession, expire_on_commit=False)
+        for shard_engine in shard_engines[1:]
+    ],
+    id_span=settings.VEHICLE_SHARD_ID_SPAN,
+)
+
 # Engine SEPARADO para banco de autenticação (Users)
 auth_engine = create_async_engine(
     settings.AUTH_DATABASE_URL,
-    echo=True,  # Set to False in production
-    future=True
+    echo=settings.SQL_ECHO,
+    future=True,
+    **engine_options(settings.AUTH_DATABASE_URL)
 )
+slow_query_log.attach(auth_engine, "auth")
+connection_hold.attach(auth_engine, "auth")
+if settings.TRACING_ENABLED:
+    trace_sql(auth_engine, "auth")
+apply_sqlite_profile(auth_engine)
 
 AuthAsyncSessionLocal = sessionmaker(
     auth_engine, class_=AsyncSession, expire_on_commit=False
@@ -30,7 +72,11 @@ AuthBase = declarative_base()
 
 
 async def get_db():
-    """Dependency para banco de dados transacional (veículos)"""
+    """
+    Dependency para banco de dados transacional (veículos).
+    A conexão só sai do pool na primeira instrução; rotas com
+    EarlyReleaseRoute a devolvem assim que a função da rota retorna.
+    """
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -38,8 +84,21 @@ async def get_db():
             await session.close()
 
 
+def get_session_factory():
+    """
+    Dependency: fábrica de sessões do banco de veículos, para respostas em
+    streaming que consultam o banco depois que a rota retorna
+    """
+    return AsyncSessionLocal
+
+
+def get_vehicle_shards():
+    """Dependency: mapa de shards de veículos (None com um único banco)"""
+    return vehicle_shards if len(vehicle_shards) > 1 else None
+
+
 async def get_auth_db():
-    """Dependency para banco de dados de autenticação (SEPARADO)"""
+    """Dependency para banco de dados de autenticação (SEPARADO), com a mesma posse sob demanda"""
     async with AuthAsyncSessionLocal() as session:
         try:
             yield session
@@ -1,15 +1,74 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer
 from fastapi.openapi.utils import get_openapi
 from contextlib import asynccontextmanager
+import asyncio
 from app.core.config import settings
-from app.routers import vehicles, auth
-from app.database import engine, Base, auth_engine, AuthBase
+from app.core.compression import CompressionMiddleware
+from app.core.connection_hold import ConnectionHoldMiddleware, connection_hold
+from app.core.readiness import ReadinessMonitor
+from app.core.invalidation import close_invalidation_bus, get_invalidation_bus
+from app.core.security import configure_bcrypt_rounds, shutdown_hash_pool
+from app.core.tracing import TracingMiddleware, close_tracer, get_tracer
+from app.routers import vehicles, auth, admin
+from app.core.sharding import seed_id_sequence
+from app.database import (
+    engine, Base, auth_engine, AuthBase, AsyncSessionLocal, shard_engines, vehicle_shards
+)
+from app.models.vehicle import Vehicle, VehicleArchive
+from app.models.user import User
+from app.services.vehicle_archiver import VehicleArchiver, vehicle_archiver
+from app.services.price_index import vehicle_price_index
+from app.services.vehicle_catalog import migrate_legacy_names, vehicle_catalog
+from app.services.vehicle_events import vehicle_event_hub
+from app.services.write_batcher import close_vehicle_write_batcher
+from app.services.write_queue import close_vehicle_write_queue, get_vehicle_write_queue
 import asyncpg
+from sqlalchemy import inspect, text
 
 security = HTTPBearer()
 
 
+def _add_missing_columns(sync_conn, tables=(Vehicle.__table__, VehicleArchive.__table__)) -> None:
+    """create_all não adiciona colunas novas (ex: version, reserva, is_admin) a tabelas existentes"""
+    inspector = inspect(sync_conn)
+    for table in tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(sync_conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" NOT NULL DEFAULT {column.server_default.arg.text}"
+            sync_conn.execute(text(ddl))
+
+
+# Um arquivador por shard de veículos (o do shard 0 é o padrão)
+archivers = [vehicle_archiver] + [
+    VehicleArchiver(
+        session_factory,
+        batch_size=settings.VEHICLE_ARCHIVE_BATCH_SIZE,
+        interval_seconds=settings.VEHICLE_ARCHIVE_INTERVAL_SECONDS,
+    )
+    for session_factory in vehicle_shards.session_factories[1:]
+]
+
+readiness = ReadinessMonitor(
+    {
+        "engine": engine,
+        "auth_engine": auth_engine,
+        **{
+            f"vehicles_shard_{number}": shard_engine
+            for number, shard_engine in enumerate(shard_engines[1:], start=1)
+        },
+    },
+    interval=settings.READINESS_INTERVAL_SECONDS,
+    timeout=settings.READINESS_TIMEOUT_SECONDS,
+    max_pool_usage=settings.READINESS_MAX_POOL_USAGE,
+)
+
+
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
@@ -56,6 +115,10 @@ def custom_openapi():
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     
+    # Custo BCrypt calibrado para o hardware deste nó
+    rounds = await asyncio.to_thread(configure_bcrypt_rounds)
+    print(f"BCrypt configurado com custo {rounds}")
+    
     # Tentar criar banco de auth no PostgreSQL (quando em Docker)
     try:
         sys_conn = await asyncpg.connect(
@@ -77,18 +140,68 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Aviso: Usando SQLite local ou banco já existe: {e}")
     
-    # Criar tabelas no banco transacional
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Criar tabelas no banco transacional (em cada shard)
+    for shard, shard_engine in enumerate(shard_engines):
+        async with shard_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_add_missing_columns)
+            # create_all não cria índices novos em tabelas já existentes
+            for index in Vehicle.__table__.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
+            if shard > 0:
+                await conn.run_sync(
+                    seed_id_sequence, Vehicle.__tablename__, vehicle_shards.first_id(shard)
+                )
+    
+    # Catálogo de marcas/modelos (shard 0): converte bancos com os nomes em texto e carrega
+    async with AsyncSessionLocal() as session:
+        for shard_engine in shard_engines:
+            if await migrate_legacy_names(shard_engine, session):
+                print("Marcas e modelos convertidos para o catálogo")
+        await vehicle_catalog.load(session)
     
     # Criar tabelas no banco de auth (separado)
     async with auth_engine.begin() as conn:
         await conn.run_sync(AuthBase.metadata.create_all)
+        await conn.run_sync(_add_missing_columns, (User.__table__,))
+    
+    if settings.VEHICLE_ARCHIVE_ENABLED:
+        # Shard 0 em SQLite com escritor único: o arquivador escreve pela fila
+        vehicle_archiver.writer = get_vehicle_write_queue()
+        for archiver in archivers:
+            archiver.start()
+    
+    if settings.VEHICLE_PRICE_INDEX_ENABLED:
+        await vehicle_price_index.load()
+        print(f"Índice de preços carregado com {len(vehicle_price_index)} veículos disponíveis")
+    
+    bus = get_invalidation_bus()
+    if bus is not None:
+        if settings.VEHICLE_PRICE_INDEX_ENABLED:
+            bus.subscribe("vehicle", vehicle_price_index.refresh, on_reset=vehicle_price_index.invalidate)
+        if settings.VEHICLE_EVENTS_ENABLED:
+            bus.subscribe("vehicle", vehicle_event_hub.refresh, on_reset=vehicle_event_hub.reset)
+        await bus.start()
+    
+    readiness.start()
+    
+    tracer = get_tracer()
+    if tracer is not None:
+        tracer.start()
     
     yield
     
     # Shutdown
-    await engine.dispose()
+    await readiness.stop()
+    for archiver in archivers:
+        await archiver.stop()
+    await close_vehicle_write_batcher()
+    await close_vehicle_write_queue()
+    await close_invalidation_bus()
+    await close_tracer()
+    shutdown_hash_pool()
+    for shard_engine in shard_engines:
+        await shard_engine.dispose()
     await auth_engine.dispose()
 
 
@@ -111,6 +224,21 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware, tracer=get_tracer())
+
+if settings.CONNECTION_HOLD_METRICS_ENABLED:
+    app.add_middleware(ConnectionHoldMiddleware, metrics=connection_hold)
+
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        cache_max_bytes=settings.COMPRESSION_CACHE_MAX_BYTES,
+    )
+
 
 # Health check
 @app.get("/health")
@@ -118,6 +246,16 @@ async def health_check():
     return {"status": "healthy", "service": "vehicle-management-api"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Bancos alcançáveis e pools com folga, segundo o último ciclo do pinger
+    em segundo plano (não consulta o banco). 503 quando não está pronto.
+    """
+    ready, details = readiness.snapshot()
+    return JSONResponse(details, status_code=200 if ready else 503)
+
+
 # Include routers
 app.include_router(
     vehicles.router,
@@ -131,4 +269,10 @@ app.include_router(
     tags=["Autenticação"]
 )
 
+app.include_router(
+    admin.router,
+    prefix="/admin",
+    tags=["Administração"]
+)
+
 app.openapi = custom_openapi
@@ -1,4 +1,5 @@
-from app.models.vehicle import Vehicle, VehicleStatus
+from app.models.catalog import Marca, Modelo
+from app.models.vehicle import Vehicle, VehicleArchive, VehicleStatus
 from app.models.user import User
 
-__all__ = ["Vehicle", "VehicleStatus", "User"]
+__all__ = ["Marca", "Modelo", "Vehicle", "VehicleArchive", "VehicleStatus", "User"]
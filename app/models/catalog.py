@@ -0,0 +1,82 @@
+from typing import Iterable, Optional
+
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+
+class Marca(Base):
+    """Marcas do catálogo: cada nome é gravado uma vez e referenciado por id"""
+    __tablename__ = "marcas"
+
+    id = Column(Integer, primary_key=True)
+    # Nome normalizado (espaços colapsados, casefold): "Toyota" e "toyota " são a mesma marca
+    chave = Column(String(100), unique=True, nullable=False)
+    nome = Column(String(100), nullable=False)
+
+
+class Modelo(Base):
+    """Modelos do catálogo (mesma normalização das marcas)"""
+    __tablename__ = "modelos"
+
+    id = Column(Integer, primary_key=True)
+    chave = Column(String(100), unique=True, nullable=False)
+    nome = Column(String(100), nullable=False)
+
+
+def catalog_key(nome: str) -> str:
+    return " ".join(nome.split()).casefold()
+
+
+class NameDictionary:
+    """
+    Mapa bidirecional em memória entre nomes e ids de uma tabela do catálogo.
+    O nome exibido é a grafia com que o nome foi cadastrado pela primeira vez.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self._ids: dict[str, int] = {}
+        self._names: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, entry_id: int) -> bool:
+        return entry_id in self._names
+
+    def id_for(self, nome: str) -> Optional[int]:
+        return self._ids.get(catalog_key(nome))
+
+    def name(self, entry_id: Optional[int]) -> Optional[str]:
+        if entry_id is None:
+            return None
+        try:
+            return self._names[entry_id]
+        except KeyError:
+            raise LookupError(f"{self.label} {entry_id} fora do catálogo em memória") from None
+
+    def require(self, nome: str) -> int:
+        entry_id = self.id_for(nome)
+        if entry_id is None:
+            raise ValueError(f"{self.label} não cadastrada no catálogo: {nome!r}")
+        return entry_id
+
+    def missing(self, ids: Iterable[Optional[int]]) -> set[int]:
+        return {entry_id for entry_id in ids if entry_id is not None and entry_id not in self._names}
+
+    def add(self, entry_id: int, chave: str, nome: str) -> None:
+        self._ids[chave] = entry_id
+        self._names[entry_id] = nome
+
+    def items(self) -> list[tuple[int, str]]:
+        """(id, nome) em ordem alfabética"""
+        return sorted(self._names.items(), key=lambda item: catalog_key(item[1]))
+
+    def clear(self) -> None:
+        self._ids.clear()
+        self._names.clear()
+
+
+# Dicionários do processo, preenchidos pelo VehicleCatalog (app/services/vehicle_catalog.py)
+marcas = NameDictionary("Marca")
+modelos = NameDictionary("Modelo")
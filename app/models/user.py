@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, text
 from datetime import datetime
 from app.database import AuthBase
 
@@ -15,4 +15,6 @@ class User(AuthBase):
     hashed_password = Column(String, nullable=False)
     full_name = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
+    # Acesso aos endpoints /admin (promoção feita pelo operador, direto no banco)
+    is_admin = Column(Boolean, nullable=False, default=False, server_default=text("false"))
     created_at = Column(DateTime, default=datetime.utcnow)
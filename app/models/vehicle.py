@@ -1,7 +1,9 @@
 import enum
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, Index, text
 from datetime import datetime
+from sqlalchemy.orm import declared_attr
 from app.database import Base
+from app.models.catalog import marcas, modelos
 
 
 class VehicleStatus(str, enum.Enum):
@@ -9,18 +11,74 @@ class VehicleStatus(str, enum.Enum):
     VENDIDO = "VENDIDO"
 
 
-class Vehicle(Base):
-    """
-    Modelo de veículo para cadastro e gerenciamento.
-    Este é o modelo principal, armazenado no banco transacional.
-    """
-    __tablename__ = "vehicles"
+class VehicleColumns:
+    """Colunas comuns ao estoque ativo e ao arquivo de vendidos"""
 
     id = Column(Integer, primary_key=True, index=True)
-    marca = Column(String, index=True, nullable=False)
-    modelo = Column(String, index=True, nullable=False)
+    # Marca e modelo por id do catálogo (marcas/modelos); os nomes vêm dos
+    # dicionários em memória, então as propriedades abaixo não vão ao banco
+    marca_id = Column(Integer, index=True, nullable=False)
+    modelo_id = Column(Integer, index=True, nullable=False)
     ano = Column(Integer, nullable=False)
     cor = Column(String, nullable=False)
     preco = Column(Float, nullable=False)
     status = Column(Enum(VehicleStatus), default=VehicleStatus.DISPONIVEL)
     data_cadastro = Column(DateTime, default=datetime.utcnow)
+    # Versão da linha: incrementada a cada UPDATE (controle otimista, ETag)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    # Reserva temporária (ex: durante o pagamento): até reservado_ate, só
+    # quem tem o reserva_id consegue concluir a venda
+    reservado_ate = Column(DateTime, nullable=True)
+    reserva_id = Column(String(32), nullable=True)
+
+    @property
+    def marca(self) -> str:
+        return marcas.name(self.marca_id)
+
+    @marca.setter
+    def marca(self, nome: str) -> None:
+        self.marca_id = marcas.require(nome)
+
+    @property
+    def modelo(self) -> str:
+        return modelos.name(self.modelo_id)
+
+    @modelo.setter
+    def modelo(self, nome: str) -> None:
+        self.modelo_id = modelos.require(nome)
+
+    @declared_attr.directive
+    def __mapper_args__(cls):
+        # UPDATEs do ORM levam "AND version = ?" e incrementam a versão
+        return {"version_id_col": cls.__table__.c.version}
+
+
+class Vehicle(VehicleColumns, Base):
+    """
+    Modelo de veículo para cadastro e gerenciamento.
+    Este é o modelo principal, armazenado no banco transacional.
+    """
+    __tablename__ = "vehicles"
+    __table_args__ = (
+        # Caminho quente: estoque disponível ordenado por preço
+        Index(
+            "ix_vehicles_disponivel_preco",
+            "preco",
+            postgresql_where=text("status = 'DISPONIVEL'"),
+            sqlite_where=text("status = 'DISPONIVEL'"),
+        ),
+        # Ids de veículos arquivados nunca são reutilizados no SQLite
+        {"sqlite_autoincrement": True},
+    )
+
+
+class VehicleArchive(VehicleColumns, Base):
+    """
+    Veículos vendidos movidos para fora da tabela quente pelo arquivador.
+    Mantém o mesmo id que o veículo tinha em `vehicles`.
+    """
+    __tablename__ = "vehicles_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    preco = Column(Float, nullable=False, index=True)
+    data_arquivamento = Column(DateTime, default=datetime.utcnow)
@@ -1,3 +1,3 @@
-from app.routers import vehicles, auth
+from app.routers import vehicles, auth, admin
 
-__all__ = ["vehicles", "auth"]
+__all__ = ["vehicles", "auth", "admin"]
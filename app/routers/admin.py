@@ -0,0 +1,93 @@
+from fastapi import APIRouter, Depends, Query, status
+
+from app.core.connection_hold import connection_hold
+from app.core.deps import get_current_admin
+from app.core.query_log import slow_query_log
+from app.core.sessions import EarlyReleaseRoute
+from app.core.statement_cache import statement_cache_usage
+from app.database import auth_engine, shard_engines
+from app.models.user import User
+
+router = APIRouter(route_class=EarlyReleaseRoute)
+
+
+@router.get("/slow-queries")
+async def list_slow_queries(
+    limit: int = Query(20, ge=1, le=500),
+    current_user: User = Depends(get_current_admin)
+):
+    """
+    Resumo das instruções SQL por fingerprint (desde o início do processo
+    ou do último reset), com maior tempo total primeiro.
+    
+    **Requer JWT de administrador.**
+    """
+    return {
+        "threshold_ms": slow_query_log.threshold * 1000,
+        "sample_rate": slow_query_log.sample_rate,
+        "queries": slow_query_log.summary(limit),
+    }
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_slow_queries(
+    current_user: User = Depends(get_current_admin)
+):
+    """
+    Zera o resumo de consultas.
+    
+    **Requer JWT de administrador.**
+    """
+    slow_query_log.reset()
+
+
+@router.get("/statement-cache")
+async def statement_cache(
+    limit: int = Query(20, ge=1, le=500),
+    current_user: User = Depends(get_current_admin)
+):
+    """
+    Ocupação dos caches de instruções por banco e, por fingerprint,
+    quantas execuções compilaram o SQL x quantas vieram do cache.
+    
+    **Requer JWT de administrador.**
+    """
+    return {
+        "engines": {
+            "vehicles": statement_cache_usage(shard_engines[0]),
+            **{
+                f"vehicles_shard_{number}": statement_cache_usage(shard_engine)
+                for number, shard_engine in enumerate(shard_engines[1:], start=1)
+            },
+            "auth": statement_cache_usage(auth_engine),
+        },
+        "queries": [
+            {key: entry[key] for key in ("database", "fingerprint", "count", "compiles", "cache_hits")}
+            for entry in slow_query_log.summary(limit)
+        ],
+    }
+
+
+@router.get("/connection-hold")
+async def connection_hold_summary(
+    current_user: User = Depends(get_current_admin)
+):
+    """
+    Tempo de posse de conexões do pool (do checkout ao checkin) por banco e
+    por rota, desde o início do processo ou do último reset.
+    
+    **Requer JWT de administrador.**
+    """
+    return connection_hold.summary()
+
+
+@router.delete("/connection-hold", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_connection_hold(
+    current_user: User = Depends(get_current_admin)
+):
+    """
+    Zera o resumo de posse de conexões.
+    
+    **Requer JWT de administrador.**
+    """
+    connection_hold.reset()
@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
 from app.database import get_auth_db
-from app.schemas.schemas import UserCreate, UserLogin, UserResponse, Token
+from app.schemas.schemas import (
+    UserCreate, UserLogin, UserResponse, Token, UserBulkCreate, UserBulkResponse
+)
 from app.services.user_service import UserService
-from app.core.deps import get_current_user
+from app.core.deps import get_current_admin, get_current_user
+from app.core.config import settings
+from app.core.invalidation import InvalidationBus, get_invalidation_bus
+from app.core.sessions import EarlyReleaseRoute
+from app.core.throttle import LoginThrottle, client_address, get_login_throttle
 from app.models.user import User
 
-router = APIRouter()
+router = APIRouter(route_class=EarlyReleaseRoute)
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(
     user_in: UserCreate,
-    db: AsyncSession = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db),
+    bus: Optional[InvalidationBus] = Depends(get_invalidation_bus)
 ):
     """
     Registra um novo usuário no sistema.
@@ -22,23 +30,55 @@ async def register(
     - **password**: Senha (mínimo 6 caracteres)
     - **full_name**: Nome completo (opcional)
     """
-    service = UserService(db)
+    service = UserService(db, bus=bus)
     return await service.create_user(user_in)
 
 
+@router.post("/register/bulk", response_model=UserBulkResponse)
+async def register_bulk(
+    payload: UserBulkCreate,
+    db: AsyncSession = Depends(get_auth_db),
+    bus: Optional[InvalidationBus] = Depends(get_invalidation_bus),
+    current_user: User = Depends(get_current_admin)
+):
+    """
+    Registra vários usuários em uma única requisição (migração de contas).
+    
+    As senhas são hasheadas em paralelo e os emails já cadastrados não
+    interrompem o lote: cada linha volta como `created` (com o id) ou
+    `duplicate`, na ordem de envio.
+    
+    **Requer JWT de administrador.** Limite de USER_BULK_MAX_SIZE usuários.
+    """
+    if len(payload.users) > settings.USER_BULK_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo de {settings.USER_BULK_MAX_SIZE} usuários por lote"
+        )
+    service = UserService(db, bus=bus)
+    results = await service.create_users_bulk(payload.users)
+    created = sum(1 for result in results if result.status == "created")
+    return UserBulkResponse(created=created, duplicates=len(results) - created, results=results)
+
+
 @router.post("/login", response_model=Token)
 async def login(
     login_data: UserLogin,
-    db: AsyncSession = Depends(get_auth_db)
+    request: Request,
+    db: AsyncSession = Depends(get_auth_db),
+    throttle: Optional[LoginThrottle] = Depends(get_login_throttle)
 ):
     """
     Autentica um usuário e retorna um token JWT.
     
     Use o token retornado no header Authorization das próximas requisições:
     `Authorization: Bearer <token>`
+    
+    Excesso de tentativas com falha por email ou por cliente retorna **429**.
     """
-    service = UserService(db)
-    return await service.authenticate_user(login_data)
+    service = UserService(db, throttle=throttle)
+    client = client_address(request, settings.LOGIN_THROTTLE_TRUSTED_PROXIES)
+    return await service.authenticate_user(login_data, client=client)
 
 
 @router.get("/me", response_model=UserResponse)
@@ -1,19 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from app.database import get_db
-from app.schemas.schemas import VehicleCreate, VehicleResponse, VehicleUpdate
+from app.core.compression import ENCODINGS, body_etag, etag_matches
+from app.core.invalidation import InvalidationBus, get_invalidation_bus
+from app.core.sessions import EarlyReleaseRoute
+from app.core.sharding import ShardMap
+from app.database import get_db, get_session_factory, get_vehicle_shards
+from app.core.config import settings
+from app.schemas.schemas import (
+    VehicleBatchGet, VehicleBatchItem, VehicleBatchResponse, VehicleCatalogResponse,
+    VehicleCreate, VehicleReservation, VehicleResponse, VehicleUpdate
+)
 from app.services.vehicle_service import VehicleService
+from app.services.vehicle_export import (
+    EXTENSIONS, MEDIA_TYPES, ExportFormat, VehicleExporter, columnar_available
+)
+from app.services.price_index import AvailablePriceIndex, get_vehicle_price_index
+from app.services.vehicle_catalog import vehicle_catalog
+from app.services.vehicle_events import EventFilter, VehicleEventHub, get_vehicle_event_hub
+from app.services.write_batcher import VehicleWriteBatcher, get_vehicle_write_batcher
+from app.services.write_queue import VehicleWriteQueue, get_vehicle_write_queue
 from app.models.vehicle import VehicleStatus
 
-router = APIRouter()
+router = APIRouter(route_class=EarlyReleaseRoute)
+
+
+def _vehicle_etag(vehicle) -> str:
+    """
+    ETag forte de um veículo: id e versão da linha (só a versão se repetiria
+    entre veículos, e o cache de compressão é indexado pelo ETag)
+    """
+    return f'"{vehicle.id}-{vehicle.version}"'
+
+
+def _if_match_versions(if_match: Optional[str], vehicle_id: int) -> Optional[set[int]]:
+    """
+    Versões aceitas pelo If-Match (None = sem condição). A comparação é
+    forte: ETags fracas, de outro veículo ou desconhecidas não casam com
+    nenhuma versão. O sufixo de codificação posto pela compressão
+    (`"7-3-gzip"`) é aceito: a versão é a mesma.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = set()
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if len(tag) < 2 or tag[0] != '"' or tag[-1] != '"':
+            continue
+        tag_id, _, rest = tag[1:-1].partition("-")
+        version, _, encoding = rest.partition("-")
+        if tag_id == str(vehicle_id) and version.isdigit() and encoding in ("", *ENCODINGS):
+            versions.add(int(version))
+    return versions
 
 
 @router.post("/", response_model=VehicleResponse, status_code=status.HTTP_201_CREATED)
 async def create_vehicle(
     vehicle_in: VehicleCreate,
-    db: AsyncSession = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    shards: Optional[ShardMap] = Depends(get_vehicle_shards),
+    batcher: Optional[VehicleWriteBatcher] = Depends(get_vehicle_write_batcher),
+    price_index: Optional[AvailablePriceIndex] = Depends(get_vehicle_price_index),
+    bus: Optional[InvalidationBus] = Depends(get_invalidation_bus),
+    writer: Optional[VehicleWriteQueue] = Depends(get_vehicle_write_queue),
+    events: Optional[VehicleEventHub] = Depends(get_vehicle_event_hub)
 ):
     """
     Cadastra um novo veículo para venda.
@@ -24,40 +77,182 @@ async def create_vehicle(
     - **cor**: Cor do veículo
     - **preco**: Preço de venda (maior que 0)
     """
-    service = VehicleService(db)
-    return await service.create_vehicle(vehicle_in)
+    service = VehicleService(
+        db, batcher=batcher, price_index=price_index, bus=bus, shards=shards,
+        writer=writer, events=events
+    )
+    vehicle = await service.create_vehicle(vehicle_in)
+    response.headers["ETag"] = _vehicle_etag(vehicle)
+    return vehicle
 
 
 @router.get("/", response_model=List[VehicleResponse])
 async def list_vehicles(
     status: Optional[VehicleStatus] = None,
-    db: AsyncSession = Depends(get_db)
+    preco_min: Optional[float] = Query(None, ge=0),
+    preco_max: Optional[float] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    shards: Optional[ShardMap] = Depends(get_vehicle_shards),
+    price_index: Optional[AvailablePriceIndex] = Depends(get_vehicle_price_index)
 ):
     """
     Lista todos os veículos.
     
     - Se **status** for informado (DISPONIVEL ou VENDIDO), filtra por status.
+    - **preco_min** / **preco_max**: faixa de preço (inclusiva).
+    - **limit**: retorna só os N mais baratos.
     - Sempre ordenado por preço do mais barato para o mais caro.
+    
+    A resposta traz um ETag do conteúdo; com If-None-Match igual, retorna 304.
+    """
+    service = VehicleService(db, price_index=price_index, shards=shards)
+    body = await service.get_vehicles_json(status, preco_min, preco_max, limit)
+    etag = body_etag(body)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_vehicles(
+    format: ExportFormat = ExportFormat.CSV,
+    gzip: bool = False,
+    status: Optional[VehicleStatus] = None,
+    session_factory=Depends(get_session_factory),
+    shards: Optional[ShardMap] = Depends(get_vehicle_shards)
+):
+    """
+    Exporta o estoque completo em streaming.
+    
+    - **format**: csv (padrão), parquet ou arrow (Arrow IPC stream)
+    - **gzip**: comprime o arquivo (gzip) durante o envio
+    - **status**: filtra por status, como na listagem
+    
+    As linhas são lidas em blocos por um cursor do lado do servidor e
+    enviadas à medida que são codificadas (transferência chunked).
     """
-    service = VehicleService(db)
-    return await service.get_vehicles(status)
+    if format != ExportFormat.CSV and not columnar_available():
+        raise HTTPException(
+            status_code=501,
+            detail="Exportação em Parquet/Arrow requer o pacote pyarrow"
+        )
+    
+    filename = f"veiculos.{EXTENSIONS[format]}" + (".gz" if gzip else "")
+    exporter = VehicleExporter(session_factory, shards=shards)
+    return StreamingResponse(
+        exporter.export(format, status=status, gzip=gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/batch-get", response_model=VehicleBatchResponse)
+async def batch_get_vehicles(
+    payload: VehicleBatchGet,
+    db: AsyncSession = Depends(get_db),
+    shards: Optional[ShardMap] = Depends(get_vehicle_shards)
+):
+    """
+    Busca vários veículos por id em uma única requisição e consulta.
+    
+    Os resultados vêm na ordem dos ids enviados (repetições incluídas);
+    ids inexistentes voltam com `found: false` e `vehicle: null`.
+    Limite de VEHICLE_BATCH_GET_MAX_IDS ids por requisição.
+    """
+    if len(payload.ids) > settings.VEHICLE_BATCH_GET_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo de {settings.VEHICLE_BATCH_GET_MAX_IDS} ids por lote"
+        )
+    service = VehicleService(db, shards=shards)
+    found = await service.get_vehicles_by_ids(payload.ids)
+    results = [
+        VehicleBatchItem(id=vehicle_id, found=vehicle_id in found, vehicle=found.get(vehicle_id))
+        for vehicle_id in payload.ids
+    ]
+    hits = sum(1 for result in results if result.found)
+    return VehicleBatchResponse(found=hits, missing=len(results) - hits, results=results)
+
+
+@router.get("/catalog", response_model=VehicleCatalogResponse)
+async def get_catalog(
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Marcas e modelos cadastrados, com os ids usados internamente.
+    
+    Nomes são comparados sem diferenciar maiúsculas nem espaços extras: um
+    cadastro com "toyota" usa a marca "Toyota" já existente. O corpo fica
+    em cache por VEHICLE_CATALOG_MAX_AGE_SECONDS; com If-None-Match igual
+    ao ETag, retorna 304.
+    """
+    body = await vehicle_catalog.catalog_json(db)
+    headers = {
+        "ETag": body_etag(body),
+        "Cache-Control": f"public, max-age={settings.VEHICLE_CATALOG_MAX_AGE_SECONDS}",
+    }
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def vehicle_events(
+    status: Optional[VehicleStatus] = None,
+    marca: Optional[str] = None,
+    preco_max: Optional[float] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None),
+    events: Optional[VehicleEventHub] = Depends(get_vehicle_event_hub)
+):
+    """
+    Stream (Server-Sent Events) de cadastros, edições e remoções de veículos.
+    
+    - **status** / **marca** / **preco_max**: cadastros só chegam se casarem
+      com todos os filtros; edições, se casarem com a marca; remoções sempre.
+    - **Last-Event-ID**: retoma a partir do último evento recebido. Se ele
+      não puder ser retomado, chega um evento `reset` e o cliente deve
+      recarregar a listagem.
+    
+    Conexões que não acompanham o ritmo dos eventos são encerradas.
+    """
+    if events is None:
+        raise HTTPException(status_code=404, detail="Stream de eventos desativado")
+    if events.full:
+        raise HTTPException(
+            status_code=503,
+            detail="Limite de conexões de eventos atingido"
+        )
+    subscriber = events.subscribe(EventFilter(status, marca, preco_max), last_event_id)
+    return StreamingResponse(
+        events.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{vehicle_id}", response_model=VehicleResponse)
 async def get_vehicle(
     vehicle_id: int,
-    db: AsyncSession = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    shards: Optional[ShardMap] = Depends(get_vehicle_shards)
 ):
     """
     Busca um veículo pelo ID.
+    
+    O ETag da resposta identifica a versão atual do veículo (use-o no If-Match do PUT).
     """
-    service = VehicleService(db)
+    service = VehicleService(db, shards=shards)
     vehicle = await service.get_vehicle(vehicle_id)
     if not vehicle:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Veículo não encontrado"
         )
+    response.headers["ETag"] = _vehicle_etag(vehicle)
     return vehicle
 
 
@@ -65,32 +260,121 @@ async def get_vehicle(
 async def update_vehicle(
     vehicle_id: int,
     vehicle_in: VehicleUpdate,
-    db: AsyncSession = Depends(get_db)
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    shards: Optional[ShardMap] = Depends(get_vehicle_shards),
+    batcher: Optional[VehicleWriteBatcher] = Depends(get_vehicle_write_batcher),
+    price_index: Optional[AvailablePriceIndex] = Depends(get_vehicle_price_index),
+    bus: Optional[InvalidationBus] = Depends(get_invalidation_bus),
+    writer: Optional[VehicleWriteQueue] = Depends(get_vehicle_write_queue),
+    events: Optional[VehicleEventHub] = Depends(get_vehicle_event_hub)
 ):
     """
     Edita os dados de um veículo.
     
     Todos os campos são opcionais. Informe apenas os que deseja atualizar.
+    
+    Com **If-Match** (ETag de uma leitura anterior), a edição só é gravada se
+    o veículo não mudou desde então; senão retorna 412 e nada é alterado.
     """
-    service = VehicleService(db)
-    vehicle = await service.update_vehicle(vehicle_id, vehicle_in)
+    service = VehicleService(
+        db, batcher=batcher, price_index=price_index, bus=bus, shards=shards,
+        writer=writer, events=events
+    )
+    vehicle = await service.update_vehicle(vehicle_id, vehicle_in, _if_match_versions(if_match, vehicle_id))
     if not vehicle:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Veículo não encontrado"
         )
+    response.headers["ETag"] = _vehicle_etag(vehicle)
+    return vehicle
+
+
+@router.post("/{vehicle_id}/reserve", response_model=VehicleReservation)
+async def reserve_vehicle(
+    vehicle_id: int,
+    response: Response,
+    ttl_seconds: int = Query(
+        settings.VEHICLE_RESERVATION_TTL_SECONDS, ge=1, le=settings.VEHICLE_RESERVATION_MAX_SECONDS
+    ),
+    db: AsyncSession = Depends(get_db),
+    shards: Optional[ShardMap] = Depends(get_vehicle_shards),
+    price_index: Optional[AvailablePriceIndex] = Depends(get_vehicle_price_index),
+    bus: Optional[InvalidationBus] = Depends(get_invalidation_bus),
+    writer: Optional[VehicleWriteQueue] = Depends(get_vehicle_write_queue),
+    events: Optional[VehicleEventHub] = Depends(get_vehicle_event_hub)
+):
+    """
+    Reserva um veículo disponível por **ttl_seconds** (ex: durante o pagamento).
+    
+    Retorna o **reserva_id**, exigido para concluir a venda enquanto a
+    reserva vale. Se o veículo já estiver vendido ou reservado, retorna 409.
+    """
+    service = VehicleService(
+        db, price_index=price_index, bus=bus, shards=shards,
+        writer=writer, events=events
+    )
+    vehicle = await service.reserve_vehicle(vehicle_id, ttl_seconds)
+    if not vehicle:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Veículo não encontrado"
+        )
+    response.headers["ETag"] = _vehicle_etag(vehicle)
+    return vehicle
+
+
+@router.post("/{vehicle_id}/sell", response_model=VehicleResponse)
+async def sell_vehicle(
+    vehicle_id: int,
+    response: Response,
+    reserva_id: Optional[str] = Query(None, max_length=32),
+    db: AsyncSession = Depends(get_db),
+    shards: Optional[ShardMap] = Depends(get_vehicle_shards),
+    price_index: Optional[AvailablePriceIndex] = Depends(get_vehicle_price_index),
+    bus: Optional[InvalidationBus] = Depends(get_invalidation_bus),
+    writer: Optional[VehicleWriteQueue] = Depends(get_vehicle_write_queue),
+    events: Optional[VehicleEventHub] = Depends(get_vehicle_event_hub)
+):
+    """
+    Marca um veículo disponível como VENDIDO de forma atômica.
+    
+    Com vários compradores simultâneos, exatamente um recebe 200; os demais
+    recebem 409 imediatamente. Veículo reservado exige o **reserva_id**.
+    """
+    service = VehicleService(
+        db, price_index=price_index, bus=bus, shards=shards,
+        writer=writer, events=events
+    )
+    vehicle = await service.sell_vehicle(vehicle_id, reserva_id)
+    if not vehicle:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Veículo não encontrado"
+        )
+    response.headers["ETag"] = _vehicle_etag(vehicle)
     return vehicle
 
 
 @router.delete("/{vehicle_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_vehicle(
     vehicle_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    shards: Optional[ShardMap] = Depends(get_vehicle_shards),
+    price_index: Optional[AvailablePriceIndex] = Depends(get_vehicle_price_index),
+    bus: Optional[InvalidationBus] = Depends(get_invalidation_bus),
+    writer: Optional[VehicleWriteQueue] = Depends(get_vehicle_write_queue),
+    events: Optional[VehicleEventHub] = Depends(get_vehicle_event_hub)
 ):
     """
     Remove um veículo do sistema.
     """
-    service = VehicleService(db)
+    service = VehicleService(
+        db, price_index=price_index, bus=bus, shards=shards,
+        writer=writer, events=events
+    )
     success = await service.delete_vehicle(vehicle_id)
     if not success:
         raise HTTPException(
@@ -3,7 +3,14 @@ from app.schemas.schemas import (
     VehicleCreate,
     VehicleUpdate,
     VehicleResponse,
+    VehicleBatchGet,
+    VehicleBatchItem,
+    VehicleBatchResponse,
+    VehicleReservation,
     UserCreate,
+    UserBulkCreate,
+    UserBulkResult,
+    UserBulkResponse,
     UserLogin,
     UserResponse,
     Token,
@@ -15,7 +22,14 @@ __all__ = [
     "VehicleCreate",
     "VehicleUpdate",
     "VehicleResponse",
+    "VehicleBatchGet",
+    "VehicleBatchItem",
+    "VehicleBatchResponse",
+    "VehicleReservation",
     "UserCreate",
+    "UserBulkCreate",
+    "UserBulkResult",
+    "UserBulkResponse",
     "UserLogin",
     "UserResponse",
     "Token",
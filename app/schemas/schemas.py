@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 from app.models.vehicle import VehicleStatus
 
@@ -39,6 +39,43 @@ class VehicleResponse(VehicleBase):
         from_attributes = True
 
 
+class VehicleBatchGet(BaseModel):
+    """Ids a buscar de uma vez (a resposta segue a mesma ordem)"""
+    ids: List[int] = Field(..., min_length=1)
+
+
+class VehicleBatchItem(BaseModel):
+    """Resultado de um id do lote: vehicle é null quando found é false"""
+    id: int
+    found: bool
+    vehicle: Optional[VehicleResponse] = None
+
+
+class VehicleBatchResponse(BaseModel):
+    """Schema de resposta para busca em lote"""
+    found: int
+    missing: int
+    results: List[VehicleBatchItem]
+
+
+class VehicleReservation(VehicleResponse):
+    """Veículo reservado: reserva_id é exigido na venda até reservado_ate"""
+    reserva_id: str
+    reservado_ate: datetime
+
+
+class CatalogEntry(BaseModel):
+    """Marca ou modelo do catálogo"""
+    id: int
+    nome: str
+
+
+class VehicleCatalogResponse(BaseModel):
+    """Catálogo de marcas e modelos cadastrados (ordem alfabética)"""
+    marcas: List[CatalogEntry]
+    modelos: List[CatalogEntry]
+
+
 # ============ User Schemas ============
 
 class UserCreate(BaseModel):
@@ -48,6 +85,25 @@ class UserCreate(BaseModel):
     full_name: Optional[str] = None
 
 
+class UserBulkCreate(BaseModel):
+    """Schema para cadastro de usuários em lote"""
+    users: List[UserCreate] = Field(..., min_length=1)
+
+
+class UserBulkResult(BaseModel):
+    """Resultado de uma linha do lote, na ordem de envio"""
+    email: str
+    status: Literal["created", "duplicate"]
+    id: Optional[int] = None
+
+
+class UserBulkResponse(BaseModel):
+    """Schema de resposta para cadastro em lote"""
+    created: int
+    duplicates: int
+    results: List[UserBulkResult]
+
+
 class UserLogin(BaseModel):
     """Schema para login"""
     email: EmailStr
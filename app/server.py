@@ -0,0 +1,163 @@
+"""
+Entry point de produção: `python -m app.server`.
+
+Sobe o app com vários workers, em número calculado a partir da cota de CPU
+do cgroup do container (e não dos núcleos do host). Usa uvloop e httptools
+quando instalados. Com o gunicorn disponível, o app é pré-carregado no
+processo mestre e cada worker é reciclado após SERVER_MAX_REQUESTS
+requisições (com jitter) para limitar o crescimento de memória.
+"""
+import argparse
+import importlib.util
+import math
+import os
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+
+APP_PATH = "app.main:app"
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """
+    Cota de CPU do container em núcleos (ex: 0.5 para um limite de 500m),
+    ou None quando não há limite. Suporta cgroup v2 (cpu.max) e v1
+    (cpu.cfs_quota_us / cpu.cfs_period_us).
+    """
+    cpu_max = root / "cpu.max"
+    if cpu_max.exists():
+        quota, _, period = cpu_max.read_text().strip().partition(" ")
+        if quota == "max":
+            return None
+        return int(quota) / int(period or 100000)
+
+    for base in (root / "cpu,cpuacct", root / "cpu"):
+        quota_file = base / "cpu.cfs_quota_us"
+        period_file = base / "cpu.cfs_period_us"
+        if quota_file.exists() and period_file.exists():
+            quota = int(quota_file.read_text().strip())
+            if quota <= 0:
+                return None
+            return quota / int(period_file.read_text().strip())
+    return None
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(root: Path = CGROUP_ROOT) -> int:
+    """
+    WEB_CONCURRENCY, se definido; senão a cota do cgroup arredondada para
+    baixo (mínimo 1), limitada aos núcleos realmente visíveis.
+    """
+    if settings.WEB_CONCURRENCY:
+        return settings.WEB_CONCURRENCY
+    cpus = available_cpus()
+    limit = cgroup_cpu_limit(root)
+    if limit is None:
+        return cpus
+    return max(1, min(cpus, math.floor(limit)))
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def event_loop() -> str:
+    return "uvloop" if _installed("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if _installed("httptools") else "h11"
+
+
+if _installed("gunicorn"):
+    from uvicorn.workers import UvicornWorker
+
+    class VehicleUvicornWorker(UvicornWorker):
+        """Worker do gunicorn com o loop e o parser HTTP mais rápidos disponíveis"""
+        CONFIG_KWARGS = {"loop": event_loop(), "http": http_protocol(), "lifespan": "on"}
+
+
+def server_config(host: str, port: int, workers: int) -> dict:
+    return {
+        "app": APP_PATH,
+        "host": host,
+        "port": port,
+        "workers": workers,
+        "cpu_limit": cgroup_cpu_limit(),
+        "loop": event_loop(),
+        "http": http_protocol(),
+        "server": "gunicorn" if _installed("gunicorn") else "uvicorn",
+        "preload_app": settings.SERVER_PRELOAD_APP,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+    }
+
+
+def _run_gunicorn(config: dict) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{config['host']}:{config['port']}",
+                "workers": config["workers"],
+                "worker_class": "app.server.VehicleUvicornWorker",
+                "preload_app": config["preload_app"],
+                "max_requests": config["max_requests"],
+                "max_requests_jitter": config["max_requests_jitter"],
+                "graceful_timeout": config["graceful_timeout"],
+                "timeout": config["graceful_timeout"] * 2,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    Application().run()
+
+
+def _run_uvicorn(config: dict) -> None:
+    import uvicorn
+
+    uvicorn.run(
+        config["app"],
+        host=config["host"],
+        port=config["port"],
+        workers=config["workers"],
+        loop=config["loop"],
+        http=config["http"],
+        timeout_graceful_shutdown=config["graceful_timeout"],
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Servidor de produção da Vehicle Management API")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, help="sobrescreve o cálculo pela cota de CPU")
+    args = parser.parse_args(argv)
+
+    config = server_config(args.host, args.port, args.workers or worker_count())
+    print("Configuração do servidor: " + ", ".join(f"{k}={v}" for k, v in config.items()), flush=True)
+
+    if config["server"] == "gunicorn":
+        _run_gunicorn(config)
+    else:
+        # Sem gunicorn não há pré-carga nem reciclagem: o supervisor do
+        # uvicorn não repõe workers encerrados por limite de requisições
+        _run_uvicorn(config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import logging
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import asc, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.invalidation import InvalidationEvent
+from app.core.sharding import ShardMap
+from app.database import AsyncSessionLocal, vehicle_shards
+from app.models.vehicle import Vehicle, VehicleStatus
+from app.schemas.schemas import VehicleResponse
+from app.services.vehicle_catalog import vehicle_catalog
+
+logger = logging.getLogger(__name__)
+
+_vehicle_adapter = TypeAdapter(VehicleResponse)
+
+
+def _vehicle_json(vehicle: Vehicle) -> bytes:
+    # marca/modelo são propriedades (catálogo): o dump direto do objeto ORM não as vê
+    return _vehicle_adapter.dump_json(_vehicle_adapter.validate_python(vehicle, from_attributes=True))
+
+
+# Linhas lidas por bloco durante a carga
+LOAD_BATCH_SIZE = 5000
+
+
+class AvailablePriceIndex:
+    """
+    Índice em memória dos veículos DISPONIVEL ordenados por (preço, id).
+
+    Preços e ids ficam em dois arrays paralelos (8 bytes por entrada cada)
+    e cada veículo guarda o seu JSON já serializado; listagem, top-N e
+    faixa de preço são respondidas com bisect em O(log n + k), sem
+    ordenar nem serializar nada por requisição.
+
+    O índice é carregado na inicialização e mantido pelas escritas do
+    VehicleService desta réplica. Escritas de outras réplicas não chegam
+    aqui, então ele expira após max_age segundos (ou ao ser invalidado):
+    enquanto frio ou expirado, `usable()` devolve False, o chamador usa o
+    SQL e uma recarga é agendada em segundo plano.
+
+    Com `shards`, a carga lê todos os shards em paralelo e intercala as
+    listas já ordenadas de cada um.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = AsyncSessionLocal,
+        max_age: float = 60.0,
+        shards: Optional[ShardMap] = None,
+    ):
+        self.session_factory = session_factory
+        self.shards = shards
+        self.max_age = max_age
+        self._prices = array("d")
+        self._ids = array("q")
+        self._entries: dict[int, tuple[float, bytes]] = {}
+        self._loaded_at: Optional[float] = None
+        self._reload: Optional[asyncio.Task] = None
+        # Escritas ocorridas durante uma recarga, reaplicadas sobre o novo snapshot
+        self._pending: Optional[list[tuple[int, Optional[float], Optional[bytes]]]] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded_at is not None
+
+    @property
+    def fresh(self) -> bool:
+        return self.ready and time.monotonic() - self._loaded_at <= self.max_age
+
+    @property
+    def _session_factories(self) -> list[sessionmaker]:
+        return [self.session_factory] if self.shards is None else self.shards.session_factories
+
+    def usable(self) -> bool:
+        """Indica se o índice pode responder; se não, agenda uma recarga"""
+        if self.fresh:
+            return True
+        if self._reload is None or self._reload.done():
+            self._reload = asyncio.ensure_future(self._background_load())
+        return False
+
+    def invalidate(self) -> None:
+        """Marca o índice como expirado (ex: escrita em outra réplica)"""
+        self._loaded_at = None
+
+    async def _background_load(self) -> None:
+        try:
+            await self.load()
+        except Exception:
+            logger.exception("Falha ao recarregar o índice de preços")
+
+    async def load(self) -> None:
+        """Carrega todos os veículos DISPONIVEL já na ordem (preço, id)"""
+        self._pending = []
+        try:
+            per_shard = await asyncio.gather(
+                *(self._load_rows(factory) for factory in self._session_factories)
+            )
+            rows = per_shard[0] if len(per_shard) == 1 else heapq.merge(*per_shard)
+            prices, ids, entries = array("d"), array("q"), {}
+            for preco, vehicle_id, payload in rows:
+                prices.append(preco)
+                ids.append(vehicle_id)
+                entries[vehicle_id] = (preco, payload)
+            pending = self._pending
+            self._prices, self._ids, self._entries = prices, ids, entries
+            for vehicle_id, preco, payload in pending:
+                self._apply(vehicle_id, preco, payload)
+            self._loaded_at = time.monotonic()
+        finally:
+            self._pending = None
+
+    async def _load_rows(self, session_factory: sessionmaker) -> list[tuple[float, int, bytes]]:
+        """(preço, id, JSON) dos disponíveis de um banco, na ordem (preço, id)"""
+        rows = []
+        async with session_factory() as session:
+            result = await session.stream_scalars(
+                select(Vehicle)
+                .where(Vehicle.status == VehicleStatus.DISPONIVEL)
+                .order_by(asc(Vehicle.preco), asc(Vehicle.id))
+                .execution_options(yield_per=LOAD_BATCH_SIZE)
+            )
+            async for vehicles in result.partitions():
+                await vehicle_catalog.ensure_from(self._session_factories[0], vehicles)
+                for vehicle in vehicles:
+                    rows.append((vehicle.preco, vehicle.id, _vehicle_json(vehicle)))
+        return rows
+
+    def upsert(self, vehicle: Vehicle) -> None:
+        """Reflete um veículo gravado: entra (ou é reposicionado) se DISPONIVEL, sai caso contrário"""
+        if vehicle.status == VehicleStatus.DISPONIVEL:
+            self._record(vehicle.id, vehicle.preco, _vehicle_json(vehicle))
+        else:
+            self._record(vehicle.id, None, None)
+
+    def discard(self, vehicle_id: int) -> None:
+        self._record(vehicle_id, None, None)
+
+    async def refresh(self, events: list[InvalidationEvent]) -> None:
+        """
+        Handler do barramento de invalidação: relê do banco os veículos
+        alterados em outra réplica e atualiza as suas posições.
+        """
+        if not self.ready:
+            return
+        ids = {event.id for event in events}
+        if self.shards is None:
+            groups = {0: list(ids)}
+        else:
+            groups = self.shards.group_by_shard(ids)
+        for shard, shard_ids in groups.items():
+            async with self._session_factories[shard]() as session:
+                result = await session.execute(select(Vehicle).where(Vehicle.id.in_(shard_ids)))
+                vehicles = result.scalars().all()
+                await vehicle_catalog.ensure_from(self._session_factories[0], vehicles)
+                for vehicle in vehicles:
+                    self.upsert(vehicle)
+                    ids.discard(vehicle.id)
+        # Removidos ou movidos para o arquivo
+        for vehicle_id in ids:
+            self.discard(vehicle_id)
+
+    def _record(self, vehicle_id: int, preco: Optional[float], payload: Optional[bytes]) -> None:
+        if self._pending is not None:
+            self._pending.append((vehicle_id, preco, payload))
+        self._apply(vehicle_id, preco, payload)
+
+    def _position(self, vehicle_id: int, preco: float) -> int:
+        """Posição de (preço, id) entre os empates de preço, ordenados por id"""
+        lo = bisect_left(self._prices, preco)
+        hi = bisect_right(self._prices, preco, lo)
+        return bisect_left(self._ids, vehicle_id, lo, hi)
+
+    def _apply(self, vehicle_id: int, preco: Optional[float], payload: Optional[bytes]) -> None:
+        previous = self._entries.pop(vehicle_id, None)
+        if previous is not None:
+            position = self._position(vehicle_id, previous[0])
+            del self._prices[position]
+            del self._ids[position]
+        if preco is None:
+            return
+        position = self._position(vehicle_id, preco)
+        self._prices.insert(position, preco)
+        self._ids.insert(position, vehicle_id)
+        self._entries[vehicle_id] = (preco, payload)
+
+    def query(
+        self,
+        preco_min: Optional[float] = None,
+        preco_max: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> list[bytes]:
+        """JSON dos veículos com preço em [preco_min, preco_max], mais baratos primeiro"""
+        lo = 0 if preco_min is None else bisect_left(self._prices, preco_min)
+        hi = len(self._prices) if preco_max is None else bisect_right(self._prices, preco_max)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return [self._entries[vehicle_id][1] for vehicle_id in self._ids[lo:hi]]
+
+    def query_json(
+        self,
+        preco_min: Optional[float] = None,
+        preco_max: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> bytes:
+        """Mesmo corpo que a listagem via SQL serializaria"""
+        return b"[" + b",".join(self.query(preco_min, preco_max, limit)) + b"]"
+
+
+vehicle_price_index = AvailablePriceIndex(
+    max_age=settings.VEHICLE_PRICE_INDEX_MAX_AGE_SECONDS,
+    shards=vehicle_shards,
+)
+
+
+def get_vehicle_price_index() -> Optional[AvailablePriceIndex]:
+    """Dependency: retorna o índice quando VEHICLE_PRICE_INDEX_ENABLED estiver ativo"""
+    if not settings.VEHICLE_PRICE_INDEX_ENABLED:
+        return None
+    return vehicle_price_index
@@ -1,60 +1,188 @@
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import lambda_stmt, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.future import select
 from fastapi import HTTPException, status
 
 from app.models.user import User
-from app.schemas.schemas import UserCreate, UserLogin
-from app.core.security import get_password_hash, verify_password, create_access_token
+from app.schemas.schemas import UserCreate, UserLogin, UserBulkResult
+from app.core.security import (
+    get_password_hash,
+    hash_passwords,
+    verify_password,
+    create_access_token,
+    password_needs_rehash,
+)
+from app.core.invalidation import InvalidationBus
+from app.core.sessions import release_session
+from app.core.throttle import LoginThrottle
+
+logger = logging.getLogger(__name__)
+
+# Linhas por INSERT multi-linha (5 parâmetros por linha, abaixo do limite do SQLite)
+BULK_INSERT_CHUNK_SIZE = 1000
+
+# Regravações de hash em andamento (referência forte até terminarem)
+_rehash_tasks: set[asyncio.Task] = set()
+
+
+async def _rehash_password(engine: AsyncEngine, user_id: int, password: str, old_hash: str) -> None:
+    """
+    Regrava o hash com o custo BCrypt atual, fora do caminho da requisição.
+    Só altera a linha se o hash ainda for o antigo (não sobrescreve uma
+    troca de senha concorrente).
+    """
+    try:
+        new_hash = await asyncio.to_thread(get_password_hash, password)
+        async with AsyncSession(engine) as session:
+            await session.execute(
+                update(User)
+                .where(User.id == user_id, User.hashed_password == old_hash)
+                .values(hashed_password=new_hash)
+            )
+            await session.commit()
+    except Exception:
+        logger.exception("Falha ao regravar hash de senha do usuário %s", user_id)
 
 
 class UserService:
     """Serviço para autenticação de usuários"""
     
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        throttle: Optional[LoginThrottle] = None,
+        bus: Optional[InvalidationBus] = None,
+    ):
         self.db = db
+        self.throttle = throttle
+        self.bus = bus
 
     async def create_user(self, user_in: UserCreate) -> User:
         """Registra um novo usuário"""
-        # Verifica se email já existe
-        result = await self.db.execute(
-            select(User).where(User.email == user_in.email)
-        )
-        existing_user = result.scalar_one_or_none()
+        # Hash fora do loop de eventos; a unicidade do email fica a cargo do
+        # INSERT ... ON CONFLICT, sem consulta prévia sujeita a corrida
+        hashed_password = await asyncio.to_thread(get_password_hash, user_in.password)
+        created = await self._insert_users([
+            self._user_row(user_in, hashed_password)
+        ])
         
-        if existing_user:
+        if user_in.email not in created:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email já cadastrado"
             )
         
-        # Cria usuário com senha hasheada
-        user = User(
-            email=user_in.email,
-            hashed_password=get_password_hash(user_in.password),
-            full_name=user_in.full_name
+        return await self.get_user_by_id(created[user_in.email])
+
+    async def create_users_bulk(self, users_in: list[UserCreate]) -> list[UserBulkResult]:
+        """
+        Registra vários usuários de uma vez.
+        
+        As senhas são hasheadas em paralelo num pool de processos e as linhas
+        inseridas com INSERT multi-linha ... ON CONFLICT (email) DO NOTHING.
+        Emails já cadastrados (ou repetidos no próprio lote) são reportados
+        como duplicados, na mesma ordem do envio.
+        """
+        unique: dict[str, UserCreate] = {}
+        for user_in in users_in:
+            unique.setdefault(user_in.email, user_in)
+        
+        hashes = await hash_passwords([user_in.password for user_in in unique.values()])
+        created = await self._insert_users([
+            self._user_row(user_in, hashed_password)
+            for user_in, hashed_password in zip(unique.values(), hashes)
+        ])
+        
+        results = []
+        for user_in in users_in:
+            # Só a primeira ocorrência de um email criado recebe o id
+            user_id = created.pop(user_in.email, None)
+            results.append(UserBulkResult(
+                email=user_in.email,
+                status="created" if user_id is not None else "duplicate",
+                id=user_id,
+            ))
+        return results
+
+    @staticmethod
+    def _user_row(user_in: UserCreate, hashed_password: str) -> dict:
+        return {
+            "email": user_in.email,
+            "hashed_password": hashed_password,
+            "full_name": user_in.full_name,
+            "is_active": True,
+            "is_admin": False,
+            "created_at": datetime.utcnow(),
+        }
+
+    async def _insert_users(self, rows: list[dict]) -> dict[str, int]:
+        """
+        INSERT ... ON CONFLICT (email) DO NOTHING RETURNING id, email.
+        Retorna {email: id} só das linhas efetivamente criadas.
+        """
+        dialect_insert = (
+            postgresql.insert if self.db.bind.dialect.name == "postgresql" else sqlite.insert
         )
-        self.db.add(user)
+        created: dict[str, int] = {}
+        for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+            stmt = (
+                dialect_insert(User)
+                .values(rows[start:start + BULK_INSERT_CHUNK_SIZE])
+                .on_conflict_do_nothing(index_elements=[User.email])
+                .returning(User.id, User.email)
+            )
+            result = await self.db.execute(stmt)
+            created.update({email: user_id for user_id, email in result.all()})
         await self.db.commit()
-        await self.db.refresh(user)
-        return user
+        
+        if self.bus is not None:
+            for user_id in created.values():
+                self.bus.publish("user", user_id)
+        return created
 
-    async def authenticate_user(self, login_data: UserLogin) -> dict:
+    async def authenticate_user(self, login_data: UserLogin, client: Optional[str] = None) -> dict:
         """
         Autentica usuário e retorna token JWT.
         
         Args:
             login_data: Credenciais de login (email, password)
+            client: Identificação do cliente (IP) para o limite de tentativas
             
         Returns:
             Token JWT
             
         Raises:
-            HTTPException: Se credenciais inválidas
+            HTTPException: Se credenciais inválidas ou excesso de tentativas (429)
         """
+        if self.throttle is None:
+            return await self._authenticate(login_data)
+        
+        # Rejeita antes de qualquer consulta ao banco ou verificação BCrypt;
+        # a tentativa fica reservada e só conta se terminar em 401
+        await self.throttle.acquire(login_data.email, client)
+        failed = False
+        try:
+            return await self._authenticate(login_data)
+        except HTTPException as exc:
+            failed = exc.status_code == status.HTTP_401_UNAUTHORIZED
+            raise
+        finally:
+            if not failed:
+                await self.throttle.release(login_data.email, client)
+
+    async def _authenticate(self, login_data: UserLogin) -> dict:
+        email = login_data.email
         result = await self.db.execute(
-            select(User).where(User.email == login_data.email)
+            lambda_stmt(lambda: select(User).where(User.email == email))
         )
         user = result.scalar_one_or_none()
+        # Nada mais é lido: a conexão volta ao pool antes da verificação BCrypt
+        await release_session(self.db)
         
         if not user:
             raise HTTPException(
@@ -74,6 +202,14 @@ class UserService:
                 detail="Usuário inativo"
             )
         
+        # Custo BCrypt fora da faixa configurada: regrava em segundo plano
+        if password_needs_rehash(user.hashed_password):
+            task = asyncio.create_task(_rehash_password(
+                self.db.bind, user.id, login_data.password, user.hashed_password
+            ))
+            _rehash_tasks.add(task)
+            task.add_done_callback(_rehash_tasks.discard)
+        
         # Gera token JWT
         access_token = create_access_token(data={"sub": str(user.id)})
         
@@ -85,6 +221,6 @@ class UserService:
     async def get_user_by_id(self, user_id: int) -> User | None:
         """Busca usuário por ID"""
         result = await self.db.execute(
-            select(User).where(User.id == user_id)
+            lambda_stmt(lambda: select(User).where(User.id == user_id))
         )
         return result.scalar_one_or_none()
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models.vehicle import Vehicle, VehicleArchive, VehicleStatus
+from app.services.vehicle_service import VEHICLE_FIELDS
+
+if TYPE_CHECKING:
+    from app.services.write_queue import VehicleWriteQueue
+
+logger = logging.getLogger(__name__)
+
+
+class VehicleArchiver:
+    """
+    Move veículos VENDIDO da tabela quente `vehicles` para `vehicles_archive`.
+
+    Cada lote (até batch_size linhas) é copiado e removido na mesma transação,
+    então um veículo nunca fica visível nas duas tabelas nem em nenhuma.
+    Em segundo plano, roda a cada interval_seconds até esvaziar os vendidos.
+
+    Com `writer` (fila do escritor único do SQLite), cada lote é uma escrita
+    da fila, na conexão do escritor, e não disputa o lock do banco com ele.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = AsyncSessionLocal,
+        batch_size: int = 500,
+        interval_seconds: float = 300.0,
+        writer: Optional["VehicleWriteQueue"] = None,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.writer = writer
+        self._task: Optional[asyncio.Task] = None
+
+    async def archive_batch(self) -> int:
+        """Arquiva um lote de vendidos. Retorna quantos veículos foram movidos."""
+        if self.writer is not None:
+            return await self.writer.run(self._archive_batch)
+        async with self.session_factory() as session:
+            return await self._archive_batch(session)
+
+    async def _archive_batch(self, session: AsyncSession) -> int:
+        async with session.begin():
+            ids = (await session.scalars(
+                select(Vehicle.id)
+                .where(Vehicle.status == VehicleStatus.VENDIDO)
+                .order_by(Vehicle.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not ids:
+                return 0
+
+            source = select(*(Vehicle.__table__.c[name] for name in VEHICLE_FIELDS))
+            await session.execute(
+                insert(VehicleArchive).from_select(
+                    VEHICLE_FIELDS, source.where(Vehicle.id.in_(ids))
+                )
+            )
+            await session.execute(
+                delete(Vehicle).where(Vehicle.id.in_(ids)),
+                execution_options={"synchronize_session": False},
+            )
+        return len(ids)
+
+    async def archive_all(self) -> int:
+        """Arquiva lotes até não restarem vendidos na tabela quente"""
+        total = 0
+        while True:
+            moved = await self.archive_batch()
+            total += moved
+            if moved < self.batch_size:
+                return total
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                moved = await self.archive_all()
+                if moved:
+                    logger.info("Arquivados %d veículos vendidos", moved)
+            except Exception:
+                logger.exception("Falha ao arquivar veículos vendidos")
+            await asyncio.sleep(self.interval_seconds)
+
+
+vehicle_archiver = VehicleArchiver(
+    batch_size=settings.VEHICLE_ARCHIVE_BATCH_SIZE,
+    interval_seconds=settings.VEHICLE_ARCHIVE_INTERVAL_SECONDS,
+)
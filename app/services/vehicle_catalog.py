@@ -0,0 +1,233 @@
+"""
+Catálogo de marcas e modelos (codificação por dicionário).
+
+Os veículos guardam marca_id/modelo_id em vez dos nomes repetidos em cada
+linha: a tabela e os índices ficam menores e comparações são entre
+inteiros. Os nomes ficam nas tabelas `marcas` e `modelos` e em dois
+dicionários em memória (app/models/catalog.py), de modo que VehicleCreate e
+VehicleResponse continuam com marca/modelo por nome.
+
+Nomes são normalizados (espaços colapsados, casefold): "toyota" é a mesma
+marca que "Toyota" e é exibida com a grafia do primeiro cadastro. Entradas
+do catálogo nunca mudam de id nem são apagadas, então cada réplica só
+precisa buscar no banco os ids que ainda não conhece.
+
+O catálogo fica no shard 0 (DATABASE_URL), inclusive para veículos de
+outros shards: toda operação recebe uma sessão do shard 0.
+"""
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.catalog import Marca, Modelo, catalog_key, marcas, modelos
+from app.models.vehicle import Vehicle, VehicleArchive
+from app.schemas.schemas import CatalogEntry, VehicleCatalogResponse
+
+# Campo da API -> tabela e dicionário
+_FIELDS = (("marca", Marca, marcas), ("modelo", Modelo, modelos))
+
+
+class VehicleCatalog:
+    """
+    Tradução nome <-> id de marcas e modelos, cadastrando nomes novos sob
+    demanda, e o corpo JSON do catálogo (GET /vehicles/catalog) em cache.
+    """
+
+    def __init__(self, max_age: float = 300.0):
+        self.max_age = max_age
+        self._body: Optional[bytes] = None
+        self._loaded_at: Optional[float] = None
+
+    async def load(self, session: AsyncSession) -> None:
+        """Carrega o catálogo inteiro (tabelas pequenas) nos dicionários"""
+        for _, model, dictionary in _FIELDS:
+            result = await session.execute(select(model.id, model.chave, model.nome))
+            for entry_id, chave, nome in result:
+                dictionary.add(entry_id, chave, nome)
+        self._loaded_at = time.monotonic()
+        self._body = None
+
+    async def register(
+        self, session: AsyncSession, marca_names: Iterable[str] = (), modelo_names: Iterable[str] = ()
+    ) -> None:
+        """
+        Cadastra os nomes ainda desconhecidos com INSERT ... ON CONFLICT DO
+        NOTHING (outra réplica pode cadastrar o mesmo nome ao mesmo tempo) e
+        confirma a transação da sessão. Os dicionários só recebem as entradas
+        depois do commit.
+        """
+        pending = []
+        for (_, model, dictionary), names in zip(_FIELDS, (marca_names, modelo_names)):
+            keys = {}
+            for nome in names:
+                nome = " ".join(nome.split())
+                if dictionary.id_for(nome) is None:
+                    keys.setdefault(catalog_key(nome), nome)
+            if keys:
+                pending.append((model, dictionary, keys))
+        if not pending:
+            return
+
+        dialect_insert = (
+            postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+        )
+        entries = []
+        for model, dictionary, keys in pending:
+            await session.execute(
+                dialect_insert(model)
+                .values([{"chave": chave, "nome": nome} for chave, nome in keys.items()])
+                .on_conflict_do_nothing(index_elements=[model.chave])
+            )
+            result = await session.execute(
+                select(model.id, model.chave, model.nome).where(model.chave.in_(list(keys)))
+            )
+            entries.extend((dictionary, row) for row in result.all())
+        await session.commit()
+        for dictionary, (entry_id, chave, nome) in entries:
+            dictionary.add(entry_id, chave, nome)
+        self._body = None
+
+    async def encode(self, session: AsyncSession, values: dict) -> dict:
+        """Troca marca/modelo (nomes) por marca_id/modelo_id, cadastrando nomes novos"""
+        await self.register(session, *_names(values))
+        encoded = dict(values)
+        for field, _, dictionary in _FIELDS:
+            if field in encoded:
+                nome = encoded.pop(field)
+                encoded[f"{field}_id"] = None if nome is None else dictionary.require(nome)
+        return encoded
+
+    def unknown(self, values: dict) -> bool:
+        """Se encode(values) precisaria cadastrar algum nome (escrita no shard 0)"""
+        return any(
+            dictionary.id_for(nome) is None
+            for (_, _, dictionary), names in zip(_FIELDS, _names(values))
+            for nome in names
+        )
+
+    def missing(self, vehicles: Iterable) -> tuple[set[int], set[int]]:
+        """Ids de marca e de modelo dos veículos que esta réplica ainda não conhece"""
+        vehicles = list(vehicles)
+        return (
+            marcas.missing(vehicle.marca_id for vehicle in vehicles),
+            modelos.missing(vehicle.modelo_id for vehicle in vehicles),
+        )
+
+    async def ensure(self, session: AsyncSession, vehicles: Iterable) -> None:
+        """Garante os nomes dos veículos (cadastrados por outra réplica, por exemplo)"""
+        await self._fetch(session, *self.missing(vehicles))
+
+    async def ensure_from(self, session_factory: sessionmaker, vehicles: Iterable) -> None:
+        """Como ensure, abrindo uma sessão do shard 0 só quando falta algum id"""
+        await self.fetch_missing(session_factory, *self.missing(vehicles))
+
+    async def fetch_missing(
+        self, session_factory: sessionmaker, marca_ids: set[int], modelo_ids: set[int]
+    ) -> None:
+        if marca_ids or modelo_ids:
+            async with session_factory() as session:
+                await self._fetch(session, marca_ids, modelo_ids)
+
+    async def _fetch(self, session: AsyncSession, marca_ids: set[int], modelo_ids: set[int]) -> None:
+        for (_, model, dictionary), ids in zip(_FIELDS, (marca_ids, modelo_ids)):
+            if not ids:
+                continue
+            result = await session.execute(
+                select(model.id, model.chave, model.nome).where(model.id.in_(ids))
+            )
+            for entry_id, chave, nome in result:
+                dictionary.add(entry_id, chave, nome)
+            self._body = None
+
+    async def catalog_json(self, session: AsyncSession) -> bytes:
+        """
+        Catálogo serializado, reaproveitado entre requisições. Recarregado do
+        banco após max_age segundos, para incluir cadastros de outras réplicas.
+        """
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age:
+            await self.load(session)
+        if self._body is None:
+            self._body = VehicleCatalogResponse(
+                marcas=[CatalogEntry(id=entry_id, nome=nome) for entry_id, nome in marcas.items()],
+                modelos=[CatalogEntry(id=entry_id, nome=nome) for entry_id, nome in modelos.items()],
+            ).model_dump_json().encode()
+        return self._body
+
+    def clear(self) -> None:
+        for _, _, dictionary in _FIELDS:
+            dictionary.clear()
+        self._body = None
+        self._loaded_at = None
+
+
+def _names(values: dict) -> list[list[str]]:
+    """Nomes de marca e de modelo presentes em values (campos da API)"""
+    return [[values[field]] if values.get(field) is not None else [] for field, _, _ in _FIELDS]
+
+
+def _legacy_names(sync_conn) -> Optional[tuple[list[str], list[str]]]:
+    """
+    Nomes distintos das colunas de texto marca/modelo anteriores ao catálogo,
+    na ordem em que apareceram (a primeira grafia vira o nome exibido)
+    """
+    inspector = inspect(sync_conn)
+    found = None
+    for table in (Vehicle.__table__, VehicleArchive.__table__):
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        if "marca" not in columns:
+            continue
+        found = found or ({}, {})
+        for field, names in zip(("marca", "modelo"), found):
+            rows = sync_conn.execute(text(
+                f"SELECT {field} FROM {table.name} WHERE {field} IS NOT NULL "
+                f"GROUP BY {field} ORDER BY MIN(id)"
+            ))
+            names.update(dict.fromkeys(nome for (nome,) in rows))
+    return None if found is None else tuple(list(names) for names in found)
+
+
+def _replace_legacy_columns(sync_conn) -> None:
+    """Preenche marca_id/modelo_id a partir dos nomes e remove as colunas de texto"""
+    inspector = inspect(sync_conn)
+    for table in (Vehicle.__table__, VehicleArchive.__table__):
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        if "marca" not in columns:
+            continue
+        for field, _, dictionary in _FIELDS:
+            rows = sync_conn.execute(text(f"SELECT DISTINCT {field} FROM {table.name}")).all()
+            params = [{"id": dictionary.require(nome), "nome": nome} for (nome,) in rows if nome is not None]
+            if params:
+                sync_conn.execute(
+                    text(f"UPDATE {table.name} SET {field}_id = :id WHERE {field} = :nome"), params
+                )
+        for index in inspector.get_indexes(table.name):
+            if {"marca", "modelo"} & set(index["column_names"]):
+                sync_conn.execute(text(f"DROP INDEX {index['name']}"))
+        sync_conn.execute(text(f"ALTER TABLE {table.name} DROP COLUMN marca"))
+        sync_conn.execute(text(f"ALTER TABLE {table.name} DROP COLUMN modelo"))
+
+
+async def migrate_legacy_names(engine: AsyncEngine, catalog_session: AsyncSession) -> bool:
+    """
+    Converte um banco de veículos com marca/modelo em texto: os nomes vão
+    para o catálogo (no shard 0, via catalog_session) e as linhas passam a
+    referenciá-los por id. Retorna False se não havia nada a converter.
+    """
+    # Leitura e reescrita em conexões separadas: o cadastro no catálogo
+    # acontece entre as duas (no SQLite, possivelmente no mesmo arquivo)
+    async with engine.connect() as conn:
+        names = await conn.run_sync(_legacy_names)
+    if names is None:
+        return False
+    await vehicle_catalog.register(catalog_session, *names)
+    async with engine.begin() as conn:
+        await conn.run_sync(_replace_legacy_columns)
+    return True
+
+
+vehicle_catalog = VehicleCatalog(max_age=settings.VEHICLE_CATALOG_MAX_AGE_SECONDS)
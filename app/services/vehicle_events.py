@@ -0,0 +1,254 @@
+import asyncio
+import os
+from collections import deque
+from typing import AsyncIterator, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.invalidation import InvalidationEvent
+from app.core.sharding import ShardMap
+from app.database import AsyncSessionLocal, vehicle_shards
+from app.models.catalog import catalog_key
+from app.models.vehicle import Vehicle, VehicleArchive, VehicleStatus
+from app.schemas.schemas import VehicleResponse
+from app.services.vehicle_service import VehicleService
+
+_vehicle_adapter = TypeAdapter(VehicleResponse)
+
+CREATED = "vehicle.created"
+UPDATED = "vehicle.updated"
+DELETED = "vehicle.deleted"
+
+RESET_FRAME = b"event: reset\ndata: {}\n\n"
+
+
+class _Event:
+    __slots__ = ("seq", "kind", "vehicle_id", "status", "marca", "preco", "frame")
+
+    def __init__(self, seq: int, kind: str, vehicle_id: int, frame: bytes,
+                 status: Optional[VehicleStatus] = None, marca: Optional[str] = None,
+                 preco: Optional[float] = None):
+        self.seq = seq
+        self.kind = kind
+        self.vehicle_id = vehicle_id
+        self.status = status
+        self.marca = marca
+        self.preco = preco
+        self.frame = frame
+
+
+class EventFilter:
+    """
+    Filtros de uma conexão. Cadastros precisam casar com todos eles;
+    edições só com a marca, para que o cliente também saiba quando um
+    veículo que exibe deixou de casar (vendido, preço acima do teto);
+    remoções chegam para todos.
+    """
+    __slots__ = ("status", "marca", "preco_max")
+
+    def __init__(
+        self,
+        status: Optional[VehicleStatus] = None,
+        marca: Optional[str] = None,
+        preco_max: Optional[float] = None,
+    ):
+        self.status = status
+        self.marca = catalog_key(marca) if marca else None
+        self.preco_max = preco_max
+
+    def matches(self, event: _Event) -> bool:
+        if event.kind == DELETED:
+            return True
+        if self.marca is not None and catalog_key(event.marca) != self.marca:
+            return False
+        if event.kind == UPDATED:
+            return True
+        if self.status is not None and event.status != self.status:
+            return False
+        return self.preco_max is None or event.preco <= self.preco_max
+
+
+class Subscriber:
+    """Buffer limitado de uma conexão; quem não acompanha é desligado"""
+    __slots__ = ("filter", "buffer", "max_buffer", "wakeup", "dropped")
+
+    def __init__(self, event_filter: EventFilter, max_buffer: int):
+        self.filter = event_filter
+        self.buffer: deque[bytes] = deque()
+        self.max_buffer = max_buffer
+        self.wakeup = asyncio.Event()
+        self.dropped = False
+
+
+class VehicleEventHub:
+    """
+    Fan-out em processo dos eventos de veículos para conexões SSE.
+
+    Cada evento é serializado uma vez (o frame SSE pronto) e entregue às
+    conexões cujos filtros casam; conexões ociosas custam só o buffer
+    vazio e uma tarefa parada num asyncio.Event.
+
+    Os ids dos eventos são `<época>-<sequência>`: os últimos replay_size
+    ficam guardados para retomar uma conexão pelo Last-Event-ID. Um id de
+    outra época (reinício, outra réplica) ou já descartado não tem como ser
+    retomado: a conexão recebe um evento `reset` e o cliente deve recarregar
+    a listagem antes de seguir com os eventos ao vivo.
+    """
+
+    def __init__(
+        self,
+        replay_size: int = 1000,
+        subscriber_buffer: int = 100,
+        max_subscribers: int = 10000,
+        keepalive: float = 15.0,
+        session_factory: sessionmaker = AsyncSessionLocal,
+        shards: Optional[ShardMap] = None,
+    ):
+        self.epoch = os.urandom(4).hex()
+        self.subscriber_buffer = subscriber_buffer
+        self.max_subscribers = max_subscribers
+        self.keepalive = keepalive
+        self.session_factory = session_factory
+        self.shards = shards
+        self.dropped_subscribers = 0
+        self._seq = 0
+        self._recent: deque[_Event] = deque(maxlen=replay_size)
+        self._subscribers: set[Subscriber] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def publish(self, vehicle: Vehicle | VehicleArchive, created: bool = False) -> None:
+        """Evento de cadastro ou edição já confirmada"""
+        # Validação antes do dump: marca/modelo são propriedades (catálogo)
+        payload = _vehicle_adapter.dump_json(_vehicle_adapter.validate_python(vehicle, from_attributes=True))
+        self._append(CREATED if created else UPDATED, vehicle.id, payload,
+                     vehicle.status, vehicle.marca, vehicle.preco)
+
+    def publish_deleted(self, vehicle_id: int) -> None:
+        self._append(DELETED, vehicle_id, b'{"id":%d}' % vehicle_id)
+
+    def _append(self, kind: str, vehicle_id: int, data: bytes, *fields) -> None:
+        self._seq += 1
+        frame = b"id: %s-%d\nevent: %s\ndata: %s\n\n" % (
+            self.epoch.encode(), self._seq, kind.encode(), data
+        )
+        event = _Event(self._seq, kind, vehicle_id, frame, *fields)
+        self._recent.append(event)
+        for subscriber in list(self._subscribers):
+            if subscriber.filter.matches(event):
+                self._deliver(subscriber, event.frame)
+
+    def _deliver(self, subscriber: Subscriber, frame: bytes) -> None:
+        if subscriber.dropped:
+            return
+        if len(subscriber.buffer) >= subscriber.max_buffer:
+            # Consumidor lento: desliga em vez de acumular sem limite
+            subscriber.dropped = True
+            self._subscribers.discard(subscriber)
+            self.dropped_subscribers += 1
+        else:
+            subscriber.buffer.append(frame)
+        subscriber.wakeup.set()
+
+    def subscribe(self, event_filter: EventFilter, last_event_id: Optional[str] = None) -> Subscriber:
+        """
+        Registra a conexão e já enfileira o que ela perdeu desde
+        last_event_id (sem await entre as duas coisas: nada se perde nem
+        chega duas vezes).
+        """
+        subscriber = Subscriber(event_filter, self.subscriber_buffer)
+        if last_event_id is not None:
+            missed = self._since(last_event_id)
+            if missed is None:
+                subscriber.buffer.append(RESET_FRAME)
+            else:
+                for event in missed:
+                    if event_filter.matches(event):
+                        self._deliver(subscriber, event.frame)
+        if not subscriber.dropped:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def _since(self, last_event_id: str) -> Optional[list[_Event]]:
+        """Eventos após last_event_id, ou None se ele não puder ser retomado"""
+        epoch, _, seq = last_event_id.strip().partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > self._seq:
+            return None
+        oldest = self._recent[0].seq if self._recent else self._seq + 1
+        if seq < oldest - 1:
+            return None
+        return [event for event in self._recent if event.seq > seq]
+
+    async def stream(self, subscriber: Subscriber) -> AsyncIterator[bytes]:
+        """Frames SSE da conexão, com comentário de keepalive quando ociosa"""
+        try:
+            # Envia os headers na hora e orienta a reconexão do cliente
+            yield b"retry: 3000\n\n"
+            while True:
+                while subscriber.buffer:
+                    yield subscriber.buffer.popleft()
+                if subscriber.dropped:
+                    return
+                subscriber.wakeup.clear()
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def reset(self) -> None:
+        """
+        Handler de reset do barramento: escritas de outras réplicas podem ter
+        se perdido, então as conexões recebem `reset` (recarregar a listagem)
+        e o histórico deixa de valer para retomadas pelo Last-Event-ID.
+        """
+        self._recent.clear()
+        for subscriber in list(self._subscribers):
+            self._deliver(subscriber, RESET_FRAME)
+
+    async def refresh(self, events: list[InvalidationEvent]) -> None:
+        """
+        Handler do barramento de invalidação: escritas de outras réplicas
+        viram eventos aqui também (versão 1 = cadastro; ausente = removido).
+        """
+        if not self._subscribers:
+            return
+        ids = [event.id for event in events]
+        async with self.session_factory() as session:
+            found = await VehicleService(session, shards=self.shards).get_vehicles_by_ids(ids)
+        for vehicle_id in dict.fromkeys(ids):
+            vehicle = found.get(vehicle_id)
+            if vehicle is None:
+                self.publish_deleted(vehicle_id)
+            else:
+                self.publish(vehicle, created=vehicle.version == 1)
+
+
+vehicle_event_hub = VehicleEventHub(
+    replay_size=settings.VEHICLE_EVENTS_REPLAY_SIZE,
+    subscriber_buffer=settings.VEHICLE_EVENTS_SUBSCRIBER_BUFFER,
+    max_subscribers=settings.VEHICLE_EVENTS_MAX_SUBSCRIBERS,
+    keepalive=settings.VEHICLE_EVENTS_KEEPALIVE_SECONDS,
+    shards=vehicle_shards if len(vehicle_shards) > 1 else None,
+)
+
+
+def get_vehicle_event_hub() -> Optional[VehicleEventHub]:
+    """Dependency: retorna o hub de eventos quando VEHICLE_EVENTS_ENABLED estiver ativo"""
+    if not settings.VEHICLE_EVENTS_ENABLED:
+        return None
+    return vehicle_event_hub
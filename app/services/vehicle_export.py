@@ -0,0 +1,218 @@
+"""
+Exportação do estoque em streaming (CSV, CSV gzip, Parquet ou Arrow IPC).
+
+As linhas são lidas por um cursor do lado do servidor em blocos de
+VEHICLE_EXPORT_BATCH_SIZE e cada bloco é codificado e enviado antes do
+próximo ser buscado: a memória usada não depende do tamanho da tabela.
+Parquet e Arrow exigem o pacote opcional `pyarrow`.
+"""
+import csv
+import enum
+import importlib.util
+import io
+import zlib
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import asc, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.sharding import ShardMap
+from app.models.catalog import marcas, modelos
+from app.models.vehicle import Vehicle, VehicleStatus
+from app.services.vehicle_catalog import vehicle_catalog
+from app.services.vehicle_service import VEHICLE_FIELDS, all_vehicles
+
+
+class ExportFormat(str, enum.Enum):
+    CSV = "csv"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+    ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+}
+
+EXTENSIONS = {
+    ExportFormat.CSV: "csv",
+    ExportFormat.PARQUET: "parquet",
+    ExportFormat.ARROW: "arrows",
+}
+
+# Mesmas colunas da API; versão e reserva são só controle de concorrência
+EXPORT_COLUMNS = [
+    name for name in VEHICLE_FIELDS if name not in ("version", "reservado_ate", "reserva_id")
+]
+# Marca e modelo saem por nome, decodificados pelo catálogo em memória
+EXPORT_FIELDS = [name.removesuffix("_id") if name in ("marca_id", "modelo_id") else name
+                 for name in EXPORT_COLUMNS]
+_MARCA = EXPORT_COLUMNS.index("marca_id")
+_MODELO = EXPORT_COLUMNS.index("modelo_id")
+
+
+def columnar_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+class _ChunkSink(io.RawIOBase):
+    """Arquivo somente-escrita cujo conteúdo é drenado a cada bloco"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class CsvEncoder:
+    def __init__(self):
+        self._header = True
+
+    def encode(self, rows: list) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self._header:
+            writer.writerow(EXPORT_FIELDS)
+            self._header = False
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        return buffer.getvalue().encode()
+
+    def finish(self) -> bytes:
+        # Exportação vazia ainda tem o cabeçalho
+        return self.encode([]) if self._header else b""
+
+
+class ArrowEncoder:
+    """Cada bloco vira um record batch (Arrow IPC) ou row group (Parquet)"""
+
+    def __init__(self, parquet: bool):
+        import pyarrow as pa
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("id", pa.int64()),
+            ("marca", pa.string()),
+            ("modelo", pa.string()),
+            ("ano", pa.int32()),
+            ("cor", pa.string()),
+            ("preco", pa.float64()),
+            ("status", pa.string()),
+            ("data_cadastro", pa.timestamp("us")),
+        ])
+        self._sink = _ChunkSink()
+        if parquet:
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(self._sink, self._schema)
+        else:
+            self._writer = pa.ipc.new_stream(self._sink, self._schema)
+
+    def encode(self, rows: list) -> bytes:
+        columns = [[_plain(value) for value in column] for column in zip(*rows)]
+        table = self._pa.Table.from_arrays(columns, schema=self._schema)
+        self._writer.write_table(table)
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+class VehicleExporter:
+    """
+    Lê o estoque em blocos e produz o arquivo exportado incrementalmente.
+    Com `shards`, lê um shard após o outro: como os shards dividem os ids
+    em faixas, o arquivo continua ordenado por id.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch_size: Optional[int] = None,
+        shards: Optional[ShardMap] = None,
+    ):
+        self.session_factory = session_factory
+        self.shards = shards
+        self.batch_size = batch_size or settings.VEHICLE_EXPORT_BATCH_SIZE
+
+    def _query(self, status: Optional[VehicleStatus]):
+        source = Vehicle if status == VehicleStatus.DISPONIVEL else all_vehicles()
+        # Só colunas (sem entidades ORM): nada se acumula no identity map
+        query = select(*(getattr(source, name) for name in EXPORT_COLUMNS))
+        if status:
+            query = query.where(source.status == status)
+        return query.order_by(asc(source.id))
+
+    async def batches(self, status: Optional[VehicleStatus] = None) -> AsyncIterator[list]:
+        """Blocos de linhas lidos por um cursor do lado do servidor"""
+        factories = [self.session_factory] if self.shards is None else self.shards.session_factories
+        for session_factory in factories:
+            # Sessão própria: o streaming continua depois que a rota retorna
+            async with session_factory() as session:
+                result = await session.stream(
+                    self._query(status).execution_options(yield_per=self.batch_size)
+                )
+                async for partition in result.partitions():
+                    yield await self._decode(partition)
+
+    async def _decode(self, rows: list) -> list:
+        """Troca marca_id/modelo_id pelos nomes do catálogo"""
+        await vehicle_catalog.fetch_missing(
+            self.session_factory,
+            marcas.missing(row[_MARCA] for row in rows),
+            modelos.missing(row[_MODELO] for row in rows),
+        )
+        decoded = []
+        for row in rows:
+            row = list(row)
+            row[_MARCA] = marcas.name(row[_MARCA])
+            row[_MODELO] = modelos.name(row[_MODELO])
+            decoded.append(row)
+        return decoded
+
+    async def export(
+        self,
+        fmt: ExportFormat = ExportFormat.CSV,
+        status: Optional[VehicleStatus] = None,
+        gzip: bool = False,
+    ) -> AsyncIterator[bytes]:
+        encoder = CsvEncoder() if fmt == ExportFormat.CSV else ArrowEncoder(fmt == ExportFormat.PARQUET)
+        # wbits=31: fluxo no formato gzip, comprimido bloco a bloco
+        compressor = zlib.compressobj(settings.VEHICLE_EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if gzip else None
+
+        async for rows in self.batches(status):
+            chunk = encoder.encode(rows)
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+        tail = encoder.finish()
+        if compressor is not None:
+            tail = compressor.compress(tail) + compressor.flush()
+        if tail:
+            yield tail
@@ -1,53 +1,456 @@
+import asyncio
+import heapq
+import uuid
+from datetime import datetime, timedelta
+from functools import lru_cache, wraps
+from itertools import islice
+from typing import TYPE_CHECKING, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import asc
-from app.models.vehicle import Vehicle, VehicleStatus
-from app.schemas.schemas import VehicleCreate, VehicleUpdate
+from sqlalchemy import asc, insert, lambda_stmt, or_, union_all, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.orm.util import identity_key
+from fastapi import HTTPException, status as http_status
+from pydantic import TypeAdapter
+from app.core.singleflight import SingleFlight
+from app.models.vehicle import Vehicle, VehicleArchive, VehicleStatus
+from app.schemas.schemas import VehicleCreate, VehicleUpdate, VehicleResponse
+from app.services.vehicle_catalog import vehicle_catalog
+
+
+# Listagens idênticas concorrentes compartilham a mesma consulta e serialização
+_list_flight = SingleFlight()
+_vehicle_list_adapter = TypeAdapter(list[VehicleResponse])
+
+if TYPE_CHECKING:
+    from app.core.invalidation import InvalidationBus
+    from app.core.sharding import ShardMap
+    from app.services.price_index import AvailablePriceIndex
+    from app.services.vehicle_events import VehicleEventHub
+    from app.services.write_batcher import VehicleWriteBatcher
+    from app.services.write_queue import VehicleWriteQueue
+
+VEHICLE_FIELDS = [column.name for column in Vehicle.__table__.columns]
+
+
+@lru_cache(maxsize=None)
+def all_vehicles():
+    """
+    Estoque ativo + arquivo de vendidos, mapeados como Vehicle.
+    Usado apenas para leitura: as instâncias de veículos arquivados
+    não devem ser alteradas por esta entidade. Construído uma vez só.
+    """
+    hot = select(*(Vehicle.__table__.c[name] for name in VEHICLE_FIELDS))
+    cold = select(*(VehicleArchive.__table__.c[name] for name in VEHICLE_FIELDS))
+    return aliased(Vehicle, union_all(hot, cold).subquery("all_vehicles"))
+
+
+def _routed(method):
+    """
+    Executa uma operação por id no shard dono do id. Fora do shard 0 (o da
+    sessão `db`), roda num serviço sem shards sobre uma sessão daquele shard.
+    """
+    @wraps(method)
+    async def wrapper(self: "VehicleService", vehicle_id: int, *args, **kwargs):
+        shard = 0 if self.shards is None else self.shards.shard_for(vehicle_id)
+        if shard == 0:
+            return await method(self, vehicle_id, *args, **kwargs)
+        async with self.shards.session(shard) as session:
+            return await method(self._on(session), vehicle_id, *args, **kwargs)
+    return wrapper
+
+
+def _serialized(method):
+    """
+    Com a fila do escritor único (SQLite), a escrita inteira (leituras de
+    conferência, UPDATE e commit) roda na vez dela, na conexão do escritor.
+    """
+    @wraps(method)
+    async def wrapper(self: "VehicleService", *args, **kwargs):
+        if self.writer is None:
+            return await method(self, *args, **kwargs)
+        return await self.writer.run(lambda session: method(self._on(session), *args, **kwargs))
+    return wrapper
 
 
 class VehicleService:
-    """Serviço para gerenciamento de veículos (CRUD)"""
+    """
+    Serviço para gerenciamento de veículos (CRUD).
+    
+    Com `shards`, `db` é uma sessão do shard 0: operações por id vão direto
+    ao shard dono, cadastros são distribuídos em rodízio e listagens
+    consultam todos os shards em paralelo.
+    
+    Com `writer` (fila do escritor único do SQLite), as escritas no shard 0
+    são serializadas na conexão dedicada do escritor; o group commit do
+    batcher não é usado nesse caso.
+    
+    Marca e modelo são gravados como ids do catálogo (vehicle_catalog):
+    nomes recebidos são codificados antes da escrita e os veículos lidos têm
+    os seus ids garantidos no dicionário em memória antes de sair daqui.
+    `catalog_db` é a sessão do shard 0 usada para isso (padrão: `db`).
+    """
     
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        batcher: Optional["VehicleWriteBatcher"] = None,
+        price_index: Optional["AvailablePriceIndex"] = None,
+        bus: Optional["InvalidationBus"] = None,
+        shards: Optional["ShardMap"] = None,
+        writer: Optional["VehicleWriteQueue"] = None,
+        events: Optional["VehicleEventHub"] = None,
+        catalog_db: Optional[AsyncSession] = None,
+    ):
         self.db = db
+        self.batcher = batcher
+        self.price_index = price_index
+        self.bus = bus
+        self.shards = shards
+        self.writer = writer
+        self.events = events
+        self.catalog_db = catalog_db or db
+
+    def _on(self, session: AsyncSession) -> "VehicleService":
+        """
+        Serviço sobre a sessão de outro shard ou do escritor (o batcher e a
+        fila do escritor só atendem o shard 0)
+        """
+        return VehicleService(
+            session, price_index=self.price_index, bus=self.bus, events=self.events,
+            catalog_db=self.catalog_db
+        )
+
+    async def _known(self, vehicles):
+        """Garante no catálogo em memória os nomes de marca/modelo dos veículos"""
+        await vehicle_catalog.ensure(self.catalog_db, vehicles)
+        return vehicles
+
+    async def _saved(self, vehicle: Vehicle | VehicleArchive, created: bool = False) -> None:
+        """
+        Propaga uma escrita confirmada para o índice local, as outras
+        réplicas e as conexões de eventos (SSE)
+        """
+        await self._known([vehicle])
+        if self.price_index is not None:
+            self.price_index.upsert(vehicle)
+        if self.bus is not None:
+            self.bus.publish("vehicle", vehicle.id, vehicle.version)
+        if self.events is not None:
+            self.events.publish(vehicle, created=created)
+
+    def _deleted(self, vehicle_id: int) -> None:
+        if self.price_index is not None:
+            self.price_index.discard(vehicle_id)
+        if self.bus is not None:
+            self.bus.publish("vehicle", vehicle_id)
+        if self.events is not None:
+            self.events.publish_deleted(vehicle_id)
+
+    async def _encode(self, values: dict) -> dict:
+        """
+        Marca/modelo -> ids do catálogo, antes de ir ao shard ou à fila. Com
+        o escritor único, cadastrar um nome novo também é uma escrita no
+        shard 0 e entra na fila; nomes já conhecidos não tocam o banco.
+        """
+        if self.writer is not None and vehicle_catalog.unknown(values):
+            await self.writer.run(lambda session: vehicle_catalog.encode(session, values))
+        return await vehicle_catalog.encode(self.catalog_db, values)
 
     async def create_vehicle(self, vehicle_in: VehicleCreate) -> Vehicle:
         """Cria um novo veículo"""
-        vehicle = Vehicle(**vehicle_in.model_dump())
-        self.db.add(vehicle)
-        await self.db.commit()
-        await self.db.refresh(vehicle)
+        return await self._create(await self._encode(vehicle_in.model_dump()))
+
+    async def _create(self, values: dict) -> Vehicle:
+        shard = 0 if self.shards is None else self.shards.next_shard()
+        if shard != 0:
+            async with self.shards.session(shard) as session:
+                return await self._on(session)._create(values)
+        if self.writer is not None:
+            # Já no shard 0: o serviço do escritor não tem shards nem fila
+            return await self.writer.run(lambda session: self._on(session)._create(values))
+        
+        if self.batcher is not None:
+            vehicle = await self.batcher.create(values)
+        else:
+            vehicle = Vehicle(**values)
+            self.db.add(vehicle)
+            await self.db.commit()
+            await self.db.refresh(vehicle)
+        
+        await self._saved(vehicle, created=True)
         return vehicle
 
-    async def get_vehicles(self, status: VehicleStatus = None) -> list[Vehicle]:
+    async def get_vehicles(
+        self,
+        status: VehicleStatus = None,
+        preco_min: Optional[float] = None,
+        preco_max: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> list[Vehicle]:
         """
         Lista veículos ordenados por preço (menor para maior).
-        Opcionalmente filtra por status.
+        Opcionalmente filtra por status, faixa de preço e quantidade.
+        
+        Disponíveis vêm só da tabela quente (índice parcial em preco);
+        vendidos incluem também os já movidos para o arquivo.
         """
-        query = select(Vehicle)
+        if self.shards is not None:
+            return await self._get_vehicles_from_shards(status, preco_min, preco_max, limit)
+        
+        if status == VehicleStatus.DISPONIVEL:
+            source = Vehicle
+        else:
+            source = all_vehicles()
+        
+        # lambda_stmt: em regime, só os valores dos filtros são extraídos;
+        # a instrução não é reconstruída nem recompilada a cada chamada
+        query = lambda_stmt(lambda: select(source))
         if status:
-            query = query.where(Vehicle.status == status)
+            query += lambda s: s.where(source.status == status)
+        if preco_min is not None:
+            query += lambda s: s.where(source.preco >= preco_min)
+        if preco_max is not None:
+            query += lambda s: s.where(source.preco <= preco_max)
         
         # Requisito: ordenar por preço do mais barato para o mais caro
-        query = query.order_by(asc(Vehicle.preco))
+        query += lambda s: s.order_by(asc(source.preco))
+        if limit is not None:
+            query += lambda s: s.limit(limit)
         
         result = await self.db.execute(query)
-        return result.scalars().all()
+        return await self._known(result.scalars().all())
+
+    async def _get_vehicles_from_shards(
+        self,
+        status: Optional[VehicleStatus],
+        preco_min: Optional[float],
+        preco_max: Optional[float],
+        limit: Optional[int],
+    ) -> list[Vehicle]:
+        """
+        Scatter-gather: cada shard devolve a sua lista já ordenada por preço
+        (com o mesmo LIMIT, nunca mais que isso) e as listas são intercaladas
+        com um merge de k vias, sem reordenar tudo.
+        """
+        async def from_shard(shard: int) -> list[Vehicle]:
+            if shard == 0:
+                return await self._on(self.db).get_vehicles(status, preco_min, preco_max, limit)
+            async with self.shards.session(shard) as session:
+                return await self._on(session).get_vehicles(status, preco_min, preco_max, limit)
+        
+        per_shard = await asyncio.gather(*(from_shard(shard) for shard in range(len(self.shards))))
+        merged = heapq.merge(*per_shard, key=lambda vehicle: vehicle.preco)
+        return list(islice(merged, limit))
 
-    async def get_vehicle(self, vehicle_id: int) -> Vehicle | None:
-        """Busca veículo por ID"""
+    async def get_vehicles_json(
+        self,
+        status: VehicleStatus = None,
+        preco_min: Optional[float] = None,
+        preco_max: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> bytes:
+        """
+        Lista veículos já serializados em JSON.
+        
+        Disponíveis são respondidos pelo índice de preços em memória quando
+        ele está carregado e dentro da validade. Fora disso, requisições
+        concorrentes com os mesmos filtros compartilham uma única execução
+        no banco e o mesmo corpo de resposta.
+        """
+        if (
+            status == VehicleStatus.DISPONIVEL
+            and self.price_index is not None
+            and self.price_index.usable()
+        ):
+            return self.price_index.query_json(preco_min, preco_max, limit)
+        
+        key = ("vehicles", VehicleStatus(status).value if status else None, preco_min, preco_max, limit)
+
+        async def run() -> bytes:
+            vehicles = await self.get_vehicles(status, preco_min, preco_max, limit)
+            # Validação antes do dump: marca/modelo são propriedades (catálogo) e a
+            # serialização direta de objetos ORM só enxerga as colunas do __dict__
+            return _vehicle_list_adapter.dump_json(
+                _vehicle_list_adapter.validate_python(vehicles, from_attributes=True)
+            )
+
+        return await _list_flight.do(key, run)
+
+    @_routed
+    async def get_vehicle(self, vehicle_id: int) -> Vehicle | VehicleArchive | None:
+        """Busca veículo por ID (estoque ativo e, em seguida, arquivo de vendidos)"""
         result = await self.db.execute(
-            select(Vehicle).where(Vehicle.id == vehicle_id)
+            lambda_stmt(lambda: select(Vehicle).where(Vehicle.id == vehicle_id))
         )
-        return result.scalar_one_or_none()
+        vehicle = result.scalar_one_or_none()
+        if vehicle is None:
+            result = await self.db.execute(
+                lambda_stmt(lambda: select(VehicleArchive).where(VehicleArchive.id == vehicle_id))
+            )
+            vehicle = result.scalar_one_or_none()
+        if vehicle is not None:
+            await self._known([vehicle])
+        return vehicle
 
-    async def update_vehicle(self, vehicle_id: int, vehicle_in: VehicleUpdate) -> Vehicle | None:
-        """Atualiza dados de um veículo"""
+    async def get_vehicles_by_ids(self, ids: list[int]) -> dict[int, Vehicle | VehicleArchive]:
+        """
+        Busca vários veículos por id (estoque ativo e arquivo) com um único
+        WHERE id IN (...) por shard. Ids não encontrados ficam fora do dict.
+        """
+        if self.shards is not None:
+            groups = self.shards.group_by_shard(set(ids))
+            
+            async def from_shard(shard: int, shard_ids: list[int]) -> dict:
+                if shard == 0:
+                    return await self._on(self.db).get_vehicles_by_ids(shard_ids)
+                async with self.shards.session(shard) as session:
+                    return await self._on(session).get_vehicles_by_ids(shard_ids)
+            
+            found = {}
+            for part in await asyncio.gather(*(from_shard(s, i) for s, i in groups.items())):
+                found.update(part)
+            return found
+        
+        source = all_vehicles()
+        unique = list(set(ids))
+        result = await self.db.execute(
+            lambda_stmt(lambda: select(source).where(source.id.in_(unique)))
+        )
+        vehicles = await self._known(result.scalars().all())
+        return {vehicle.id: vehicle for vehicle in vehicles}
+
+    async def update_vehicle(
+        self,
+        vehicle_id: int,
+        vehicle_in: VehicleUpdate,
+        if_match: Optional[set[int]] = None,
+    ) -> Vehicle | None:
+        """
+        Atualiza dados de um veículo.
+        
+        Com `if_match` (versões aceitas, vindas do If-Match), só grava se a
+        versão atual estiver entre elas; caso contrário, 412. Mudar o status
+        para VENDIDO é uma venda e respeita a reserva vigente (409).
+        """
+        update_data = await self._encode(vehicle_in.model_dump(exclude_unset=True))
+        return await self._update(vehicle_id, update_data, if_match)
+
+    @_routed
+    @_serialized
+    async def _update(
+        self, vehicle_id: int, update_data: dict, if_match: Optional[set[int]]
+    ) -> Vehicle | None:
+        if update_data.get("status") == VehicleStatus.VENDIDO:
+            return await self._sell_with_update(vehicle_id, update_data, if_match)
+        
+        if if_match is not None:
+            vehicle = await self._update_if_match(vehicle_id, update_data, if_match)
+            if vehicle is not None:
+                await self._saved(vehicle)
+            return vehicle
+        
+        if self.batcher is not None:
+            vehicle = await self.batcher.update(vehicle_id, update_data)
+            # O batcher só enxerga a tabela quente; arquivados seguem o caminho normal
+            if vehicle is not None:
+                await self._saved(vehicle)
+                return vehicle
+        
+        try:
+            vehicle = await self._apply_update(vehicle_id, update_data)
+        except StaleDataError:
+            # O arquivador (ou outra escrita) mudou o veículo entre a leitura e o UPDATE
+            await self.db.rollback()
+            vehicle = await self._apply_update(vehicle_id, update_data)
+        
+        if vehicle is not None:
+            await self._saved(vehicle)
+        return vehicle
+
+    async def _update_if_match(
+        self, vehicle_id: int, update_data: dict, versions: set[int]
+    ) -> Vehicle | None:
+        """
+        Um único UPDATE ... WHERE id = ? AND version IN (...) RETURNING:
+        sem lock de linha nem leitura prévia. Só quando nada é atualizado o
+        veículo é lido, para separar 404, 412 e vendidos já arquivados.
+        """
+        result = await self.db.execute(
+            update(Vehicle)
+            .where(Vehicle.id == vehicle_id, Vehicle.version.in_(versions))
+            .values(**update_data, version=Vehicle.version + 1)
+            .returning(Vehicle),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        )
+        vehicle = result.scalar_one_or_none()
+        if vehicle is not None:
+            await self.db.commit()
+            return vehicle
+        
+        try:
+            return await self._apply_update(vehicle_id, update_data, versions)
+        except StaleDataError:
+            await self.db.rollback()
+            raise _version_conflict()
+
+    async def _sell_with_update(
+        self, vehicle_id: int, update_data: dict, versions: Optional[set[int]]
+    ) -> Vehicle | None:
+        """
+        PUT com status VENDIDO: o mesmo UPDATE condicional de sell_vehicle
+        (sem reserva vigente), junto dos demais campos e do If-Match.
+        """
+        now = datetime.utcnow()
+        conditions = [Vehicle.id == vehicle_id, _not_reserved(now)]
+        if versions is not None:
+            conditions.append(Vehicle.version.in_(versions))
+        result = await self.db.execute(
+            update(Vehicle)
+            .where(*conditions)
+            .values(**update_data, reservado_ate=None, reserva_id=None, version=Vehicle.version + 1)
+            .returning(Vehicle),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        )
+        vehicle = result.scalar_one_or_none()
+        if vehicle is not None:
+            await self.db.commit()
+            await self._saved(vehicle)
+            return vehicle
+        
+        await self.db.rollback()
+        current = await self.get_vehicle(vehicle_id)
+        if current is None:
+            return None
+        if versions is not None and current.version not in versions:
+            raise _version_conflict()
+        if isinstance(current, VehicleArchive):
+            # Já vendido e arquivado: edição comum do arquivo
+            vehicle = await self._apply_update(vehicle_id, update_data, versions)
+            if vehicle is not None:
+                await self._saved(vehicle)
+            return vehicle
+        raise HTTPException(
+            status_code=http_status.HTTP_409_CONFLICT,
+            detail="Veículo reservado por outro comprador"
+        )
+
+    async def _apply_update(
+        self, vehicle_id: int, update_data: dict, versions: Optional[set[int]] = None
+    ) -> Vehicle | None:
         vehicle = await self.get_vehicle(vehicle_id)
         if not vehicle:
             return None
+        if versions is not None and vehicle.version not in versions:
+            raise _version_conflict()
+        
+        if (
+            isinstance(vehicle, VehicleArchive)
+            and update_data.get("status") == VehicleStatus.DISPONIVEL
+        ):
+            vehicle = await self._restore(vehicle)
         
-        update_data = vehicle_in.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(vehicle, key, value)
         
@@ -55,8 +458,112 @@ class VehicleService:
         await self.db.refresh(vehicle)
         return vehicle
 
+    async def _restore(self, archived: VehicleArchive) -> Vehicle:
+        """Devolve um veículo arquivado para o estoque ativo, mantendo id e versão"""
+        # INSERT ... SELECT do Core: um Vehicle novo do ORM recomeçaria na versão 1
+        source = select(
+            *(VehicleArchive.__table__.c[name] for name in VEHICLE_FIELDS)
+        ).where(VehicleArchive.id == archived.id)
+        await self.db.execute(insert(Vehicle).from_select(VEHICLE_FIELDS, source))
+        await self.db.delete(archived)
+        await self.db.flush()
+        # Instância somente leitura carregada via all_vehicles() ocupa a mesma identidade
+        stale = self.db.identity_map.get(identity_key(Vehicle, archived.id))
+        if stale is not None:
+            self.db.expunge(stale)
+        return await self.db.get(Vehicle, archived.id)
+
+    @_routed
+    @_serialized
+    async def reserve_vehicle(self, vehicle_id: int, ttl_seconds: float) -> Vehicle | None:
+        """
+        Reserva um veículo DISPONIVEL e sem reserva vigente por ttl_seconds.
+        
+        Um único UPDATE ... WHERE status = 'DISPONIVEL' ... RETURNING: entre
+        vários compradores simultâneos só um leva; os demais recebem 409 na
+        hora, sem lock de linha nem nova tentativa.
+        """
+        now = datetime.utcnow()
+        result = await self.db.execute(
+            update(Vehicle)
+            .where(
+                Vehicle.id == vehicle_id,
+                Vehicle.status == VehicleStatus.DISPONIVEL,
+                _not_reserved(now),
+            )
+            .values(
+                reservado_ate=now + timedelta(seconds=ttl_seconds),
+                reserva_id=uuid.uuid4().hex,
+                version=Vehicle.version + 1,
+            )
+            .returning(Vehicle),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        )
+        return await self._transitioned(vehicle_id, result.scalar_one_or_none())
+
+    @_routed
+    @_serialized
+    async def sell_vehicle(self, vehicle_id: int, reserva_id: Optional[str] = None) -> Vehicle | None:
+        """
+        DISPONIVEL -> VENDIDO num único UPDATE condicional (mesma disputa que
+        reserve_vehicle). Um veículo reservado só é vendido com o reserva_id
+        da reserva vigente.
+        """
+        now = datetime.utcnow()
+        available = _not_reserved(now)
+        if reserva_id is not None:
+            available = or_(available, Vehicle.reserva_id == reserva_id)
+        result = await self.db.execute(
+            update(Vehicle)
+            .where(
+                Vehicle.id == vehicle_id,
+                Vehicle.status == VehicleStatus.DISPONIVEL,
+                available,
+            )
+            .values(
+                status=VehicleStatus.VENDIDO,
+                reservado_ate=None,
+                reserva_id=None,
+                version=Vehicle.version + 1,
+            )
+            .returning(Vehicle),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        )
+        return await self._transitioned(vehicle_id, result.scalar_one_or_none())
+
+    async def _transitioned(self, vehicle_id: int, vehicle: Vehicle | None) -> Vehicle | None:
+        """Confirma a transição ou explica por que ela não ocorreu (404 ou 409)"""
+        if vehicle is not None:
+            await self.db.commit()
+            await self._saved(vehicle)
+            return vehicle
+        
+        await self.db.rollback()
+        current = await self.get_vehicle(vehicle_id)
+        if current is None:
+            return None
+        if current.status == VehicleStatus.VENDIDO:
+            detail = "Veículo já vendido"
+        else:
+            detail = "Veículo reservado por outro comprador"
+        raise HTTPException(status_code=http_status.HTTP_409_CONFLICT, detail=detail)
+
+    @_routed
+    @_serialized
     async def delete_vehicle(self, vehicle_id: int) -> bool:
         """Deleta um veículo"""
+        try:
+            deleted = await self._apply_delete(vehicle_id)
+        except StaleDataError:
+            # O arquivador moveu o veículo entre a leitura e o DELETE
+            await self.db.rollback()
+            deleted = await self._apply_delete(vehicle_id)
+        
+        if deleted:
+            self._deleted(vehicle_id)
+        return deleted
+
+    async def _apply_delete(self, vehicle_id: int) -> bool:
         vehicle = await self.get_vehicle(vehicle_id)
         if not vehicle:
             return False
@@ -64,3 +571,14 @@ class VehicleService:
         await self.db.delete(vehicle)
         await self.db.commit()
         return True
+
+
+def _not_reserved(now: datetime):
+    return or_(Vehicle.reservado_ate.is_(None), Vehicle.reservado_ate <= now)
+
+
+def _version_conflict() -> HTTPException:
+    return HTTPException(
+        status_code=http_status.HTTP_412_PRECONDITION_FAILED,
+        detail="Veículo alterado por outra requisição; leia-o novamente"
+    )
@@ -0,0 +1,166 @@
+import asyncio
+from typing import Any, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models.vehicle import Vehicle
+
+
+class _PendingWrite:
+    __slots__ = ("kind", "vehicle_id", "values", "future")
+
+    def __init__(self, kind: str, values: dict, vehicle_id: Optional[int] = None):
+        self.kind = kind
+        self.vehicle_id = vehicle_id
+        self.values = values
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class VehicleWriteBatcher:
+    """
+    Group commit para escritas de veículos.
+
+    Cadastros e atualizações simples que chegam dentro de uma pequena janela
+    (window_ms) são agrupados, até max_batch_size, e executados em uma única
+    transação: os cadastros viram um INSERT multi-linha e tudo é confirmado
+    com um único COMMIT (um fsync no PostgreSQL em vez de um por veículo).
+
+    Os lotes são confirmados um de cada vez: enquanto um COMMIT está em
+    andamento, as novas escritas se acumulam para o próximo lote.
+
+    Cada chamador recebe a sua própria linha ou o seu próprio erro: se a
+    transação do lote falhar, as escritas são reexecutadas individualmente
+    para isolar a que causou o erro.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = AsyncSessionLocal,
+        window_ms: float = 2.0,
+        max_batch_size: int = 100,
+    ):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending: list[_PendingWrite] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: set[asyncio.Task] = set()
+        self._commit_lock = asyncio.Lock()
+
+    async def create(self, values: dict) -> Vehicle:
+        """Cadastro com as colunas já codificadas (marca_id/modelo_id, ver vehicle_catalog)"""
+        return await self._submit(_PendingWrite("create", values))
+
+    async def update(self, vehicle_id: int, values: dict) -> Vehicle | None:
+        return await self._submit(_PendingWrite("update", values, vehicle_id))
+
+    async def close(self) -> None:
+        """Descarrega as escritas pendentes e aguarda os lotes em andamento"""
+        self._flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def _submit(self, write: _PendingWrite) -> Any:
+        self._pending.append(write)
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        # shield: o cancelamento de um chamador não desfaz a escrita do lote
+        return await asyncio.shield(write.future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            task = asyncio.ensure_future(self._run(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _run(self, batch: list[_PendingWrite]) -> None:
+        async with self._commit_lock:
+            await self._commit(batch)
+
+    async def _commit(self, batch: list[_PendingWrite]) -> None:
+        try:
+            async with self.session_factory() as session:
+                async with session.begin():
+                    results = await self._execute(session, batch)
+        except Exception as error:
+            if len(batch) == 1:
+                self._resolve(batch, error=error)
+                return
+            # Isola o erro: cada escrita em sua própria transação
+            for write in batch:
+                await self._commit([write])
+            return
+        self._resolve(batch, results)
+
+    async def _execute(self, session: AsyncSession, batch: list[_PendingWrite]) -> list:
+        results: list = [None] * len(batch)
+
+        creates = [i for i, w in enumerate(batch) if w.kind == "create"]
+        if creates:
+            rows = await session.scalars(
+                insert(Vehicle).returning(Vehicle, sort_by_parameter_order=True),
+                [batch[i].values for i in creates],
+            )
+            for i, vehicle in zip(creates, rows.all()):
+                results[i] = vehicle
+
+        for i, write in enumerate(batch):
+            if write.kind != "update":
+                continue
+            if not write.values:
+                results[i] = await session.get(Vehicle, write.vehicle_id)
+                continue
+            row = await session.execute(
+                update(Vehicle)
+                .where(Vehicle.id == write.vehicle_id)
+                .values(**write.values, version=Vehicle.version + 1)
+                .returning(Vehicle),
+                execution_options={"synchronize_session": False},
+            )
+            results[i] = row.scalar_one_or_none()
+        return results
+
+    def _resolve(
+        self, batch: list[_PendingWrite], results: list = None, error: Exception = None
+    ) -> None:
+        for i, write in enumerate(batch):
+            if write.future.done():
+                continue
+            if error is not None:
+                write.future.set_exception(error)
+            else:
+                write.future.set_result(results[i])
+
+
+_batcher: Optional[VehicleWriteBatcher] = None
+
+
+def get_vehicle_write_batcher() -> Optional[VehicleWriteBatcher]:
+    """Dependency: retorna o batcher quando VEHICLE_WRITE_BATCH_ENABLED estiver ativo"""
+    global _batcher
+    if not settings.VEHICLE_WRITE_BATCH_ENABLED:
+        return None
+    if _batcher is None:
+        _batcher = VehicleWriteBatcher(
+            window_ms=settings.VEHICLE_WRITE_BATCH_WINDOW_MS,
+            max_batch_size=settings.VEHICLE_WRITE_BATCH_MAX_SIZE,
+        )
+    return _batcher
+
+
+async def close_vehicle_write_batcher() -> None:
+    global _batcher
+    if _batcher is not None:
+        await _batcher.close()
+        _batcher = None
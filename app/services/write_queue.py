@@ -0,0 +1,142 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.connection_hold import connection_hold
+from app.core.query_log import slow_query_log
+from app.core.sqlite_profile import apply_sqlite_profile, is_sqlite_file
+from app.core.statement_cache import engine_options
+from app.core.tracing import current_span, trace_sql, use_span
+
+WriteOperation = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class VehicleWriteQueue:
+    """
+    Escritor único para o banco de veículos em SQLite.
+
+    O SQLite aceita um escritor por vez: com várias conexões escrevendo, os
+    commits disputam o lock do banco, esperam o busy_timeout e podem falhar
+    com "database is locked". Aqui as escritas do VehicleService entram numa
+    fila e uma única tarefa as executa, uma de cada vez, numa conexão
+    dedicada; as leituras seguem no pool normal do engine, sem bloqueio
+    graças ao WAL.
+
+    A fila é limitada (max_size): quando cheia, quem escreve espera por
+    espaço, em vez de acumular escritas sem limite na memória.
+
+    A tarefa do escritor roda num contexto limpo, para que a posse da
+    conexão não seja atribuída à requisição que a iniciou; só o span de
+    quem enfileirou acompanha cada escrita, e o SQL dela entra no trace
+    dessa requisição.
+    """
+
+    def __init__(self, session_factory: sessionmaker, max_size: int = 1000):
+        self.session_factory = session_factory
+        self._queue: asyncio.Queue = asyncio.Queue(max_size)
+        self._worker: Optional[asyncio.Task] = None
+        self.writes = 0
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    async def run(self, operation: WriteOperation) -> Any:
+        """Executa operation(sessão do escritor) na vez dela e devolve o resultado"""
+        if self._worker is None or self._worker.done():
+            # Contexto limpo: o escritor não pertence à requisição que o iniciou
+            self._worker = asyncio.get_running_loop().create_task(
+                self._drain(), context=contextvars.Context()
+            )
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future, current_span()))
+        # shield: o cancelamento de quem pediu não interrompe a escrita em andamento
+        return await asyncio.shield(future)
+
+    async def _drain(self) -> None:
+        while True:
+            operation, future, span = await self._queue.get()
+            try:
+                with use_span(span):
+                    async with self.session_factory() as session:
+                        result = await operation(session)
+            except BaseException as error:
+                # Qualquer falha da escrita (inclusive CancelledError) vai para
+                # quem pediu; o escritor só para quando ele mesmo é cancelado
+                if not future.done():
+                    if isinstance(error, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(error)
+                if isinstance(error, asyncio.CancelledError) and asyncio.current_task().cancelling():
+                    raise
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.writes += 1
+                self._queue.task_done()
+
+    async def close(self) -> None:
+        """Aguarda as escritas enfileiradas e encerra o escritor"""
+        if self._worker is None:
+            return
+        if not self._worker.done():
+            await self._queue.join()
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+
+def create_writer_engine(url: str) -> AsyncEngine:
+    """Engine do escritor: uma única conexão, com o mesmo perfil do SQLite"""
+    writer = create_async_engine(
+        url,
+        echo=settings.SQL_ECHO,
+        future=True,
+        pool_size=1,
+        max_overflow=0,
+        **engine_options(url)
+    )
+    slow_query_log.attach(writer, "vehicles_writer")
+    connection_hold.attach(writer, "vehicles_writer")
+    trace_sql(writer, "vehicles_writer")
+    apply_sqlite_profile(writer)
+    return writer
+
+
+_writer_engine: Optional[AsyncEngine] = None
+_write_queue: Optional[VehicleWriteQueue] = None
+
+
+def get_vehicle_write_queue() -> Optional[VehicleWriteQueue]:
+    """
+    Dependency: fila do escritor único quando SQLITE_WRITE_QUEUE_ENABLED
+    estiver ativo e o banco de veículos for SQLite em arquivo
+    """
+    global _writer_engine, _write_queue
+    if not settings.SQLITE_WRITE_QUEUE_ENABLED or not is_sqlite_file(settings.DATABASE_URL):
+        return None
+    if _write_queue is None:
+        _writer_engine = create_writer_engine(settings.DATABASE_URL)
+        _write_queue = VehicleWriteQueue(
+            sessionmaker(_writer_engine, class_=AsyncSession, expire_on_commit=False),
+            max_size=settings.SQLITE_WRITE_QUEUE_MAX_SIZE,
+        )
+    return _write_queue
+
+
+async def close_vehicle_write_queue() -> None:
+    global _writer_engine, _write_queue
+    if _write_queue is not None:
+        await _write_queue.close()
+        _write_queue = None
+    if _writer_engine is not None:
+        await _writer_engine.dispose()
+        _writer_engine = None
@@ -0,0 +1,113 @@
+"""
+Carga mista de leituras e escritas num banco de veículos em SQLite.
+
+Compara o SQLite padrão (journal de rollback, cada requisição escrevendo
+pela própria conexão) com o perfil de produção (WAL, synchronous=NORMAL,
+mmap/cache, busy_timeout) e a fila do escritor único. Cada operação lê um
+veículo, lista os 20 mais baratos ou edita um preço, na proporção de
+--write-ratio. Reporta operações/s, latência p50/p95/p99 e falhas
+("database is locked").
+
+Uso:
+    python -m benchmarks.bench_sqlite_writer --ops 5000 --concurrency 100 --write-ratio 0.2
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from collections import Counter
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.sqlite_profile import apply_sqlite_profile
+from app.database import Base
+from app.models.catalog import marcas, modelos
+from app.models.vehicle import Vehicle
+from app.schemas.schemas import VehicleUpdate
+from app.services.vehicle_catalog import vehicle_catalog
+from app.services.vehicle_service import VehicleService
+from app.services.write_queue import VehicleWriteQueue, create_writer_engine
+from benchmarks.report import percentile
+
+
+async def _run(url: str, args, tuned: bool) -> None:
+    readers = create_async_engine(url, echo=False, connect_args={"timeout": args.busy_timeout})
+    writer = queue = None
+    if tuned:
+        apply_sqlite_profile(readers)
+        writer = create_writer_engine(url)
+        queue = VehicleWriteQueue(async_sessionmaker(writer, class_=AsyncSession, expire_on_commit=False))
+    Session = async_sessionmaker(readers, class_=AsyncSession, expire_on_commit=False)
+
+    async with readers.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # Banco novo a cada execução: o catálogo em memória da anterior não vale
+    vehicle_catalog.clear()
+    async with Session() as session:
+        await vehicle_catalog.register(session, ["Bench"], [f"M{i}" for i in range(50)])
+    async with readers.begin() as conn:
+        await conn.execute(insert(Vehicle), [
+            {"marca_id": marcas.require("Bench"), "modelo_id": modelos.require(f"M{i % 50}"),
+             "ano": 2020, "cor": "Preto", "preco": 10000 + i}
+            for i in range(args.vehicles)
+        ])
+
+    rng = random.Random(42)
+    plan = [
+        ("write" if rng.random() < args.write_ratio else rng.choice(("get", "list")), rng.randint(1, args.vehicles))
+        for _ in range(args.ops)
+    ]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, errors = [], Counter()
+
+    async def one(kind: str, vehicle_id: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async with Session() as session:
+                    service = VehicleService(session, writer=queue)
+                    if kind == "get":
+                        await service.get_vehicle(vehicle_id)
+                    elif kind == "list":
+                        await service.get_vehicles(limit=20)
+                    else:
+                        await service.update_vehicle(vehicle_id, VehicleUpdate(preco=rng.uniform(5000, 90000)))
+            except Exception as error:
+                errors[type(error).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(kind, vehicle_id) for kind, vehicle_id in plan))
+    elapsed = time.perf_counter() - start
+
+    if queue is not None:
+        await queue.close()
+        await writer.dispose()
+    await readers.dispose()
+
+    latencies.sort()
+    print(f"\n{'perfil de produção + escritor único' if tuned else 'SQLite padrão'}")
+    print(f"  throughput       : {len(plan) / elapsed:10.1f} ops/s")
+    print(f"  p50/p95/p99 (ms) : {percentile(latencies, 50) * 1000:.1f} / "
+          f"{percentile(latencies, 95) * 1000:.1f} / {percentile(latencies, 99) * 1000:.1f}")
+    print(f"  falhas           : {dict(errors) or 0}")
+
+
+async def main(args) -> None:
+    print(f"operações={args.ops} concorrência={args.concurrency} "
+          f"escritas={args.write_ratio:.0%} veículos={args.vehicles}")
+    for tuned in (False, True):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            await _run(f"sqlite+aiosqlite:///{tmpdir}/bench.db", args, tuned)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--vehicles", type=int, default=2000)
+    parser.add_argument("--busy-timeout", type=float, default=5.0, help="timeout do driver (s)")
+    asyncio.run(main(parser.parse_args()))
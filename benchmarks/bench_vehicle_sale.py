@@ -0,0 +1,111 @@
+"""
+Carga de compradores concorrentes disputando o mesmo veículo.
+
+Dispara N requisições simultâneas de compra do mesmo id e compara o PUT
+com status=VENDIDO (leitura + escrita: todos recebem 200 e nenhum sabe se
+foi ele quem comprou) com o POST /vehicles/{id}/sell (UPDATE condicional:
+um 200, os demais 409 imediatos). Reporta códigos de resposta, escritas
+efetivas (versões consumidas) e latência p50/p95/p99.
+
+Uso:
+    python -m benchmarks.bench_vehicle_sale --buyers 500 --rounds 5
+    BENCH_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_vehicle_sale
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base, get_db
+from app.main import app
+from app.models.vehicle import Vehicle
+from app.services.vehicle_catalog import vehicle_catalog
+from benchmarks.report import percentile
+
+VEHICLE = {"marca": "Bench", "modelo": "Disputado", "ano": 2024, "cor": "Preto", "preco": 99000.0}
+
+
+async def _race(client: httpx.AsyncClient, buyers: int, buy) -> tuple[Counter, list[float], float]:
+    latencies = []
+
+    async def one() -> int:
+        start = time.perf_counter()
+        response = await buy(client)
+        latencies.append(time.perf_counter() - start)
+        return response.status_code
+
+    start = time.perf_counter()
+    codes = Counter(await asyncio.gather(*(one() for _ in range(buyers))))
+    return codes, latencies, time.perf_counter() - start
+
+
+async def main(args) -> None:
+    url = os.getenv("BENCH_DATABASE_URL")
+    tmpdir = None
+    if url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite+aiosqlite:///{tmpdir.name}/bench.db"
+
+    engine = create_async_engine(url, echo=False)
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with Session() as session:
+        await vehicle_catalog.register(session, [VEHICLE["marca"]], [VEHICLE["modelo"]])
+
+    async def override_get_db():
+        async with Session() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    strategies = {
+        "PUT status=VENDIDO": lambda client, vid: client.put(
+            f"/api/v1/vehicles/{vid}", json={"status": "VENDIDO"}
+        ),
+        "POST /sell": lambda client, vid: client.post(f"/api/v1/vehicles/{vid}/sell"),
+    }
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    print(f"banco: {engine.url.render_as_string(hide_password=True)}")
+    print(f"compradores={args.buyers} rodadas={args.rounds}")
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, buy in strategies.items():
+                codes, latencies, elapsed, writes = Counter(), [], 0.0, 0
+                for _ in range(args.rounds):
+                    async with Session() as session:
+                        vehicle = Vehicle(**VEHICLE)
+                        session.add(vehicle)
+                        await session.commit()
+                    round_codes, round_latencies, round_elapsed = await _race(
+                        client, args.buyers, lambda c, vid=vehicle.id: buy(c, vid)
+                    )
+                    codes.update(round_codes)
+                    latencies.extend(round_latencies)
+                    elapsed += round_elapsed
+                    async with Session() as session:
+                        writes += (await session.get(Vehicle, vehicle.id)).version - 1
+                latencies.sort()
+                print(f"\n{name}")
+                print(f"  respostas        : {dict(sorted(codes.items()))}")
+                print(f"  escritas/rodada  : {writes / args.rounds:.1f}")
+                print(f"  throughput       : {len(latencies) / elapsed:10.1f} req/s")
+                print(f"  p50/p95/p99 (ms) : {percentile(latencies, 50) * 1000:.1f} / "
+                      f"{percentile(latencies, 95) * 1000:.1f} / {percentile(latencies, 99) * 1000:.1f}")
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--buyers", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,91 @@
+"""
+Benchmark do group commit de cadastros de veículos.
+
+Compara N cadastros concorrentes feitos um por transação (VehicleService
+padrão) com os mesmos cadastros agrupados pelo VehicleWriteBatcher.
+
+Uso:
+    python -m benchmarks.bench_write_batcher --writes 2000 --concurrency 200
+    BENCH_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_write_batcher
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.database import Base
+from app.schemas.schemas import VehicleCreate
+from app.services.vehicle_catalog import vehicle_catalog
+from app.services.vehicle_service import VehicleService
+from app.services.write_batcher import VehicleWriteBatcher
+
+
+def _vehicle(i: int) -> VehicleCreate:
+    return VehicleCreate(marca="Bench", modelo=f"M{i % 50}", ano=2020, cor="Preto", preco=10000 + i)
+
+
+async def _drive(writes: int, concurrency: int, create) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await create(_vehicle(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(writes)))
+    return writes / (time.perf_counter() - start)
+
+
+async def main(args) -> None:
+    url = os.getenv("BENCH_DATABASE_URL")
+    tmpdir = None
+    if url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite+aiosqlite:///{tmpdir.name}/bench.db"
+
+    engine = create_async_engine(url, echo=False)
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with Session() as session:
+        await vehicle_catalog.register(session, ["Bench"], [f"M{i}" for i in range(50)])
+
+    async def create_single(vehicle_in: VehicleCreate):
+        async with Session() as session:
+            await VehicleService(session).create_vehicle(vehicle_in)
+
+    batcher = VehicleWriteBatcher(
+        Session, window_ms=args.window_ms, max_batch_size=args.max_batch_size
+    )
+
+    single = await _drive(args.writes, args.concurrency, create_single)
+    async def create_batched(vehicle_in: VehicleCreate):
+        # Nomes já no catálogo: a codificação não vai ao banco
+        await batcher.create(await vehicle_catalog.encode(None, vehicle_in.model_dump()))
+
+    batched = await _drive(args.writes, args.concurrency, create_batched)
+    await batcher.close()
+
+    print(f"banco: {engine.url.render_as_string(hide_password=True)}")
+    print(f"escritas={args.writes} concorrência={args.concurrency} "
+          f"janela={args.window_ms}ms lote_max={args.max_batch_size}")
+    print(f"um commit por veículo : {single:10.1f} cadastros/s")
+    print(f"group commit          : {batched:10.1f} cadastros/s")
+    print(f"ganho                 : {batched / single:10.2f}x")
+
+    await engine.dispose()
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch-size", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,131 @@
+"""
+Gerador de carga HTTP.
+
+Dispara uma mistura configurável de rotas com N clientes concorrentes sobre
+um httpx.AsyncClient, que pode apontar para o app ASGI em processo ou para
+um servidor real, e registra a latência de cada requisição por rota.
+"""
+import asyncio
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+
+# Não importa nada de app/: o runner define as URLs dos bancos antes disso
+BENCH_PASSWORD = "bench-senha"
+
+ROUTES = ("list", "get", "create", "update", "login", "me")
+
+DEFAULT_MIX = {"list": 10, "get": 45, "create": 10, "update": 10, "login": 5, "me": 20}
+
+
+def bench_email(i: int) -> str:
+    return f"bench{i}@example.com"
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """Converte "list=20,get=40,..." em pesos por rota"""
+    mix = {}
+    for part in spec.split(","):
+        route, _, weight = part.partition("=")
+        route = route.strip()
+        if route not in ROUTES:
+            raise ValueError(f"rota desconhecida: {route!r} (válidas: {', '.join(ROUTES)})")
+        mix[route] = float(weight)
+    return mix
+
+
+@dataclass
+class Workload:
+    mix: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    concurrency: int = 20
+    requests: int = 2000
+    vehicles: int = 10000
+    users: int = 100
+    seed: int = 7
+
+
+@dataclass
+class LoadResult:
+    elapsed: float
+    latencies: dict[str, list[float]]
+    errors: dict[str, int]
+
+
+class _Driver:
+    def __init__(self, client: httpx.AsyncClient, workload: Workload, api_prefix: str):
+        self.client = client
+        self.workload = workload
+        self.vehicles_url = f"{api_prefix}/vehicles/"
+        self.token = None
+
+    async def setup(self) -> None:
+        response = await self.client.post(
+            "/auth/login", json={"email": bench_email(0), "password": BENCH_PASSWORD}
+        )
+        response.raise_for_status()
+        self.token = response.json()["access_token"]
+
+    async def request(self, route: str, rng: random.Random) -> httpx.Response:
+        vehicle_id = rng.randint(1, max(self.workload.vehicles, 1))
+        if route == "list":
+            return await self.client.get(self.vehicles_url, params={"status": "DISPONIVEL"})
+        if route == "get":
+            return await self.client.get(f"{self.vehicles_url}{vehicle_id}")
+        if route == "create":
+            return await self.client.post(self.vehicles_url, json={
+                "marca": "Bench", "modelo": "Carga", "ano": 2024, "cor": "Preto",
+                "preco": round(rng.uniform(20000, 350000), 2),
+            })
+        if route == "update":
+            return await self.client.put(
+                f"{self.vehicles_url}{vehicle_id}", json={"preco": round(rng.uniform(20000, 350000), 2)}
+            )
+        if route == "login":
+            return await self.client.post("/auth/login", json={
+                "email": bench_email(rng.randrange(max(self.workload.users, 1))),
+                "password": BENCH_PASSWORD,
+            })
+        if route == "me":
+            return await self.client.get(
+                "/auth/me", headers={"Authorization": f"Bearer {self.token}"}
+            )
+        raise ValueError(route)
+
+
+async def run_load(
+    client: httpx.AsyncClient, workload: Workload, api_prefix: str = "/api/v1"
+) -> LoadResult:
+    driver = _Driver(client, workload, api_prefix)
+    await driver.setup()
+
+    routes = [r for r in workload.mix if workload.mix[r] > 0]
+    weights = [workload.mix[r] for r in routes]
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    remaining = workload.requests
+
+    async def worker(n: int) -> None:
+        nonlocal remaining
+        rng = random.Random(workload.seed * 1000 + n)
+        while remaining > 0:
+            remaining -= 1
+            route = rng.choices(routes, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await driver.request(route, rng)
+                ok = response.status_code < 400 or (
+                    # ids sorteados podem ter sido removidos/arquivados: 404 é esperado
+                    route in ("get", "update") and response.status_code == 404
+                )
+            except httpx.HTTPError:
+                ok = False
+            latencies[route].append(time.perf_counter() - start)
+            if not ok:
+                errors[route] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(workload.concurrency)))
+    return LoadResult(time.perf_counter() - start, dict(latencies), dict(errors))
@@ -0,0 +1,136 @@
+"""
+Resumo dos resultados de carga e comparação com baselines versionados.
+"""
+import json
+import os
+import platform
+from pathlib import Path
+
+from benchmarks.load import LoadResult
+
+BASELINES_DIR = Path(__file__).parent / "baselines"
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Percentil por posição mais próxima (valores já ordenados)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(result: LoadResult) -> dict:
+    """Throughput geral e p50/p95/p99 (ms) por rota"""
+    routes = {}
+    for route, values in sorted(result.latencies.items()):
+        values = sorted(values)
+        routes[route] = {
+            "requests": len(values),
+            "errors": result.errors.get(route, 0),
+            "throughput": round(len(values) / result.elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {
+        "elapsed_s": round(result.elapsed, 3),
+        "throughput": round(total / result.elapsed, 2) if result.elapsed else 0.0,
+        "routes": routes,
+    }
+
+
+def errors(summary: dict) -> list[str]:
+    """Rotas com requisições que falharam (qualquer erro reprova a execução)"""
+    return [
+        f"{route}: {r['errors']} de {r['requests']} requisições com erro"
+        for route, r in summary["routes"].items() if r["errors"]
+    ]
+
+
+def environment() -> dict:
+    """Máquina em que os números foram medidos; baselines só valem na mesma"""
+    cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            cpu = next(
+                (line.split(":", 1)[1].strip() for line in cpuinfo if line.startswith("model name")), cpu
+            )
+    except OSError:
+        pass
+    return {
+        "python": platform.python_version(),
+        "system": f"{platform.system()} {platform.machine()}",
+        "cpu": cpu,
+        "cpus": os.cpu_count(),
+    }
+
+
+def mismatch(baseline: dict, config: dict) -> str | None:
+    """
+    Por que o baseline não serve de referência para esta execução (outra
+    configuração de carga ou outro ambiente), ou None se serve
+    """
+    if baseline.get("config") != config:
+        return f"configuração difere do baseline ({baseline.get('config')})"
+    if baseline.get("environment") != environment():
+        return f"baseline gravado em outro ambiente ({baseline.get('environment')} x {environment()})"
+    return None
+
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Lista regressões em relação ao baseline: throughput abaixo de
+    (1 - tolerance), p95 acima de (1 + tolerance) ou qualquer erro.
+    """
+    regressions = errors(summary)
+    if summary["throughput"] < baseline["throughput"] * (1 - tolerance):
+        regressions.append(
+            f"throughput total {summary['throughput']:.1f} req/s < baseline {baseline['throughput']:.1f}"
+        )
+    for route, base in baseline["routes"].items():
+        current = summary["routes"].get(route)
+        if current is None:
+            continue
+        if current["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{route}: throughput {current['throughput']:.1f} req/s < baseline {base['throughput']:.1f}"
+            )
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{route}: p95 {current['p95_ms']:.2f} ms > baseline {base['p95_ms']:.2f}"
+            )
+    return regressions
+
+
+def format_table(summary: dict, baseline: dict | None = None) -> str:
+    lines = [
+        f"{'rota':<8} {'reqs':>7} {'erros':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        + ("  Δp95" if baseline else "")
+    ]
+    for route, r in summary["routes"].items():
+        line = (
+            f"{route:<8} {r['requests']:>7} {r['errors']:>6} {r['throughput']:>9.1f} "
+            f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}"
+        )
+        base = baseline["routes"].get(route) if baseline else None
+        if base and base["p95_ms"]:
+            line += f"  {(r['p95_ms'] / base['p95_ms'] - 1) * 100:+.0f}%"
+        lines.append(line)
+    lines.append(f"total: {summary['throughput']:.1f} req/s em {summary['elapsed_s']:.2f}s")
+    return "\n".join(lines)
+
+
+def load_baseline(name: str) -> dict | None:
+    path = BASELINES_DIR / f"{name}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def save_baseline(name: str, summary: dict, config: dict) -> Path:
+    BASELINES_DIR.mkdir(exist_ok=True)
+    path = BASELINES_DIR / f"{name}.json"
+    record = {"config": config, "environment": environment(), **summary}
+    path.write_text(json.dumps(record, indent=2, ensure_ascii=False) + "\n")
+    return path
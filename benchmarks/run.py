@@ -0,0 +1,217 @@
+"""
+Benchmark HTTP ponta a ponta com baselines versionados.
+
+Popula bancos com dados sintéticos, dispara uma mistura de rotas (listagem,
+busca, cadastro, edição, login e /auth/me) e reporta throughput e
+p50/p95/p99 por rota. O resultado é comparado com
+benchmarks/baselines/<cenário>-<modo>.json e o processo termina com código 1
+se houver regressão além da tolerância ou qualquer requisição com erro. Um
+baseline só vale na máquina (ambiente) e com a carga em que foi gravado:
+comparar com um baseline de outro ambiente ou configuração também termina
+com código 1, em vez de passar sem comparar.
+
+Uso:
+    python -m benchmarks.run --scenario smoke
+    python -m benchmarks.run --scenario smoke --mode uvicorn
+    python -m benchmarks.run --vehicles 50000 --mix "list=50,get=50" --concurrency 100
+    python -m benchmarks.run --scenario smoke --save-baseline
+    python -m benchmarks.run --scenario smoke --save-baseline --baseline ci-base  # ref base, no job
+    python -m benchmarks.run --scenario smoke --baseline ci-base                  # HEAD, mesmo job
+"""
+import argparse
+import asyncio
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+SCENARIOS = {
+    "smoke": {"vehicles": 10_000, "users": 100, "concurrency": 20, "requests": 2_000},
+    "medium": {"vehicles": 100_000, "users": 1_000, "concurrency": 50, "requests": 10_000},
+    "large": {"vehicles": 1_000_000, "users": 10_000, "concurrency": 100, "requests": 20_000},
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"servidor encerrou com código {process.returncode}")
+            try:
+                if (await client.get(f"{url}/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"servidor não respondeu em {timeout}s")
+
+
+async def _run_in_process(workload):
+    import httpx
+    from app.database import engine, auth_engine
+    from app.main import app
+    from benchmarks.load import run_load
+
+    # O log de SQL síncrono distorce os números; o benchmark mede o serviço
+    engine.echo = False
+    auth_engine.echo = False
+
+    async with app.router.lifespan_context(app):
+        # Erros 500 viram erros contabilizados, não exceções no cliente
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_load(client, workload)
+
+
+async def _run_server(workload, command: list[str], port: int):
+    import httpx
+    from benchmarks.load import run_load
+
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        command, env=os.environ.copy(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        await _wait_ready(url, process)
+        limits = httpx.Limits(max_connections=workload.concurrency)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+            return await run_load(client, workload)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _measure(args, config: dict, tmpdir: str):
+    """Popula os bancos (temporários, salvo URLs definidas) e aplica a carga"""
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tmpdir}/vehicles.db")
+    os.environ.setdefault("AUTH_DATABASE_URL", f"sqlite+aiosqlite:///{tmpdir}/auth.db")
+
+    # Importados só depois de definir as URLs: o app lê Settings na importação
+    from benchmarks.load import Workload, parse_mix
+    from benchmarks.seed import seed
+
+    print(f"seed: {config['vehicles']} veículos, {config['users']} usuários")
+    await seed(os.environ["DATABASE_URL"], os.environ["AUTH_DATABASE_URL"],
+               config["vehicles"], config["users"])
+
+    workload = Workload(
+        mix=parse_mix(config["mix"]),
+        concurrency=config["concurrency"],
+        requests=config["requests"],
+        vehicles=config["vehicles"],
+        users=config["users"],
+    )
+    print(f"carga: {workload.requests} requisições, concorrência {workload.concurrency}, "
+          f"mix {config['mix']}, modo {args.mode}")
+
+    if args.mode == "inprocess":
+        return await _run_in_process(workload)
+    port = _free_port()
+    command = (
+        shlex.split(args.server_cmd.format(port=port)) if args.server_cmd else
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    )
+    return await _run_server(workload, command, port)
+
+
+async def main(args) -> int:
+    preset = SCENARIOS.get(args.scenario, {})
+    config = {
+        "scenario": args.scenario,
+        "mode": args.mode,
+        "vehicles": args.vehicles or preset.get("vehicles", 10_000),
+        "users": args.users or preset.get("users", 100),
+        "concurrency": args.concurrency or preset.get("concurrency", 20),
+        "requests": args.requests or preset.get("requests", 2_000),
+        "mix": args.mix,
+    }
+
+    tmpdir = tempfile.TemporaryDirectory(prefix="vehicle-bench-")
+    try:
+        result = await _measure(args, config, tmpdir.name)
+    finally:
+        tmpdir.cleanup()
+
+    from benchmarks.report import (
+        compare, errors, format_table, load_baseline, mismatch, save_baseline, summarize,
+    )
+
+    summary = summarize(result)
+    baseline_name = args.baseline or f"{args.scenario}-{args.mode}"
+    baseline = load_baseline(baseline_name)
+    print(format_table(summary, baseline))
+
+    failures = errors(summary)
+    if failures:
+        # Requisições com erro nunca viram referência nem passam na comparação
+        print("\nERROS na execução:", file=sys.stderr)
+        for line in failures:
+            print(f"  - {line}", file=sys.stderr)
+        return 1
+    if args.save_baseline:
+        path = save_baseline(baseline_name, summary, config)
+        print(f"baseline salvo em {path}")
+        return 0
+    if baseline is None:
+        if args.baseline:
+            # Referência pedida explicitamente (ex: gravada no mesmo job de CI)
+            print(f"baseline '{baseline_name}' não encontrado", file=sys.stderr)
+            return 1
+        print(f"sem baseline '{baseline_name}' para comparar (use --save-baseline)")
+        return 0
+    reason = mismatch(baseline, config)
+    if reason:
+        print(f"\nbaseline '{baseline_name}' não é comparável: {reason}. Grave a "
+              f"referência neste ambiente (--save-baseline) ou no mesmo job, a partir "
+              f"do commit base.", file=sys.stderr)
+        return 1
+
+    regressions = compare(summary, baseline, args.tolerance)
+    if regressions:
+        print(f"\nREGRESSÃO em relação ao baseline '{baseline_name}' "
+              f"(tolerância {args.tolerance:.0%}):", file=sys.stderr)
+        for line in regressions:
+            print(f"  - {line}", file=sys.stderr)
+        return 1
+    print(f"\nsem regressões em relação ao baseline '{baseline_name}'")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from benchmarks.load import DEFAULT_MIX
+
+    parser = argparse.ArgumentParser(description="Benchmark HTTP ponta a ponta")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="smoke")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess",
+                        help="app ASGI em processo ou servidor em subprocesso")
+    parser.add_argument("--server-cmd",
+                        help="comando do servidor no modo uvicorn; {port} é substituído")
+    parser.add_argument("--vehicles", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--requests", type=int)
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()))
+    parser.add_argument("--baseline", help="nome do baseline (padrão: <cenário>-<modo>)")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(build_parser().parse_args())))
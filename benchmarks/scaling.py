@@ -0,0 +1,58 @@
+"""
+Escalabilidade do servidor de produção (app/server.py) por número de workers.
+
+Popula os bancos uma vez e roda a mesma carga do benchmark HTTP contra
+`python -m app.server --workers N` para cada N, reportando o throughput e o
+ganho em relação a um worker.
+
+Uso:
+    python -m benchmarks.scaling --workers 1,2,4 --requests 4000 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+from benchmarks.run import _free_port, _run_server
+
+
+async def main(args) -> None:
+    tmpdir = tempfile.TemporaryDirectory(prefix="vehicle-scaling-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tmpdir.name}/vehicles.db")
+    os.environ.setdefault("AUTH_DATABASE_URL", f"sqlite+aiosqlite:///{tmpdir.name}/auth.db")
+    # Escalabilidade de CPU: sem arquivador concorrendo pela escrita
+    os.environ.setdefault("VEHICLE_ARCHIVE_ENABLED", "false")
+
+    # Importados só depois de definir as URLs: o app lê Settings na importação
+    from benchmarks.load import Workload, parse_mix
+    from benchmarks.report import summarize
+    from benchmarks.seed import seed
+
+    await seed(os.environ["DATABASE_URL"], os.environ["AUTH_DATABASE_URL"], args.vehicles, args.users)
+    workload = Workload(
+        mix=parse_mix(args.mix), concurrency=args.concurrency, requests=args.requests,
+        vehicles=args.vehicles, users=args.users,
+    )
+
+    baseline = None
+    print(f"{'workers':>7} {'req/s':>9} {'ganho':>7}")
+    for workers in (int(n) for n in args.workers.split(",")):
+        port = _free_port()
+        command = [sys.executable, "-m", "app.server", "--host", "127.0.0.1",
+                   "--port", str(port), "--workers", str(workers)]
+        summary = summarize(await _run_server(workload, command, port))
+        baseline = baseline or summary["throughput"]
+        print(f"{workers:>7} {summary['throughput']:>9.1f} {summary['throughput'] / baseline:>6.2f}x")
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--vehicles", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=4_000)
+    parser.add_argument("--mix", default="get=60,me=30,list=10")
+    asyncio.run(main(parser.parse_args()))
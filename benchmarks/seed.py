@@ -0,0 +1,94 @@
+"""
+Carga sintética de veículos e usuários para os benchmarks.
+
+Os veículos são inseridos em lotes via INSERT multi-linha, referenciando
+um catálogo de marcas e modelos com ids fixos; os usuários
+compartilham um único hash BCrypt da mesma senha, para que o seed de
+milhares de contas não seja dominado pelo custo do hash.
+"""
+import random
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.security import get_password_hash
+from app.database import Base, AuthBase
+from app.models.catalog import Marca, Modelo, catalog_key
+from app.models.user import User
+from app.models.vehicle import Vehicle, VehicleStatus
+from benchmarks.load import BENCH_PASSWORD, bench_email
+
+MARCAS = {
+    "Toyota": ["Corolla", "Yaris", "Hilux", "RAV4"],
+    "Honda": ["Civic", "City", "HR-V", "Fit"],
+    "Ford": ["Ka", "Focus", "Ranger", "EcoSport"],
+    "Chevrolet": ["Onix", "Cruze", "S10", "Tracker"],
+    "Volkswagen": ["Gol", "Polo", "T-Cross", "Virtus"],
+    "Fiat": ["Uno", "Argo", "Toro", "Mobi"],
+}
+CORES = ["Preto", "Branco", "Prata", "Vermelho", "Azul", "Cinza"]
+
+# Ids do catálogo: posição (1-based) na ordem de MARCAS
+MARCA_IDS = {marca: i for i, marca in enumerate(MARCAS, 1)}
+MODELO_IDS = {modelo: i for i, modelo in enumerate((m for ms in MARCAS.values() for m in ms), 1)}
+
+
+def synthetic_vehicles(count: int, sold_ratio: float = 0.3, seed: int = 42):
+    rng = random.Random(seed)
+    marcas = list(MARCAS)
+    now = datetime.utcnow()
+    for _ in range(count):
+        marca = rng.choice(marcas)
+        yield {
+            "marca_id": MARCA_IDS[marca],
+            "modelo_id": MODELO_IDS[rng.choice(MARCAS[marca])],
+            "ano": rng.randint(2005, 2025),
+            "cor": rng.choice(CORES),
+            "preco": round(rng.uniform(20000, 350000), 2),
+            "status": VehicleStatus.VENDIDO if rng.random() < sold_ratio else VehicleStatus.DISPONIVEL,
+            "data_cadastro": now,
+        }
+
+
+async def seed(
+    database_url: str,
+    auth_database_url: str,
+    vehicles: int,
+    users: int,
+    chunk_size: int = 5000,
+) -> None:
+    """Recria as tabelas e popula os dois bancos"""
+    engine = create_async_engine(database_url, echo=False)
+    auth_engine = create_async_engine(auth_database_url, echo=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        for model, ids in ((Marca, MARCA_IDS), (Modelo, MODELO_IDS)):
+            await conn.execute(insert(model), [
+                {"id": entry_id, "chave": catalog_key(nome), "nome": nome} for nome, entry_id in ids.items()
+            ])
+        chunk = []
+        for row in synthetic_vehicles(vehicles):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                await conn.execute(insert(Vehicle), chunk)
+                chunk = []
+        if chunk:
+            await conn.execute(insert(Vehicle), chunk)
+
+    hashed = get_password_hash(BENCH_PASSWORD)
+    async with auth_engine.begin() as conn:
+        await conn.run_sync(AuthBase.metadata.drop_all)
+        await conn.run_sync(AuthBase.metadata.create_all)
+        rows = [
+            {"email": bench_email(i), "hashed_password": hashed, "full_name": f"Bench {i}",
+             "is_active": True, "created_at": datetime.utcnow()}
+            for i in range(users)
+        ]
+        for start in range(0, len(rows), chunk_size):
+            await conn.execute(insert(User), rows[start:start + chunk_size])
+
+    await engine.dispose()
+    await auth_engine.dispose()
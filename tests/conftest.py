@@ -3,8 +3,13 @@ import pytest_asyncio
 import asyncio
 from unittest.mock import patch
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import update
+from sqlalchemy.pool import StaticPool
 from app.database import Base, AuthBase, get_db, get_auth_db
+from app.core.throttle import InMemoryThrottleBackend, LoginThrottle, get_login_throttle
 from app.main import app
+from app.models.user import User
+from app.services.vehicle_catalog import vehicle_catalog
 
 
 # Criar engines de teste em memória
@@ -17,6 +22,11 @@ test_auth_engine = create_async_engine(TEST_AUTH_DATABASE_URL, echo=False)
 TestSessionLocal = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
 TestAuthSessionLocal = async_sessionmaker(test_auth_engine, class_=AsyncSession, expire_on_commit=False)
 
+# Banco em memória compartilhado entre sessões (para componentes que abrem
+# as próprias sessões, como o batcher de escritas e o arquivador)
+shared_engine = create_async_engine(TEST_DATABASE_URL, echo=False, poolclass=StaticPool)
+SharedSessionLocal = async_sessionmaker(shared_engine, class_=AsyncSession, expire_on_commit=False)
+
 
 # Mock simples para bcrypt nos testes
 def mock_hash(password: str) -> str:
@@ -25,6 +35,15 @@ def mock_hash(password: str) -> str:
 def mock_verify(plain_password: str, hashed_password: str) -> bool:
     return f"hashed_{plain_password}" == hashed_password
 
+async def mock_hash_many(passwords: list[str]) -> list[str]:
+    return [mock_hash(password) for password in passwords]
+
+
+@pytest.fixture(autouse=True)
+def fresh_vehicle_catalog():
+    """Os bancos de teste são recriados a cada teste: o catálogo em memória também"""
+    vehicle_catalog.clear()
+
 
 @pytest_asyncio.fixture(scope="function")
 async def db_session():
@@ -52,6 +71,18 @@ async def auth_db_session():
         await conn.run_sync(AuthBase.metadata.drop_all)
 
 
+@pytest_asyncio.fixture(scope="function")
+async def shared_session_factory():
+    """Fábrica de sessões sobre um único banco em memória compartilhado"""
+    async with shared_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    yield SharedSessionLocal
+    
+    async with shared_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+
 @pytest_asyncio.fixture(scope="function")
 async def override_dependencies(db_session, auth_db_session):
     """Sobrescreve as dependências do FastAPI para usar os bancos de teste"""
@@ -65,10 +96,14 @@ async def override_dependencies(db_session, auth_db_session):
     with patch('app.core.security.get_password_hash', side_effect=mock_hash), \
          patch('app.core.security.verify_password', side_effect=mock_verify), \
          patch('app.services.user_service.get_password_hash', side_effect=mock_hash), \
-         patch('app.services.user_service.verify_password', side_effect=mock_verify):
+         patch('app.services.user_service.verify_password', side_effect=mock_verify), \
+         patch('app.services.user_service.hash_passwords', side_effect=mock_hash_many):
         
         app.dependency_overrides[get_db] = override_get_db
         app.dependency_overrides[get_auth_db] = override_get_auth_db
+        # Contadores de login isolados por teste
+        throttle = LoginThrottle(InMemoryThrottleBackend())
+        app.dependency_overrides[get_login_throttle] = lambda: throttle
         
         yield
         
@@ -81,3 +116,9 @@ def event_loop():
     loop = asyncio.get_event_loop_policy().new_event_loop()
     yield loop
     loop.close()
+
+
+async def promote_to_admin(session: AsyncSession, email: str) -> None:
+    """Marca o usuário como administrador (endpoints /admin)"""
+    await session.execute(update(User).where(User.email == email).values(is_admin=True))
+    await session.commit()
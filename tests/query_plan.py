@@ -0,0 +1,130 @@
+"""
+Harness de planos de consulta para os testes.
+
+Captura todo SQL emitido por um engine enquanto um bloco rotulado roda e,
+depois, executa EXPLAIN QUERY PLAN (SQLite) ou EXPLAIN (PostgreSQL) em cada
+comando capturado, apontando varreduras completas e ordenações em memória.
+
+O PostgreSQL roda com as configurações padrão do planejador: com poucas
+linhas ele prefere varrer a tabela, então o banco precisa estar populado
+(e analisado) em volume realista. Tabelas pequenas por natureza, como o
+catálogo de marcas/modelos, podem ser dispensadas com `small_tables`.
+"""
+import json
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@dataclass
+class CapturedStatement:
+    label: str
+    statement: str
+    parameters: tuple
+
+
+@dataclass
+class PlanReport:
+    statement: CapturedStatement
+    plan: list[str]
+    problems: list[str] = field(default_factory=list)
+
+
+class QueryPlanHarness:
+    """Captura comandos por rótulo e verifica os planos escolhidos pelo banco"""
+
+    EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+    def __init__(self, engine: AsyncEngine, small_tables: tuple[str, ...] = ()):
+        self.engine = engine
+        self.small_tables = small_tables
+        self.captured: list[CapturedStatement] = []
+
+    @contextmanager
+    def capture(self, label: str):
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(self.EXPLAINABLE):
+                if executemany:
+                    # O plano é o mesmo para todas as linhas do lote
+                    parameters = parameters[0] if parameters else ()
+                self.captured.append(
+                    CapturedStatement(label, statement, tuple(parameters or ()))
+                )
+
+        event.listen(self.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield
+        finally:
+            event.remove(self.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    def labels(self) -> list[str]:
+        return list(dict.fromkeys(s.label for s in self.captured))
+
+    def statements(self, label: str) -> list[CapturedStatement]:
+        return [s for s in self.captured if s.label == label]
+
+    async def explain(self, label: str) -> list[PlanReport]:
+        reports = []
+        async with self.engine.connect() as conn:
+            for captured in self.statements(label):
+                if self.engine.dialect.name == "postgresql":
+                    reports.append(await self._explain_postgres(conn, captured))
+                else:
+                    reports.append(await self._explain_sqlite(conn, captured))
+        return reports
+
+    async def _explain_sqlite(self, conn, captured: CapturedStatement) -> PlanReport:
+        rows = (await conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + captured.statement, captured.parameters
+        )).all()
+        plan = [row[-1] for row in rows]
+        report = PlanReport(captured, plan)
+        for detail in plan:
+            # "SCAN t" sem índice é varredura completa; "SCAN t USING INDEX" é
+            # percurso ordenado de índice, aceitável para listagens.
+            # "SCAN n CONSTANT ROWS" é a lista VALUES de um INSERT multi-linha
+            full_scan = detail.startswith("SCAN ") and " USING " not in detail
+            if full_scan and "CONSTANT ROW" not in detail and not self._small(detail):
+                report.problems.append(f"varredura completa: {detail}")
+            if "TEMP B-TREE" in detail:
+                report.problems.append(f"ordenação em memória: {detail}")
+        return report
+
+    async def _explain_postgres(self, conn, captured: CapturedStatement) -> PlanReport:
+        raw = (await conn.exec_driver_sql(
+            "EXPLAIN (FORMAT JSON) " + captured.statement, captured.parameters
+        )).scalar()
+        root = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+        plan = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            plan.append(f"{node['Node Type']} {node.get('Relation Name', '')}".strip())
+            stack.extend(node.get("Plans", []))
+        report = PlanReport(captured, plan)
+        for detail in plan:
+            if detail.startswith("Seq Scan") and not self._small(detail):
+                report.problems.append(f"varredura completa: {detail}")
+            if detail.startswith(("Sort", "Incremental Sort")):
+                report.problems.append(f"ordenação em memória: {detail}")
+        return report
+
+    def _small(self, detail: str) -> bool:
+        return detail.split()[-1] in self.small_tables
+
+    async def assert_indexed(self, label: str, allow: tuple[str, ...] = ()) -> None:
+        """
+        Falha se algum comando do rótulo usar varredura completa ou ordenação.
+        `allow` lista trechos de problemas aceitos de propósito (ex: a listagem
+        sem filtro, que devolve a tabela inteira).
+        """
+        reports = await self.explain(label)
+        assert reports, f"nenhum comando capturado para '{label}'"
+        failures = []
+        for r in reports:
+            problems = [p for p in r.problems if not any(allowed in p for allowed in allow)]
+            if problems:
+                failures.append(f"{r.statement.statement}\n  plano: {r.plan}\n  problemas: {problems}")
+        assert not failures, f"plano regrediu em '{label}':\n" + "\n".join(failures)
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from sqlalchemy.future import select
+
+from app.core import security
+from app.models.user import User
+from app.schemas.schemas import UserLogin
+from app.services import user_service
+from app.services.user_service import UserService
+from tests.conftest import mock_hash, mock_verify
+
+
+@pytest.fixture
+def restore_pwd_context():
+    saved = security.pwd_context.to_dict()
+    yield security.pwd_context
+    security.pwd_context.load(saved)
+
+
+def _synthetic_hash_time(rounds, samples=3):
+    # 1 ms no custo 4, dobrando a cada round
+    return 0.001 * 2 ** (rounds - 4)
+
+
+def test_calibrate_picks_largest_cost_within_budget():
+    with patch.object(security, "_time_hash", side_effect=_synthetic_hash_time):
+        assert security.calibrate_bcrypt_rounds(100, min_rounds=4, max_rounds=16) == 10
+        assert security.calibrate_bcrypt_rounds(300, min_rounds=4, max_rounds=16) == 12
+        # limitado à faixa configurada
+        assert security.calibrate_bcrypt_rounds(100, min_rounds=11, max_rounds=16) == 11
+        assert security.calibrate_bcrypt_rounds(10_000, min_rounds=4, max_rounds=12) == 12
+
+
+def test_configure_sets_rehash_range(restore_pwd_context):
+    with patch.object(security.settings, "BCRYPT_ROUNDS", 6), \
+         patch.object(security.settings, "BCRYPT_MIN_ROUNDS", 4), \
+         patch.object(security.settings, "BCRYPT_ROUNDS_TOLERANCE", 1):
+        assert security.configure_bcrypt_rounds() == 6
+
+    handler = restore_pwd_context.handler("bcrypt")
+    assert security.get_password_hash("senha").startswith("$2b$06$")
+    assert not security.password_needs_rehash(handler.using(rounds=7).hash("senha"))
+    assert security.password_needs_rehash(handler.using(rounds=4).hash("senha"))
+    assert security.password_needs_rehash(handler.using(rounds=9).hash("senha"))
+    assert not security.password_needs_rehash("hash-desconhecido")
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_out_of_range_hash_in_background(auth_db_session):
+    auth_db_session.add(User(email="velho@example.com", hashed_password=mock_hash("senha123")))
+    await auth_db_session.commit()
+
+    with patch("app.services.user_service.verify_password", side_effect=mock_verify), \
+         patch("app.services.user_service.password_needs_rehash", return_value=True), \
+         patch("app.services.user_service.get_password_hash", return_value="novo-hash"):
+        result = await UserService(auth_db_session).authenticate_user(
+            UserLogin(email="velho@example.com", password="senha123")
+        )
+        assert result["token_type"] == "bearer"
+        await asyncio.gather(*user_service._rehash_tasks)
+
+    auth_db_session.expire_all()
+    user = (await auth_db_session.scalars(select(User))).one()
+    assert user.hashed_password == "novo-hash"
+
+
+@pytest.mark.asyncio
+async def test_login_keeps_in_range_hash(auth_db_session):
+    auth_db_session.add(User(email="atual@example.com", hashed_password=mock_hash("senha123")))
+    await auth_db_session.commit()
+
+    with patch("app.services.user_service.verify_password", side_effect=mock_verify), \
+         patch("app.services.user_service.password_needs_rehash", return_value=False):
+        await UserService(auth_db_session).authenticate_user(
+            UserLogin(email="atual@example.com", password="senha123")
+        )
+    assert not user_service._rehash_tasks
@@ -0,0 +1,71 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app
+from benchmarks.load import BENCH_PASSWORD, Workload, bench_email, parse_mix, run_load
+from benchmarks.report import compare, environment, mismatch, percentile, summarize
+
+
+def test_percentile_nearest_rank():
+    values = sorted(float(i) for i in range(1, 101))
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) == 0.0
+
+
+def test_parse_mix_rejects_unknown_route():
+    assert parse_mix("list=1,get=3") == {"list": 1.0, "get": 3.0}
+    with pytest.raises(ValueError):
+        parse_mix("list=1,delete=1")
+
+
+def test_compare_flags_regressions():
+    baseline = {
+        "throughput": 100.0,
+        "routes": {"get": {"requests": 100, "errors": 0, "throughput": 100.0, "p95_ms": 10.0}},
+    }
+    same = {
+        "throughput": 95.0,
+        "routes": {"get": {"requests": 100, "errors": 0, "throughput": 95.0, "p95_ms": 11.0}},
+    }
+    worse = {
+        "throughput": 50.0,
+        "routes": {"get": {"requests": 100, "errors": 5, "throughput": 50.0, "p95_ms": 30.0}},
+    }
+    assert compare(same, baseline, tolerance=0.25) == []
+    regressions = compare(worse, baseline, tolerance=0.25)
+    assert len(regressions) == 4
+    
+    # Qualquer erro reprova, mesmo que o baseline também tivesse erros
+    baseline["routes"]["get"]["errors"] = 10
+    one_error = {
+        "throughput": 100.0,
+        "routes": {"get": {"requests": 100, "errors": 1, "throughput": 100.0, "p95_ms": 10.0}},
+    }
+    assert compare(one_error, baseline, tolerance=0.25) == ["get: 1 de 100 requisições com erro"]
+
+
+def test_baseline_from_another_environment_or_load_is_not_comparable():
+    config = {"scenario": "smoke", "mode": "inprocess", "requests": 2000}
+    baseline = {"config": dict(config), "environment": environment()}
+    assert mismatch(baseline, config) is None
+    assert "configuração" in mismatch(baseline, {**config, "requests": 10})
+    baseline["environment"] = {**environment(), "python": "2.7.18"}
+    assert "ambiente" in mismatch(baseline, config)
+
+
+@pytest.mark.asyncio
+async def test_run_load_in_process(override_dependencies):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.post("/auth/register", json={"email": bench_email(0), "password": BENCH_PASSWORD})
+        await ac.post("/api/v1/vehicles/", json={
+            "marca": "Fiat", "modelo": "Uno", "ano": 2020, "cor": "Branco", "preco": 30000
+        })
+        workload = Workload(concurrency=1, requests=60, vehicles=1, users=1)
+        result = await run_load(ac, workload)
+
+    summary = summarize(result)
+    assert sum(r["requests"] for r in summary["routes"].values()) == 60
+    assert set(summary["routes"]) <= {"list", "get", "create", "update", "login", "me"}
+    assert all(r["errors"] == 0 for r in summary["routes"].values())
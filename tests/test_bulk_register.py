@@ -0,0 +1,118 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import patch
+from sqlalchemy import func, select
+
+from app.core import security
+from app.main import app
+from app.models.user import User
+from app.schemas.schemas import UserCreate
+from app.services.user_service import UserService
+from tests.conftest import promote_to_admin
+
+
+async def _auth_headers(ac: AsyncClient, auth_db_session=None, email: str = "admin@example.com") -> dict:
+    """Token de um usuário novo; administrador quando recebe a sessão de auth"""
+    await ac.post("/auth/register", json={"email": email, "password": "senha123"})
+    if auth_db_session is not None:
+        await promote_to_admin(auth_db_session, email)
+    response = await ac.post("/auth/login", json={"email": email, "password": "senha123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_bulk_register_reports_created_and_duplicates(override_dependencies, auth_db_session):
+    """Emails já cadastrados e repetidos no lote voltam como duplicados, na ordem"""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        headers = await _auth_headers(ac, auth_db_session)
+        await ac.post("/auth/register", json={"email": "existente@example.com", "password": "senha123"})
+        
+        payload = {"users": [
+            {"email": "novo1@example.com", "password": "senha123", "full_name": "Novo Um"},
+            {"email": "existente@example.com", "password": "senha123"},
+            {"email": "novo2@example.com", "password": "senha456"},
+            {"email": "novo1@example.com", "password": "outrasenha"},
+        ]}
+        response = await ac.post("/auth/register/bulk", json=payload, headers=headers)
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert data["duplicates"] == 2
+    assert [(r["email"], r["status"]) for r in data["results"]] == [
+        ("novo1@example.com", "created"),
+        ("existente@example.com", "duplicate"),
+        ("novo2@example.com", "created"),
+        ("novo1@example.com", "duplicate"),
+    ]
+    assert data["results"][0]["id"] is not None
+    assert data["results"][1]["id"] is None
+    
+    user = (await auth_db_session.execute(
+        select(User).where(User.email == "novo1@example.com")
+    )).scalar_one()
+    # A primeira ocorrência vence
+    assert user.hashed_password == "hashed_senha123"
+    assert user.full_name == "Novo Um"
+    assert user.is_active
+
+
+@pytest.mark.asyncio
+async def test_bulk_register_requires_admin(override_dependencies, auth_db_session):
+    payload = {"users": [{"email": "x@example.com", "password": "senha123"}]}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/auth/register/bulk", json=payload)
+        assert response.status_code in (401, 403)
+        
+        # Qualquer conta recém-criada tem JWT: só administradores migram contas em lote
+        headers = await _auth_headers(ac, email="comum@example.com")
+        with patch("app.services.user_service.hash_passwords") as hash_passwords:
+            response = await ac.post("/auth/register/bulk", json=payload, headers=headers)
+        assert response.status_code == 403
+        hash_passwords.assert_not_called()
+    
+    assert await auth_db_session.scalar(
+        select(func.count()).select_from(User).where(User.email == "x@example.com")
+    ) == 0
+
+
+@pytest.mark.asyncio
+async def test_bulk_register_rejects_oversized_batch(override_dependencies, auth_db_session):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        headers = await _auth_headers(ac, auth_db_session)
+        payload = {"users": [
+            {"email": f"u{i}@example.com", "password": "senha123"} for i in range(3)
+        ]}
+        with patch("app.routers.auth.settings.USER_BULK_MAX_SIZE", 2):
+            response = await ac.post("/auth/register/bulk", json=payload, headers=headers)
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_spans_multiple_statements(override_dependencies, auth_db_session):
+    """Lotes maiores que o bloco de INSERT são divididos em várias instruções"""
+    users = [UserCreate(email=f"lote{i}@example.com", password="senha123") for i in range(25)]
+    with patch("app.services.user_service.BULK_INSERT_CHUNK_SIZE", 10):
+        results = await UserService(auth_db_session).create_users_bulk(users)
+    
+    assert all(r.status == "created" for r in results)
+    assert len({r.id for r in results}) == 25
+    total = await auth_db_session.scalar(select(func.count()).select_from(User))
+    assert total == 25
+
+
+@pytest.mark.asyncio
+async def test_hash_passwords_uses_process_pool():
+    """Hashes reais gerados nos processos do pool, verificáveis e na ordem"""
+    original = security.pwd_context.to_dict()
+    security.pwd_context.update(bcrypt__default_rounds=4, bcrypt__min_rounds=4)
+    try:
+        with patch.object(security.settings, "PASSWORD_HASH_WORKERS", 2):
+            hashes = await security.hash_passwords(["senha-a", "senha-b", "senha-c"])
+        assert [h.split("$")[2] for h in hashes] == ["04", "04", "04"]
+        assert security.verify_password("senha-a", hashes[0])
+        assert security.verify_password("senha-c", hashes[2])
+        assert not security.verify_password("senha-a", hashes[1])
+    finally:
+        security.shutdown_hash_pool()
+        security.pwd_context.load(original)
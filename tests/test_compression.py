@@ -0,0 +1,193 @@
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import patch
+
+from app.core.compression import (
+    CompressedBodyCache,
+    CompressionMiddleware,
+    body_etag,
+    brotli_available,
+    choose_encoding,
+    encoded_etag,
+    etag_matches,
+)
+from app.main import app
+
+LARGE_BODY = json.dumps([{"marca": "Toyota", "modelo": "Corolla", "preco": i} for i in range(200)]).encode()
+
+
+def _build_app(**options):
+    inner = FastAPI()
+
+    @inner.get("/versioned")
+    async def versioned():
+        return Response(LARGE_BODY, media_type="application/json", headers={"ETag": body_etag(LARGE_BODY)})
+
+    @inner.get("/items/{item_id}")
+    async def item(item_id: int):
+        # ETag forte igual em todos os itens: só é único dentro do recurso
+        body = json.dumps({"id": item_id, "dados": "x" * 600}).encode()
+        return Response(body, media_type="application/json", headers={"ETag": '"1"'})
+
+    @inner.get("/plain")
+    async def plain():
+        return Response(LARGE_BODY, media_type="application/json")
+
+    @inner.get("/small")
+    async def small():
+        return Response(b'{"ok": true}', media_type="application/json")
+
+    @inner.get("/binary")
+    async def binary():
+        return Response(LARGE_BODY, media_type="application/octet-stream")
+
+    @inner.get("/stream")
+    async def stream():
+        async def chunks():
+            yield b"a" * 2000
+            yield b"b" * 2000
+        return StreamingResponse(chunks(), media_type="text/csv")
+
+    middleware = CompressionMiddleware(inner, minimum_size=500, **options)
+    return middleware, AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test")
+
+
+def test_choose_encoding_respects_quality_and_preference():
+    assert choose_encoding("gzip, br", ("br", "gzip")) == "br"
+    assert choose_encoding("gzip;q=1.0, br;q=0.5", ("br", "gzip")) == "gzip"
+    assert choose_encoding("br;q=0, gzip", ("br", "gzip")) == "gzip"
+    assert choose_encoding("*", ("gzip",)) == "gzip"
+    assert choose_encoding("identity", ("br", "gzip")) is None
+    assert choose_encoding("", ("gzip",)) is None
+
+
+def test_etag_matches_weak_comparison():
+    etag = body_etag(b"corpo")
+    assert etag.startswith('W/"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"outro", {etag.removeprefix("W/")}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"outro"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = CompressedBodyCache(max_bytes=10)
+    cache.put(("a", "gzip"), b"12345")
+    cache.put(("b", "gzip"), b"12345")
+    cache.get(("a", "gzip"))  # "a" passa a ser o mais recente
+    cache.put(("c", "gzip"), b"123")
+    assert cache.get(("b", "gzip")) is None
+    assert cache.get(("a", "gzip")) == b"12345"
+    assert cache.size <= 10
+
+
+@pytest.mark.asyncio
+async def test_gzip_response_compressed_once_per_etag():
+    middleware, client = _build_app()
+    with patch.object(middleware, "_compress_now", wraps=middleware._compress_now) as compress:
+        async with client as ac:
+            responses = [await ac.get("/versioned", headers={"Accept-Encoding": "gzip"}) for _ in range(3)]
+    
+    assert compress.call_count == 1
+    for response in responses:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "accept-encoding" in response.headers["vary"].lower()
+        # httpx descomprime o corpo
+        assert response.content == LARGE_BODY
+    assert len(middleware.cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_is_per_resource_and_strong_etags_get_encoding_suffix():
+    middleware, client = _build_app()
+    async with client as ac:
+        responses = [
+            await ac.get(path, headers={"Accept-Encoding": "gzip"})
+            for path in ("/items/1", "/items/2", "/items/2?campos=id", "/items/1")
+        ]
+    
+    assert [r.json()["id"] for r in responses] == [1, 2, 2, 1]
+    assert len(middleware.cache) == 3
+    assert {r.headers["etag"] for r in responses} == {'"1-gzip"'}
+    # ETag fraco vale para todas as codificações
+    assert encoded_etag('W/"abc"', "br") == 'W/"abc"'
+    assert encoded_etag('"abc"', "br") == '"abc-br"'
+
+
+@pytest.mark.asyncio
+async def test_responses_without_etag_are_not_cached():
+    middleware, client = _build_app()
+    async with client as ac:
+        response = await ac.get("/plain", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(middleware.cache) == 0
+
+
+@pytest.mark.skipif(not brotli_available(), reason="brotli não instalado")
+@pytest.mark.asyncio
+async def test_brotli_preferred_when_accepted():
+    import brotli
+    
+    middleware, client = _build_app(brotli_quality=5)
+    async with client as ac:
+        response = await ac.get("/versioned", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert len(middleware.cache.get(("/versioned", body_etag(LARGE_BODY), "br"))) < len(LARGE_BODY)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/small", "/binary", "/stream"])
+async def test_skips_small_binary_and_streaming(path):
+    _, client = _build_app()
+    async with client as ac:
+        response = await ac.get(path, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_identity_when_client_does_not_accept():
+    _, client = _build_app()
+    async with client as ac:
+        response = await ac.get("/versioned", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.content == LARGE_BODY
+
+
+@pytest.mark.asyncio
+async def test_gzip_level_is_configurable():
+    fast, fast_client = _build_app(gzip_level=0)
+    best, best_client = _build_app(gzip_level=9)
+    async with fast_client as a, best_client as b:
+        await a.get("/versioned", headers={"Accept-Encoding": "gzip"})
+        await b.get("/versioned", headers={"Accept-Encoding": "gzip"})
+    key = ("/versioned", body_etag(LARGE_BODY), "gzip")
+    assert gzip.decompress(best.cache.get(key)) == LARGE_BODY
+    assert len(best.cache.get(key)) < len(fast.cache.get(key))
+
+
+@pytest.mark.asyncio
+async def test_vehicle_list_etag_and_not_modified(override_dependencies):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for i in range(30):
+            await ac.post("/api/v1/vehicles/", json={
+                "marca": "Toyota", "modelo": f"Corolla {i}", "ano": 2020, "cor": "Prata", "preco": 90000 + i
+            })
+        first = await ac.get("/api/v1/vehicles/", headers={"Accept-Encoding": "gzip"})
+        etag = first.headers["etag"]
+        cached = await ac.get("/api/v1/vehicles/", headers={"If-None-Match": etag})
+        
+        await ac.put("/api/v1/vehicles/1", json={"preco": 1000})
+        changed = await ac.get("/api/v1/vehicles/", headers={"If-None-Match": etag})
+    
+    assert first.headers["content-encoding"] == "gzip"
+    assert len(first.json()) == 30
+    assert cached.status_code == 304
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
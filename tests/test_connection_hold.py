@@ -0,0 +1,89 @@
+from unittest.mock import patch
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.connection_hold import connection_hold
+from app.database import Base, get_db
+from app.main import app
+from tests.conftest import mock_verify
+
+VEHICLE = {"marca": "Chevrolet", "modelo": "Onix", "ano": 2022, "cor": "Azul", "preco": 72000.0}
+URL = "/api/v1/vehicles"
+
+
+@pytest.mark.asyncio
+async def test_connection_returns_to_pool_before_the_response(tmp_path):
+    # Banco em arquivo com QueuePool: dá para ver as conexões retiradas
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/hold.db")
+    connection_hold.attach(engine, "test_hold")
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    in_transaction_at_teardown = []
+
+    async def override_get_db():
+        async with Session() as session:
+            yield session
+            in_transaction_at_teardown.append(session.in_transaction())
+
+    checked_out_at_start = []
+
+    async def probe(scope, receive, send):
+        async def watch(message):
+            if message["type"] == "http.response.start":
+                checked_out_at_start.append(engine.pool.checkedout())
+            await send(message)
+        await app(scope, receive, watch)
+
+    app.dependency_overrides[get_db] = override_get_db
+    connection_hold.reset()
+    try:
+        async with AsyncClient(transport=ASGITransport(app=probe), base_url="http://test") as ac:
+            vehicle_id = (await ac.post(f"{URL}/", json=VEHICLE)).json()["id"]
+            response = await ac.get(f"{URL}/{vehicle_id}")
+            listing = await ac.get(f"{URL}/")
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    assert response.status_code == 200
+    assert response.json()["modelo"] == "Onix"
+    assert listing.status_code == 200
+    # Nenhuma conexão retirada quando a resposta começa a ser enviada
+    assert checked_out_at_start == [0, 0, 0]
+    assert in_transaction_at_teardown == [False, False, False]
+
+    assert response.headers["server-timing"].startswith("db-hold;dur=")
+    summary = connection_hold.summary()
+    assert summary["databases"]["test_hold"]["checkouts"] >= 3
+    routes = {entry["route"]: entry for entry in summary["routes"]}
+    read = routes[f"GET {URL}/{{vehicle_id}}"]
+    assert read["requests"] == read["requests_holding"] == 1
+    assert read["checkouts"] == 1
+    assert read["total_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_login_releases_the_connection_before_bcrypt(override_dependencies, auth_db_session):
+    during_verify = []
+
+    def verify(plain, hashed):
+        during_verify.append(auth_db_session.in_transaction())
+        return mock_verify(plain, hashed)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        user = {"email": "hold@example.com", "password": "senha123"}
+        assert (await ac.post("/auth/register", json=user)).status_code == 201
+        with patch("app.services.user_service.verify_password", side_effect=verify):
+            response = await ac.post("/auth/login", json=user)
+        assert response.status_code == 200
+
+        me = await ac.get("/auth/me", headers={"Authorization": f"Bearer {response.json()['access_token']}"})
+        assert me.status_code == 200
+        assert me.json()["email"] == "hold@example.com"
+
+    assert during_verify == [False]
+    assert not auth_db_session.in_transaction()
@@ -0,0 +1,258 @@
+import asyncio
+import json
+import os
+
+import pytest
+from unittest.mock import patch
+from sqlalchemy.engine import make_url
+
+from app.core.invalidation import (
+    InvalidationBus,
+    InvalidationEvent,
+    LocalInvalidationBackend,
+    PostgresInvalidationBackend,
+)
+from app.models.vehicle import Vehicle, VehicleStatus
+from app.schemas.schemas import VehicleUpdate
+from app.services.price_index import AvailablePriceIndex
+from app.services.vehicle_catalog import vehicle_catalog
+from app.services.vehicle_events import RESET_FRAME, EventFilter, VehicleEventHub
+from app.services.vehicle_service import VehicleService
+
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+async def _eventually(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condição não atingida"
+        await asyncio.sleep(0.01)
+
+
+async def _replicas(channel: str, window_ms: float = 5.0):
+    a = InvalidationBus(LocalInvalidationBackend(channel), window_ms=window_ms)
+    b = InvalidationBus(LocalInvalidationBackend(channel), window_ms=window_ms)
+    await a.start()
+    await b.start()
+    return a, b
+
+
+@pytest.mark.asyncio
+async def test_bursts_are_coalesced_into_one_message():
+    a, b = await _replicas("coalesce")
+    received: list[list[InvalidationEvent]] = []
+    
+    async def handler(events):
+        received.append(events)
+    
+    b.subscribe("vehicle", handler)
+    for version in range(50):
+        a.publish("vehicle", 1, version)
+    a.publish("vehicle", 2)
+    a.publish("vehicle", 1, 3)  # versão antiga não sobrescreve a mais nova
+    
+    await _eventually(lambda: received)
+    assert a.messages_published == 1
+    assert sorted(received[0]) == [
+        InvalidationEvent("vehicle", 1, 49), InvalidationEvent("vehicle", 2, None)
+    ]
+    await a.stop()
+    await b.stop()
+
+
+@pytest.mark.asyncio
+async def test_own_messages_and_other_entities_are_ignored():
+    a, b = await _replicas("origin")
+    seen = {"a": [], "b_user": [], "b_vehicle": []}
+    
+    async def on_a(events):
+        seen["a"].extend(events)
+    
+    async def on_b_user(events):
+        seen["b_user"].extend(events)
+    
+    async def on_b_vehicle(events):
+        seen["b_vehicle"].extend(events)
+    
+    a.subscribe("vehicle", on_a)
+    b.subscribe("user", on_b_user)
+    b.subscribe("vehicle", on_b_vehicle)
+    a.publish("user", 7)
+    await a.flush()
+    
+    await _eventually(lambda: seen["b_user"])
+    assert seen["b_user"] == [InvalidationEvent("user", 7, None)]
+    assert seen["a"] == []
+    assert seen["b_vehicle"] == []
+    await a.stop()
+    await b.stop()
+
+
+@pytest.mark.asyncio
+async def test_large_flush_is_split_into_bounded_messages():
+    backend = LocalInvalidationBackend("chunks")
+    payloads = []
+    await backend.start(payloads.append)
+    bus = InvalidationBus(backend)
+    for vehicle_id in range(250):
+        bus.publish("vehicle", vehicle_id)
+    await bus.flush()
+    await _eventually(lambda: len(payloads) == 3)
+    
+    assert bus.messages_published == 3
+    assert bus.events_published == 250
+    assert max(len(p) for p in payloads) < 8000
+    assert sum(len(json.loads(p)["events"]) for p in payloads) == 250
+    await backend.stop()
+
+
+@pytest.mark.asyncio
+async def test_publish_failure_does_not_raise():
+    class BrokenBackend(LocalInvalidationBackend):
+        async def publish(self, payload):
+            raise ConnectionError("banco indisponível")
+    
+    bus = InvalidationBus(BrokenBackend("broken"))
+    bus.publish("vehicle", 1)
+    await bus.flush()
+    assert bus.messages_published == 0
+
+
+@pytest.mark.asyncio
+async def test_price_index_of_other_replica_follows_writes(shared_session_factory):
+    async with shared_session_factory() as session:
+        await vehicle_catalog.register(session, ["Fiat", "VW"], ["Uno", "Gol"])
+        session.add_all([
+            Vehicle(marca="Fiat", modelo="Uno", ano=2015, cor="Prata", preco=20000),
+            Vehicle(marca="VW", modelo="Gol", ano=2016, cor="Preto", preco=30000),
+        ])
+        await session.commit()
+    
+    # Janela larga: as três escritas cabem numa única mensagem
+    bus_a, bus_b = await _replicas("replicas", window_ms=500)
+    index_a = AvailablePriceIndex(shared_session_factory)
+    index_b = AvailablePriceIndex(shared_session_factory)
+    await index_a.load()
+    await index_b.load()
+    bus_b.subscribe("vehicle", index_b.refresh)
+    
+    async with shared_session_factory() as session:
+        service = VehicleService(session, price_index=index_a, bus=bus_a)
+        await service.update_vehicle(1, VehicleUpdate(preco=50000))
+        await service.update_vehicle(1, VehicleUpdate(preco=45000))
+        await service.delete_vehicle(2)
+    
+    await _eventually(lambda: len(index_b) == 1)
+    assert json.loads(index_b.query_json()) == json.loads(index_a.query_json())
+    assert json.loads(index_b.query_json())[0]["preco"] == 45000.0
+    assert bus_a.messages_published == 1
+    await bus_a.stop()
+    await bus_b.stop()
+
+
+class _FakeConnection:
+    """Conexão asyncpg mínima: LISTEN, NOTIFY recebido e queda"""
+
+    def __init__(self):
+        self.listeners = {}
+        self.termination_listeners = []
+        self.closed = False
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    def add_termination_listener(self, callback):
+        self.termination_listeners.append(callback)
+
+    def is_closed(self):
+        return self.closed
+
+    async def fetchval(self, query):
+        if self.closed:
+            raise ConnectionError("conexão fechada")
+        return 1
+
+    async def execute(self, query, *args):
+        if self.closed:
+            raise ConnectionError("conexão fechada")
+
+    def terminate(self):
+        self.closed = True
+
+    async def close(self):
+        self.closed = True
+
+    def notify(self, channel, payload):
+        self.listeners[channel](self, 1, channel, payload)
+
+
+@pytest.mark.asyncio
+async def test_dropped_listener_reconnects_and_resets_caches(shared_session_factory):
+    connections = []
+
+    async def connect(dsn):
+        connections.append(_FakeConnection())
+        return connections[-1]
+
+    index = AvailablePriceIndex(shared_session_factory, max_age=60)
+    await index.load()
+    hub = VehicleEventHub(session_factory=shared_session_factory)
+    subscriber = hub.subscribe(EventFilter())
+    received = []
+
+    async def handler(events):
+        received.extend(events)
+
+    backend = PostgresInvalidationBackend("postgresql://replica/db", "canal", health_interval=0.05)
+    bus = InvalidationBus(backend, window_ms=5)
+    bus.subscribe("vehicle", index.refresh, on_reset=index.invalidate)
+    bus.subscribe("vehicle", hub.refresh, on_reset=hub.reset)
+    bus.subscribe("vehicle", handler)
+    with patch("asyncpg.connect", connect):
+        await bus.start()
+        try:
+            # Queda avisada pelo asyncpg: reconecta sem esperar o intervalo
+            connections[0].closed = True
+            for callback in connections[0].termination_listeners:
+                callback(connections[0])
+            await _eventually(lambda: len(connections) == 2)
+            assert bus.resets == 1 and backend.reconnects == 1
+            assert not index.fresh
+            assert list(subscriber.buffer) == [RESET_FRAME]
+
+            # A conexão nova escuta o canal
+            connections[1].notify("canal", json.dumps({"origin": "outra", "events": [["vehicle", 7, 2]]}))
+            await _eventually(lambda: received)
+            assert received == [InvalidationEvent("vehicle", 7, 2)]
+
+            # Queda silenciosa: a verificação periódica encontra
+            connections[1].closed = True
+            await _eventually(lambda: len(connections) == 3)
+            assert bus.resets == 2
+        finally:
+            await bus.stop()
+    assert connections[2].closed
+
+
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL não definido")
+@pytest.mark.asyncio
+async def test_postgres_listen_notify_backend():
+    dsn = make_url(TEST_POSTGRES_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+    a = InvalidationBus(PostgresInvalidationBackend(dsn, "test_invalidation"), window_ms=5)
+    b = InvalidationBus(PostgresInvalidationBackend(dsn, "test_invalidation"), window_ms=5)
+    await a.start()
+    await b.start()
+    received = []
+    
+    async def handler(events):
+        received.extend(events)
+    
+    b.subscribe("vehicle", handler)
+    a.publish("vehicle", 42, 3)
+    try:
+        await _eventually(lambda: received, timeout=5)
+        assert received == [InvalidationEvent("vehicle", 42, 3)]
+    finally:
+        await a.stop()
+        await b.stop()
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+
+from app.core.invalidation import InvalidationBus, LocalInvalidationBackend
+from app.main import app
+from app.models.vehicle import Vehicle, VehicleArchive, VehicleStatus
+from app.schemas.schemas import VehicleCreate, VehicleUpdate
+from app.services.vehicle_archiver import VehicleArchiver
+from app.services.vehicle_service import VehicleService
+from tests.conftest import shared_engine
+
+VEHICLE = {"marca": "Ford", "modelo": "Ka", "ano": 2020, "cor": "Prata", "preco": 40000.0}
+
+
+@pytest.mark.asyncio
+async def test_put_honors_if_match(override_dependencies):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        created = await ac.post("/api/v1/vehicles/", json=VEHICLE)
+        vehicle_id = created.json()["id"]
+        assert created.headers["etag"] == f'"{vehicle_id}-1"'
+        assert (await ac.get(f"/api/v1/vehicles/{vehicle_id}")).headers["etag"] == f'"{vehicle_id}-1"'
+        other = await ac.post("/api/v1/vehicles/", json=VEHICLE)
+        assert other.headers["etag"] == f'"{other.json()["id"]}-1"'
+        
+        response = await ac.put(
+            f"/api/v1/vehicles/{vehicle_id}", json={"preco": 41000.0}, headers={"If-Match": f'"{vehicle_id}-1"'}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] == f'"{vehicle_id}-2"'
+        
+        # Leitura antiga: nada é gravado
+        stale = await ac.put(
+            f"/api/v1/vehicles/{vehicle_id}", json={"preco": 1.0}, headers={"If-Match": f'"{vehicle_id}-1"'}
+        )
+        assert stale.status_code == 412
+        current = await ac.get(f"/api/v1/vehicles/{vehicle_id}")
+        assert current.json()["preco"] == 41000.0
+        
+        # Comparação forte: ETag fraca não casa
+        weak = await ac.put(
+            f"/api/v1/vehicles/{vehicle_id}", json={"preco": 1.0}, headers={"If-Match": f'W/"{vehicle_id}-2"'}
+        )
+        assert weak.status_code == 412
+        # ETag da resposta comprimida (sufixo da codificação) vale a mesma versão
+        encoded = await ac.put(
+            f"/api/v1/vehicles/{vehicle_id}", json={"preco": 41000.0}, headers={"If-Match": f'"{vehicle_id}-2-gzip"'}
+        )
+        assert encoded.headers["etag"] == f'"{vehicle_id}-3"'
+        # Mesma versão, outro veículo: também não casa
+        foreign = await ac.put(
+            f"/api/v1/vehicles/{vehicle_id}", json={"preco": 1.0}, headers={"If-Match": f'"{vehicle_id + 1}-3"'}
+        )
+        assert foreign.status_code == 412
+        
+        # Qualquer das versões listadas serve; "*" não impõe versão
+        listed = await ac.put(
+            f"/api/v1/vehicles/{vehicle_id}", json={"cor": "Preto"}, headers={"If-Match": f'"{vehicle_id}-7", "{vehicle_id}-3"'}
+        )
+        assert listed.headers["etag"] == f'"{vehicle_id}-4"'
+        anything = await ac.put(
+            f"/api/v1/vehicles/{vehicle_id}", json={"cor": "Azul"}, headers={"If-Match": "*"}
+        )
+        assert anything.headers["etag"] == f'"{vehicle_id}-5"'
+        
+        # Sem If-Match continua sendo gravação incondicional
+        assert (await ac.put(f"/api/v1/vehicles/{vehicle_id}", json={"cor": "Verde"})).status_code == 200
+        
+        missing = await ac.put("/api/v1/vehicles/999", json={"cor": "Azul"}, headers={"If-Match": '"999-1"'})
+        assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_concurrent_edits_with_same_version_have_one_winner(shared_session_factory):
+    async with shared_session_factory() as session:
+        vehicle = await VehicleService(session).create_vehicle(VehicleCreate(**VEHICLE))
+    
+    async def edit(preco: float):
+        async with shared_session_factory() as session:
+            return await VehicleService(session).update_vehicle(
+                vehicle.id, VehicleUpdate(preco=preco), if_match={vehicle.version}
+            )
+    
+    results = await asyncio.gather(*(edit(30000.0 + i) for i in range(10)), return_exceptions=True)
+    winners = [r for r in results if isinstance(r, Vehicle)]
+    conflicts = [r for r in results if isinstance(r, HTTPException)]
+    assert len(winners) == 1
+    assert len(conflicts) == 9
+    assert {c.status_code for c in conflicts} == {412}
+    
+    async with shared_session_factory() as session:
+        stored = await VehicleService(session).get_vehicle(vehicle.id)
+        assert stored.version == 2
+        assert stored.preco == winners[0].preco
+
+
+@pytest.mark.asyncio
+async def test_archived_vehicle_keeps_version_and_checks_if_match(shared_session_factory):
+    async with shared_session_factory() as session:
+        svc = VehicleService(session)
+        vehicle = await svc.create_vehicle(VehicleCreate(**VEHICLE))
+        sold = await svc.update_vehicle(vehicle.id, VehicleUpdate(status=VehicleStatus.VENDIDO))
+        assert sold.version == 2
+    await VehicleArchiver(shared_session_factory).archive_all()
+    
+    async with shared_session_factory() as session:
+        svc = VehicleService(session)
+        archived = await svc.get_vehicle(vehicle.id)
+        assert isinstance(archived, VehicleArchive)
+        assert archived.version == 2
+        with pytest.raises(HTTPException) as conflict:
+            await svc.update_vehicle(vehicle.id, VehicleUpdate(preco=1.0), if_match={1})
+        assert conflict.value.status_code == 412
+        
+        # Restaurado para o estoque ativo sem reiniciar a versão
+        restored = await svc.update_vehicle(
+            vehicle.id, VehicleUpdate(status=VehicleStatus.DISPONIVEL), if_match={2}
+        )
+        assert isinstance(restored, Vehicle)
+        assert restored.version == 3
+
+
+@pytest.mark.asyncio
+async def test_invalidation_carries_version(shared_session_factory):
+    bus = InvalidationBus(LocalInvalidationBackend("versoes"), window_ms=1000)
+    async with shared_session_factory() as session:
+        svc = VehicleService(session, bus=bus)
+        vehicle = await svc.create_vehicle(VehicleCreate(**VEHICLE))
+        await svc.update_vehicle(vehicle.id, VehicleUpdate(preco=1.0), if_match={1})
+    assert bus._pending == {("vehicle", vehicle.id): 2}
+    bus._timer.cancel()
+
+
+@pytest.mark.asyncio
+async def test_if_match_update_is_a_single_statement(shared_session_factory):
+    async with shared_session_factory() as session:
+        vehicle = await VehicleService(session).create_vehicle(VehicleCreate(**VEHICLE))
+    
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0])
+    
+    sync_engine = shared_engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", record)
+    try:
+        async with shared_session_factory() as session:
+            await VehicleService(session).update_vehicle(
+                vehicle.id, VehicleUpdate(preco=1.0), if_match={1}
+            )
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record)
+    # Sem SELECT prévio nem SELECT ... FOR UPDATE
+    assert statements == ["UPDATE"]
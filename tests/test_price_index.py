@@ -0,0 +1,116 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from unittest.mock import patch
+
+from app.models.vehicle import Vehicle, VehicleStatus
+from app.schemas.schemas import VehicleCreate, VehicleUpdate
+from app.services.price_index import AvailablePriceIndex
+from app.services.vehicle_service import VehicleService
+from app.services.vehicle_catalog import vehicle_catalog
+
+
+async def _seed(session_factory):
+    prices = [50000, 20000, 35000, 20000, 80000, 10000]
+    async with session_factory() as session:
+        await vehicle_catalog.register(session, ["Fiat"], [f"Modelo {i}" for i in range(len(prices))])
+        session.add_all([
+            Vehicle(marca="Fiat", modelo=f"Modelo {i}", ano=2020, cor="Preto", preco=preco,
+                    status=VehicleStatus.VENDIDO if i == 4 else VehicleStatus.DISPONIVEL)
+            for i, preco in enumerate(prices)
+        ])
+        await session.commit()
+
+
+def _ids_and_prices(body: bytes):
+    return [(v["id"], v["preco"]) for v in json.loads(body)]
+
+
+@pytest.mark.asyncio
+async def test_load_and_query_matches_sql(shared_session_factory):
+    await _seed(shared_session_factory)
+    index = AvailablePriceIndex(shared_session_factory)
+    assert not index.ready
+    # Blocos pequenos: a carga atravessa várias partições do cursor
+    with patch("app.services.price_index.LOAD_BATCH_SIZE", 2):
+        await index.load()
+    
+    assert len(index) == 5
+    assert _ids_and_prices(index.query_json()) == [
+        (6, 10000.0), (2, 20000.0), (4, 20000.0), (3, 35000.0), (1, 50000.0)
+    ]
+    async with shared_session_factory() as session:
+        sql = await VehicleService(session).get_vehicles_json(VehicleStatus.DISPONIVEL, 20000, 40000)
+    assert sorted(_ids_and_prices(index.query_json(20000, 40000))) == sorted(_ids_and_prices(sql))
+    assert _ids_and_prices(index.query_json(limit=2)) == [(6, 10000.0), (2, 20000.0)]
+    assert _ids_and_prices(index.query_json(preco_min=30000, limit=1)) == [(3, 35000.0)]
+    assert index.query_json(preco_min=90000) == b"[]"
+
+
+@pytest.mark.asyncio
+async def test_service_writes_maintain_index(shared_session_factory):
+    await _seed(shared_session_factory)
+    index = AvailablePriceIndex(shared_session_factory)
+    await index.load()
+    
+    async with shared_session_factory() as session:
+        service = VehicleService(session, price_index=index)
+        created = await service.create_vehicle(VehicleCreate(
+            marca="VW", modelo="Gol", ano=2018, cor="Branco", preco=15000
+        ))
+        await service.update_vehicle(1, VehicleUpdate(preco=5000))
+        await service.update_vehicle(3, VehicleUpdate(status=VehicleStatus.VENDIDO))
+        await service.delete_vehicle(6)
+        
+        body = await service.get_vehicles_json(VehicleStatus.DISPONIVEL)
+    
+    assert _ids_and_prices(body) == [
+        (1, 5000.0), (created.id, 15000.0), (2, 20000.0), (4, 20000.0)
+    ]
+    # Vendido volta a ficar disponível pelo mesmo caminho
+    async with shared_session_factory() as session:
+        await VehicleService(session, price_index=index).update_vehicle(
+            5, VehicleUpdate(status=VehicleStatus.DISPONIVEL)
+        )
+    assert _ids_and_prices(index.query_json(preco_min=60000)) == [(5, 80000.0)]
+
+
+@pytest.mark.asyncio
+async def test_cold_or_expired_index_falls_back_to_sql(shared_session_factory):
+    await _seed(shared_session_factory)
+    index = AvailablePriceIndex(shared_session_factory, max_age=60)
+    
+    async with shared_session_factory() as session:
+        service = VehicleService(session, price_index=index)
+        # Frio: responde pelo SQL e agenda a carga em segundo plano
+        body = await service.get_vehicles_json(VehicleStatus.DISPONIVEL)
+        assert len(json.loads(body)) == 5
+        await index._reload
+        assert index.fresh
+        
+        index.invalidate()
+        assert not index.usable()
+        await index._reload
+        assert index.usable()
+
+
+@pytest.mark.asyncio
+async def test_writes_during_reload_are_not_lost(shared_session_factory):
+    await _seed(shared_session_factory)
+    async with shared_session_factory() as session:
+        await vehicle_catalog.register(session, ["VW"], ["Up"])
+    index = AvailablePriceIndex(shared_session_factory)
+    
+    loading = asyncio.create_task(index.load())
+    await asyncio.sleep(0)  # a carga está aguardando o banco
+    index.discard(6)
+    vehicle = Vehicle(id=99, marca="VW", modelo="Up", ano=2019, cor="Azul", preco=1000,
+                      status=VehicleStatus.DISPONIVEL, data_cadastro=datetime.utcnow())
+    index.upsert(vehicle)
+    await loading
+    
+    ids = [v["id"] for v in json.loads(index.query_json())]
+    assert ids[0] == 99
+    assert 6 not in ids
@@ -0,0 +1,103 @@
+import json
+import logging
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.query_log import OTHER_FINGERPRINT, SlowQueryLog, fingerprint, slow_query_log
+from app.main import app
+from tests.conftest import promote_to_admin
+
+
+def test_fingerprint_normalizes_literals_parameters_and_lists():
+    assert fingerprint("SELECT * FROM vehicles WHERE id = 5 AND status = 'VENDIDO'") == \
+        fingerprint("SELECT * FROM vehicles  WHERE id = 42 AND status = 'DISPONIVEL'") == \
+        "SELECT * FROM vehicles WHERE id = ? AND status = ?"
+    assert fingerprint("SELECT a FROM t WHERE id IN (?, ?, ?)") == \
+        fingerprint("SELECT a FROM t WHERE id IN ($1, $2)") == \
+        "SELECT a FROM t WHERE id IN (...)"
+    assert fingerprint("INSERT INTO t (a, b) VALUES (?, ?), (?, ?) RETURNING t.id") == \
+        "INSERT INTO t (a, b) VALUES (...) RETURNING t.id"
+    assert fingerprint("SELECT anon_1.x FROM t AS anon_1 WHERE y = %(y_1)s::text -- nota") == \
+        "SELECT anon_1.x FROM t AS anon_1 WHERE y = ?::text"
+
+
+@pytest.mark.asyncio
+async def test_engine_events_feed_summary_and_slow_log(caplog):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    log = SlowQueryLog(threshold_ms=0, sample_rate=1.0)
+    log.attach(engine, "vehicles")
+    
+    with caplog.at_level(logging.WARNING, logger="app.slow_query"):
+        async with engine.connect() as conn:
+            for i in range(3):
+                await conn.execute(text(f"SELECT {i} + 1"))
+            await conn.execute(text("SELECT :x"), {"x": "segredo"})
+    await engine.dispose()
+    
+    summary = log.summary()
+    by_fingerprint = {entry["fingerprint"]: entry for entry in summary}
+    assert by_fingerprint["SELECT ? + ?"]["count"] == 3
+    assert by_fingerprint["SELECT ? + ?"]["max_ms"] >= by_fingerprint["SELECT ? + ?"]["mean_ms"]
+    assert summary == sorted(summary, key=lambda e: e["total_ms"], reverse=True)
+    
+    records = [json.loads(r.getMessage()) for r in caplog.records if r.name == "app.slow_query"]
+    assert len(records) == 4
+    assert records[0]["event"] == "slow_query"
+    assert records[0]["database"] == "vehicles"
+    # Valores dos parâmetros nunca vão para o log
+    assert "segredo" not in caplog.text
+
+
+def test_threshold_and_sampling(caplog):
+    log = SlowQueryLog(threshold_ms=50, sample_rate=1.0)
+    with caplog.at_level(logging.WARNING, logger="app.slow_query"):
+        log.record("vehicles", "SELECT 1", 0.010)
+        log.record("vehicles", "SELECT 1", 0.200)
+    assert len(caplog.records) == 1
+    
+    caplog.clear()
+    unsampled = SlowQueryLog(threshold_ms=0, sample_rate=0.0)
+    with caplog.at_level(logging.WARNING, logger="app.slow_query"):
+        unsampled.record("vehicles", "SELECT 1", 1.0)
+    assert caplog.records == []
+    # A amostragem afeta só o log; o resumo conta tudo
+    assert unsampled.summary()[0]["count"] == 1
+
+
+def test_distinct_fingerprints_are_bounded():
+    log = SlowQueryLog(max_fingerprints=3)
+    for i in range(10):
+        log.record("auth", f"SELECT coluna_{i} FROM t", 0.001)
+    summary = log.summary(limit=None)
+    assert len(summary) == 4
+    others = next(e for e in summary if e["fingerprint"] == OTHER_FINGERPRINT)
+    assert others["count"] == 7
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoint_requires_admin_and_resets(override_dependencies, auth_db_session):
+    slow_query_log.reset()
+    slow_query_log.record("vehicles", "SELECT * FROM vehicles WHERE id = 1", 0.5)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        assert (await ac.get("/admin/slow-queries")).status_code in (401, 403)
+        
+        await ac.post("/auth/register", json={"email": "dba@example.com", "password": "senha123"})
+        login = await ac.post("/auth/login", json={"email": "dba@example.com", "password": "senha123"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        
+        # JWT válido não basta: só administradores leem ou zeram o resumo
+        assert (await ac.get("/admin/slow-queries", headers=headers)).status_code == 403
+        assert (await ac.delete("/admin/slow-queries", headers=headers)).status_code == 403
+        await promote_to_admin(auth_db_session, "dba@example.com")
+        
+        response = await ac.get("/admin/slow-queries", headers=headers)
+        assert response.status_code == 200
+        queries = response.json()["queries"]
+        assert queries[0]["fingerprint"] == "SELECT * FROM vehicles WHERE id = ?"
+        assert queries[0]["max_ms"] == 500.0
+        
+        assert (await ac.delete("/admin/slow-queries", headers=headers)).status_code == 204
+        assert (await ac.get("/admin/slow-queries", headers=headers)).json()["queries"] == []
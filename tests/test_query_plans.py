@@ -0,0 +1,152 @@
+import os
+import pytest
+from unittest.mock import patch
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.core.deps import get_current_user
+from app.core.security import create_access_token
+from app.database import Base, AuthBase
+from app.models.vehicle import Vehicle, VehicleStatus
+from app.models.user import User
+from app.schemas.schemas import UserCreate, UserLogin, VehicleCreate, VehicleUpdate
+from app.services.user_service import UserService
+from app.services.vehicle_service import VehicleService
+from app.services.vehicle_catalog import vehicle_catalog
+from tests.conftest import test_engine, test_auth_engine, mock_hash, mock_hash_many, mock_verify
+from tests.query_plan import QueryPlanHarness
+
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+async def _seed(vehicle_db: AsyncSession, auth_db: AsyncSession, vehicles: int = 300, users: int = 100) -> None:
+    await vehicle_catalog.register(
+        vehicle_db, [f"Marca{i}" for i in range(7)], [f"Modelo{i}" for i in range(13)]
+    )
+    vehicle_db.add_all(
+        Vehicle(
+            marca=f"Marca{i % 7}", modelo=f"Modelo{i % 13}", ano=2000 + i % 25, cor="Preto",
+            preco=10000 + (i * 7919) % 90000,
+            status=VehicleStatus.VENDIDO if i % 3 == 0 else VehicleStatus.DISPONIVEL,
+        )
+        for i in range(vehicles)
+    )
+    auth_db.add_all(
+        User(email=f"user{i}@example.com", hashed_password=f"hashed_senha{i}")
+        for i in range(users)
+    )
+    await vehicle_db.commit()
+    await auth_db.commit()
+    for db in (vehicle_db, auth_db):
+        if db.bind.dialect.name == "postgresql":
+            # Estatísticas atualizadas: o planejador roda com as configurações padrão
+            await db.execute(text("ANALYZE"))
+            await db.commit()
+
+
+async def _check_service_queries(vehicle_db, auth_db, vehicles: QueryPlanHarness, users: QueryPlanHarness, **seed):
+    """Executa cada operação dos serviços capturando todo o SQL emitido e verifica os planos"""
+    await _seed(vehicle_db, auth_db, **seed)
+    vehicle_svc = VehicleService(vehicle_db)
+    user_svc = UserService(auth_db)
+
+    with vehicles.capture("create_vehicle"):
+        created = await vehicle_svc.create_vehicle(VehicleCreate(
+            marca="Marca1", modelo="Modelo Novo", ano=2024, cor="Azul", preco=55000.0
+        ))
+    with vehicles.capture("list_all_by_price"):
+        await vehicle_svc.get_vehicles()
+    with vehicles.capture("list_available_by_price"):
+        await vehicle_svc.get_vehicles(VehicleStatus.DISPONIVEL)
+    with vehicles.capture("available_price_range"):
+        await vehicle_svc.get_vehicles(VehicleStatus.DISPONIVEL, preco_min=20000, preco_max=40000, limit=10)
+    with vehicles.capture("vehicle_by_id"):
+        await vehicle_svc.get_vehicle(7)
+        await vehicle_svc.get_vehicle(999999)  # também consulta o arquivo
+    with vehicles.capture("vehicles_by_ids"):
+        await vehicle_svc.get_vehicles_by_ids([3, 8, 999999])
+    with vehicles.capture("update_vehicle"):
+        await vehicle_svc.update_vehicle(created.id, VehicleUpdate(preco=54000.0, marca="Marca2"))
+        await vehicle_svc.update_vehicle(created.id, VehicleUpdate(cor="Verde"), if_match={2})
+    with vehicles.capture("reserve_and_sell"):
+        reserved = await vehicle_svc.reserve_vehicle(created.id, ttl_seconds=60)
+        await vehicle_svc.sell_vehicle(created.id, reserved.reserva_id)
+    with vehicles.capture("delete_vehicle"):
+        await vehicle_svc.delete_vehicle(created.id)
+
+    with patch("app.services.user_service.get_password_hash", side_effect=mock_hash), \
+         patch("app.services.user_service.hash_passwords", side_effect=mock_hash_many):
+        with users.capture("create_user"):
+            await user_svc.create_user(UserCreate(email="novo@example.com", password="senha123"))
+        with users.capture("create_users_bulk"):
+            await user_svc.create_users_bulk([
+                UserCreate(email="lote@example.com", password="senha123"),
+                UserCreate(email="user1@example.com", password="senha123"),
+            ])
+    with users.capture("login_by_email"), \
+         patch("app.services.user_service.verify_password", side_effect=mock_verify):
+        await user_svc.authenticate_user(UserLogin(email="user5@example.com", password="senha5"))
+    with users.capture("user_by_id"):
+        await user_svc.get_user_by_id(5)
+    with users.capture("get_current_user"):
+        token = create_access_token({"sub": "6"})
+        await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), auth_db)
+
+    # Listagem sem filtro devolve o estoque quente inteiro: varrer e ordenar
+    # a tabela é o plano esperado (só os disponíveis têm índice por preço)
+    accepted = {"list_all_by_price": ("SCAN vehicles", "Seq Scan vehicles", "TEMP B-TREE", "Sort")}
+    labels = vehicles.labels() + [label for label in users.labels() if label not in vehicles.labels()]
+    assert len(labels) == 14
+    for label in labels:
+        harness = vehicles if vehicles.statements(label) else users
+        await harness.assert_indexed(label, allow=accepted.get(label, ()))
+
+
+@pytest.mark.asyncio
+async def test_service_queries_use_indexes_sqlite(db_session, auth_db_session):
+    await _check_service_queries(
+        db_session, auth_db_session,
+        QueryPlanHarness(test_engine), QueryPlanHarness(test_auth_engine),
+    )
+
+
+@pytest.mark.asyncio
+async def test_harness_flags_scan_and_sort(db_session, auth_db_session):
+    """O próprio harness detecta um plano ruim (filtro sem índice + ORDER BY)"""
+    from sqlalchemy.future import select
+
+    await _seed(db_session, auth_db_session)
+    harness = QueryPlanHarness(test_engine)
+    with harness.capture("bad"):
+        await db_session.execute(select(Vehicle).where(Vehicle.cor == "Preto").order_by(Vehicle.ano))
+
+    reports = await harness.explain("bad")
+    problems = " ".join(p for r in reports for p in r.problems)
+    assert "varredura completa" in problems
+    assert "ordenação em memória" in problems
+    with pytest.raises(AssertionError):
+        await harness.assert_indexed("bad")
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL não definido")
+async def test_service_queries_use_indexes_postgres():
+    engine = create_async_engine(TEST_POSTGRES_URL, echo=False)
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(AuthBase.metadata.drop_all)
+        await conn.run_sync(AuthBase.metadata.create_all)
+    try:
+        async with Session() as vehicle_db, Session() as auth_db:
+            # Catálogo de marcas/modelos: dezenas de linhas, varrer é o plano certo
+            harness = QueryPlanHarness(engine, small_tables=("marcas", "modelos"))
+            await _check_service_queries(vehicle_db, auth_db, harness, harness, vehicles=20000, users=5000)
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(AuthBase.metadata.drop_all)
+        await engine.dispose()
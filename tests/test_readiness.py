@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from unittest.mock import patch
+
+from app.core.readiness import ReadinessMonitor
+from app.main import app
+
+
+@pytest_asyncio.fixture
+async def file_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/ready.db", pool_size=1, max_overflow=0)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_ready_after_ping_and_probes_do_not_touch_db(file_engine):
+    executed = []
+    event.listen(file_engine.sync_engine, "before_cursor_execute", lambda *args: executed.append(1))
+    monitor = ReadinessMonitor({"engine": file_engine})
+    
+    ready, details = monitor.snapshot()
+    assert not ready  # ainda não verificado
+    
+    await monitor.check_once()
+    pings = len(executed)
+    for _ in range(100):
+        ready, details = monitor.snapshot()
+    
+    assert ready
+    assert len(executed) == pings
+    check = details["checks"]["engine"]
+    assert check["reachable"] and check["latency_ms"] is not None
+    assert check["pool"] == {"checked_out": 0, "capacity": 1, "saturation": 0.0, "exhausted": False}
+
+
+@pytest.mark.asyncio
+async def test_unreachable_database_is_unready(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/inexistente/x.db")
+    monitor = ReadinessMonitor({"auth_engine": engine}, timeout=1)
+    await monitor.check_once()
+    ready, details = monitor.snapshot()
+    assert not ready
+    assert details["checks"]["auth_engine"]["reachable"] is False
+    assert details["checks"]["auth_engine"]["error"]
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_exhausted_pool_is_unready(file_engine):
+    monitor = ReadinessMonitor({"engine": file_engine})
+    await monitor.check_once()
+    async with file_engine.connect():
+        ready, details = monitor.snapshot()
+    assert not ready
+    assert details["checks"]["engine"]["pool"]["exhausted"]
+    assert monitor.snapshot()[0]
+
+
+@pytest.mark.asyncio
+async def test_stale_result_is_unready(file_engine):
+    monitor = ReadinessMonitor({"engine": file_engine}, interval=1, timeout=1)
+    await monitor.check_once()
+    with patch("app.core.readiness.time.monotonic", return_value=time.monotonic() + 60):
+        ready, details = monitor.snapshot()
+    assert not ready
+    assert details["checks"]["engine"]["error"] == "verificação desatualizada"
+
+
+@pytest.mark.asyncio
+async def test_background_pinger_runs_until_stopped(file_engine):
+    monitor = ReadinessMonitor({"engine": file_engine}, interval=0.01)
+    monitor.start()
+    try:
+        for _ in range(100):
+            if monitor.snapshot()[0]:
+                break
+            await asyncio.sleep(0.01)
+        assert monitor.snapshot()[0]
+    finally:
+        await monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_ready_endpoint(file_engine):
+    monitor = ReadinessMonitor({"engine": file_engine})
+    with patch("app.main.readiness", monitor):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            pending = await ac.get("/ready")
+            await monitor.check_once()
+            ready = await ac.get("/ready")
+    assert pending.status_code == 503
+    assert pending.json()["status"] == "unready"
+    assert ready.status_code == 200
+    assert ready.json()["checks"]["engine"]["ok"]
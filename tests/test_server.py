@@ -0,0 +1,55 @@
+from unittest.mock import patch
+
+from app import server
+
+
+def test_cgroup_v2_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("50000 100000\n")
+    assert server.cgroup_cpu_limit(tmp_path) == 0.5
+
+
+def test_cgroup_v2_unlimited(tmp_path):
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert server.cgroup_cpu_limit(tmp_path) is None
+
+
+def test_cgroup_v1_quota(tmp_path):
+    cpu = tmp_path / "cpu,cpuacct"
+    cpu.mkdir()
+    (cpu / "cpu.cfs_quota_us").write_text("250000\n")
+    (cpu / "cpu.cfs_period_us").write_text("100000\n")
+    assert server.cgroup_cpu_limit(tmp_path) == 2.5
+
+
+def test_cgroup_v1_unlimited(tmp_path):
+    cpu = tmp_path / "cpu"
+    cpu.mkdir()
+    (cpu / "cpu.cfs_quota_us").write_text("-1\n")
+    (cpu / "cpu.cfs_period_us").write_text("100000\n")
+    assert server.cgroup_cpu_limit(tmp_path) is None
+
+
+def test_worker_count_from_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("250000 100000\n")
+    with patch.object(server, "available_cpus", return_value=8):
+        assert server.worker_count(tmp_path) == 2
+    (tmp_path / "cpu.max").write_text("50000 100000\n")
+    with patch.object(server, "available_cpus", return_value=8):
+        assert server.worker_count(tmp_path) == 1
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    with patch.object(server, "available_cpus", return_value=8):
+        assert server.worker_count(tmp_path) == 8
+
+
+def test_worker_count_respects_web_concurrency(tmp_path):
+    (tmp_path / "cpu.max").write_text("50000 100000\n")
+    with patch.object(server.settings, "WEB_CONCURRENCY", 3):
+        assert server.worker_count(tmp_path) == 3
+
+
+def test_server_config_reports_choices():
+    config = server.server_config("0.0.0.0", 8000, 2)
+    assert config["workers"] == 2
+    assert config["loop"] in ("uvloop", "asyncio")
+    assert config["http"] in ("httptools", "h11")
+    assert config["max_requests"] == server.settings.SERVER_MAX_REQUESTS
@@ -0,0 +1,215 @@
+import random
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.invalidation import InvalidationEvent
+from app.core.sharding import ShardMap, seed_id_sequence
+from app.database import Base, get_db, get_vehicle_shards
+from app.main import app
+from app.models.vehicle import Vehicle, VehicleStatus
+from app.schemas.schemas import VehicleCreate, VehicleUpdate
+from app.services.price_index import AvailablePriceIndex
+from app.services.vehicle_archiver import VehicleArchiver
+from app.services.vehicle_export import VehicleExporter
+from app.services.vehicle_service import VehicleService
+
+SPAN = 1000
+
+
+@pytest_asyncio.fixture
+async def shards(tmp_path):
+    """Três shards em arquivos SQLite separados"""
+    engines, factories = [], []
+    for shard in range(3):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/shard{shard}.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            if shard > 0:
+                await conn.run_sync(seed_id_sequence, Vehicle.__tablename__, shard * SPAN + 1)
+        engines.append(engine)
+        factories.append(async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+    shard_map = ShardMap(factories, id_span=SPAN)
+    shard_map.engines = engines
+    yield shard_map
+    for engine in engines:
+        await engine.dispose()
+
+
+def _vehicle(preco: float) -> VehicleCreate:
+    return VehicleCreate(marca="Fiat", modelo="Argo", ano=2022, cor="Cinza", preco=preco)
+
+
+async def _seed(shards: ShardMap, prices: list[float]) -> list[Vehicle]:
+    created = []
+    for preco in prices:
+        async with shards.session(0) as session:
+            created.append(await VehicleService(session, shards=shards).create_vehicle(_vehicle(preco)))
+    return created
+
+
+def test_shard_for_uses_id_ranges():
+    shard_map = ShardMap([object(), object(), object()], id_span=100)
+    assert [shard_map.shard_for(i) for i in (1, 100, 101, 200, 201, 10_000)] == [0, 0, 1, 1, 2, 2]
+    assert shard_map.first_id(2) == 201
+    assert shard_map.group_by_shard([5, 150, 7, 250]) == {0: [5, 7], 1: [150], 2: [250]}
+
+
+@pytest.mark.asyncio
+async def test_creates_are_spread_and_ids_stay_in_range(shards):
+    vehicles = await _seed(shards, [10.0 * (i + 1) for i in range(9)])
+    for vehicle in vehicles:
+        owner = shards.shard_for(vehicle.id)
+        async with shards.session(owner) as session:
+            assert await session.get(Vehicle, vehicle.id) is not None
+    counts = []
+    for shard in range(3):
+        async with shards.session(shard) as session:
+            counts.append(await session.scalar(select(func.count()).select_from(Vehicle)))
+    assert counts == [3, 3, 3]
+    
+    # Posicionar a sequência de novo não a faz recuar
+    async with shards.engines[1].begin() as conn:
+        await conn.run_sync(seed_id_sequence, Vehicle.__tablename__, SPAN + 1)
+    async with shards.session(1) as session:
+        vehicle = await VehicleService(session).create_vehicle(_vehicle(1.0))
+    assert vehicle.id == SPAN + 4
+
+
+@pytest.mark.asyncio
+async def test_point_operations_go_to_the_owning_shard(shards):
+    vehicles = await _seed(shards, [100.0, 200.0, 300.0])
+    target = next(v for v in vehicles if shards.shard_for(v.id) == 2)
+    
+    touched = []
+    for shard, engine in enumerate(shards.engines):
+        event.listen(
+            engine.sync_engine, "before_cursor_execute",
+            lambda *args, shard=shard: touched.append(shard),
+        )
+    
+    async with shards.session(0) as session:
+        service = VehicleService(session, shards=shards)
+        assert (await service.get_vehicle(target.id)).preco == 300.0
+        updated = await service.update_vehicle(target.id, VehicleUpdate(preco=350.0), if_match={1})
+        assert updated.version == 2
+        sold = await service.sell_vehicle(target.id)
+        assert sold.status == VehicleStatus.VENDIDO
+        assert await service.get_vehicle(9 * SPAN) is None
+    assert set(touched) == {2}
+
+
+@pytest.mark.asyncio
+async def test_batch_get_groups_ids_by_shard(shards):
+    vehicles = await _seed(shards, [100.0, 200.0, 300.0, 400.0])
+    ids = [v.id for v in reversed(vehicles)] + [2 * SPAN + 999]
+    
+    async with shards.session(0) as session:
+        found = await VehicleService(session, shards=shards).get_vehicles_by_ids(ids)
+    assert {vehicle_id: v.preco for vehicle_id, v in found.items()} == {v.id: v.preco for v in vehicles}
+    
+    async def override_get_db():
+        async with shards.session(0) as session:
+            yield session
+    
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_vehicle_shards] = lambda: shards
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.post("/api/v1/vehicles/batch-get", json={"ids": ids})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["found"], body["missing"]) == (4, 1)
+    assert [item["vehicle"]["preco"] for item in body["results"][:4]] == [400.0, 300.0, 200.0, 100.0]
+    assert body["results"][4] == {"id": 2 * SPAN + 999, "found": False, "vehicle": None}
+
+
+@pytest.mark.asyncio
+async def test_listing_merges_shards_in_price_order(shards):
+    rng = random.Random(3)
+    prices = [round(rng.uniform(1000, 90000), 2) for _ in range(30)]
+    vehicles = await _seed(shards, prices)
+    sold_ids = {v.id for v in vehicles[::4]}
+    async with shards.session(0) as session:
+        service = VehicleService(session, shards=shards)
+        for vehicle_id in sold_ids:
+            await service.sell_vehicle(vehicle_id)
+    # Parte dos vendidos já no arquivo do seu shard
+    for factory in shards.session_factories:
+        await VehicleArchiver(factory).archive_all()
+    
+    limits = []
+    for engine in shards.engines:
+        event.listen(
+            engine.sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, parameters, *args: limits.append(parameters[-2])
+            if "LIMIT" in statement else None,
+        )
+    
+    async with shards.session(0) as session:
+        service = VehicleService(session, shards=shards)
+        everything = await service.get_vehicles()
+        assert [v.preco for v in everything] == sorted(prices)
+        
+        available = await service.get_vehicles(VehicleStatus.DISPONIVEL, limit=5)
+        expected = sorted(v.preco for v in vehicles if v.id not in sold_ids)[:5]
+        assert [v.preco for v in available] == expected
+        # Cada shard busca no máximo o LIMIT pedido
+        assert limits == [5, 5, 5]
+        
+        sold = await service.get_vehicles(VehicleStatus.VENDIDO, preco_min=20000)
+        assert [v.preco for v in sold] == sorted(
+            v.preco for v in vehicles if v.id in sold_ids and v.preco >= 20000
+        )
+
+
+@pytest.mark.asyncio
+async def test_export_and_price_index_cover_all_shards(shards):
+    vehicles = await _seed(shards, [500.0, 100.0, 400.0, 200.0, 300.0, 600.0])
+    
+    exporter = VehicleExporter(shards.session_factories[0], shards=shards)
+    exported = [row[0] async for rows in exporter.batches() for row in rows]
+    assert exported == sorted(v.id for v in vehicles)
+    
+    index = AvailablePriceIndex(max_age=60, shards=shards)
+    await index.load()
+    assert list(index._prices) == [100.0, 200.0, 300.0, 400.0, 500.0, 600.0]
+    
+    target = next(v for v in vehicles if shards.shard_for(v.id) == 1)
+    async with shards.session(1) as session:
+        await VehicleService(session).sell_vehicle(target.id)
+    await index.refresh([InvalidationEvent("vehicle", target.id)])
+    assert target.id not in index._entries
+
+
+@pytest.mark.asyncio
+async def test_routes_use_shards(shards):
+    async def override_get_db():
+        async with shards.session(0) as session:
+            yield session
+    
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_vehicle_shards] = lambda: shards
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            ids = []
+            for preco in (3.0, 1.0, 2.0):
+                response = await ac.post("/api/v1/vehicles/", json={
+                    "marca": "Fiat", "modelo": "Mobi", "ano": 2023, "cor": "Azul", "preco": preco
+                })
+                ids.append(response.json()["id"])
+            assert sorted(shards.shard_for(i) for i in ids) == [0, 1, 2]
+            
+            listing = await ac.get("/api/v1/vehicles/")
+            assert [v["preco"] for v in listing.json()] == [1.0, 2.0, 3.0]
+            for vehicle_id in ids:
+                assert (await ac.get(f"/api/v1/vehicles/{vehicle_id}")).json()["id"] == vehicle_id
+            assert (await ac.delete(f"/api/v1/vehicles/{ids[2]}")).status_code == 204
+            assert (await ac.get(f"/api/v1/vehicles/{ids[2]}")).status_code == 404
+    finally:
+        app.dependency_overrides.clear()
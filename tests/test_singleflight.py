@@ -0,0 +1,174 @@
+import asyncio
+import pytest
+
+from app.core.singleflight import SingleFlight
+from app.models.vehicle import VehicleStatus
+from app.schemas.schemas import VehicleCreate
+from app.services.vehicle_service import VehicleService
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_execution():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return b"[]"
+
+    tasks = [asyncio.create_task(flight.do("k", work)) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert calls == 1
+    assert all(r is results[0] for r in results)
+    assert not flight.in_flight("k")
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately():
+    flight = SingleFlight()
+    calls = []
+
+    async def work(key):
+        calls.append(key)
+        return key
+
+    results = await asyncio.gather(
+        flight.do("a", lambda: work("a")),
+        flight.do("b", lambda: work("b")),
+    )
+    assert results == ["a", "b"]
+    assert sorted(calls) == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_waiter_cancellation_does_not_affect_others():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "ok"
+
+    leader = asyncio.create_task(flight.do("k", work))
+    waiter = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await leader == "ok"
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+
+@pytest.mark.asyncio
+async def test_leader_cancellation_keeps_execution_for_waiters():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "ok"
+
+    leader = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    assert not leader.done()  # líder aguarda a execução que é dona da sessão
+    release.set()
+
+    assert await waiter == "ok"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+@pytest.mark.asyncio
+async def test_all_callers_cancelled_cancels_execution():
+    flight = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def work():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    task = asyncio.create_task(flight.do("k", work))
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+@pytest.mark.asyncio
+async def test_new_flight_waits_for_the_cancelled_one_to_finish():
+    flight = SingleFlight()
+    started = asyncio.Event()
+    events = []
+
+    async def slow_cleanup():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            # Ex: rollback/fechamento da sessão compartilhada
+            await asyncio.sleep(0.05)
+            events.append("cleanup")
+            raise
+
+    async def fresh():
+        events.append("fresh")
+        return "ok"
+
+    abandoned = asyncio.create_task(flight.do("k", slow_cleanup))
+    await started.wait()
+    abandoned.cancel()
+    await asyncio.sleep(0)
+    # Chega enquanto a execução cancelada ainda limpa os recursos
+    result = await flight.do("k", fresh)
+    with pytest.raises(asyncio.CancelledError):
+        await abandoned
+    assert result == "ok"
+    assert events == ["cleanup", "fresh"]
+    assert not flight.in_flight("k")
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_all_callers():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0)
+        raise ValueError("falha")
+
+    results = await asyncio.gather(
+        flight.do("k", work), flight.do("k", work), return_exceptions=True
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_vehicle_service_get_vehicles_json(db_session):
+    svc = VehicleService(db_session)
+    await svc.create_vehicle(VehicleCreate(marca="A", modelo="M", ano=2020, cor="X", preco=50000))
+    await svc.create_vehicle(VehicleCreate(marca="B", modelo="N", ano=2021, cor="Y", preco=30000))
+
+    bodies = await asyncio.gather(
+        svc.get_vehicles_json(VehicleStatus.DISPONIVEL),
+        svc.get_vehicles_json(VehicleStatus.DISPONIVEL),
+    )
+    assert bodies[0] is bodies[1]
+    assert b'"preco":30000.0' in bodies[0]
+    assert bodies[0].index(b"30000") < bodies[0].index(b"50000")
@@ -0,0 +1,149 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.core.sqlite_profile import apply_sqlite_profile, is_sqlite_file, sqlite_settings
+from app.database import Base, get_db
+from app.main import app
+from app.models.vehicle import Vehicle
+from app.schemas.schemas import VehicleCreate
+from app.services.vehicle_service import VehicleService
+from app.services.write_queue import VehicleWriteQueue, create_writer_engine, get_vehicle_write_queue
+
+VEHICLE = {"marca": "Fiat", "modelo": "Uno", "ano": 2015, "cor": "Prata", "preco": 22000.0}
+URL = "/api/v1/vehicles"
+
+
+def test_only_sqlite_files_get_the_profile():
+    assert is_sqlite_file("sqlite+aiosqlite:///./vehicles.db")
+    assert not is_sqlite_file("sqlite+aiosqlite:///:memory:")
+    assert not is_sqlite_file("postgresql+asyncpg://u:p@db/vehicles")
+    assert not apply_sqlite_profile(create_async_engine("sqlite+aiosqlite:///:memory:"))
+
+
+@pytest.mark.asyncio
+async def test_profile_pragmas_on_every_connection(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/profile.db")
+    assert apply_sqlite_profile(engine)
+    try:
+        async with engine.connect() as conn:
+            pragmas = await conn.run_sync(sqlite_settings)
+    finally:
+        await engine.dispose()
+    assert pragmas["journal_mode"] == "wal"
+    assert pragmas["synchronous"] == 1  # NORMAL
+    assert pragmas["busy_timeout"] == settings.SQLITE_BUSY_TIMEOUT_MS
+    assert pragmas["mmap_size"] == settings.SQLITE_MMAP_SIZE
+    assert pragmas["cache_size"] == -settings.SQLITE_CACHE_SIZE_KB
+
+
+class _NullSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_write_queue_runs_one_write_at_a_time():
+    queue = VehicleWriteQueue(session_factory=lambda: _NullSession(), max_size=4)
+    running, peak = 0, 0
+
+    async def operation(session):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        return session
+
+    async def failing(session):
+        raise ValueError("falhou")
+
+    results = await asyncio.gather(*(queue.run(operation) for _ in range(20)))
+    assert peak == 1
+    assert queue.writes == 20 and len(queue) == 0
+    assert all(isinstance(result, _NullSession) for result in results)
+    # O erro volta para quem pediu e o escritor segue atendendo
+    with pytest.raises(ValueError):
+        await queue.run(failing)
+    assert isinstance(await queue.run(operation), _NullSession)
+    await queue.close()
+
+
+class _Abort(BaseException):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_write_queue_survives_base_exceptions_from_a_write():
+    queue = VehicleWriteQueue(session_factory=lambda: _NullSession())
+
+    async def cancelled(session):
+        raise asyncio.CancelledError()
+
+    async def aborted(session):
+        raise _Abort()
+
+    async def ok(session):
+        return "ok"
+
+    # A falha chega a quem pediu, e as escritas seguintes não ficam presas
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(queue.run(cancelled), timeout=1)
+    with pytest.raises(_Abort):
+        await asyncio.wait_for(queue.run(aborted), timeout=1)
+    assert await asyncio.wait_for(queue.run(ok), timeout=1) == "ok"
+    assert queue.writes == 3
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_and_reads_through_the_writer(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path}/edge.db"
+    readers = create_async_engine(url)
+    apply_sqlite_profile(readers)
+    writer = create_writer_engine(url)
+    Session = async_sessionmaker(readers, class_=AsyncSession, expire_on_commit=False)
+    queue = VehicleWriteQueue(async_sessionmaker(writer, class_=AsyncSession, expire_on_commit=False))
+    async with readers.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def override_get_db():
+        async with Session() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_vehicle_write_queue] = lambda: queue
+    try:
+        async with Session() as session:
+            created = await asyncio.gather(*(
+                VehicleService(session, writer=queue).create_vehicle(VehicleCreate(**VEHICLE))
+                for _ in range(50)
+            ))
+        assert len({vehicle.id for vehicle in created}) == 50
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            vehicle_id = created[0].id
+            responses = await asyncio.gather(
+                *(ac.post(f"{URL}/{vehicle_id}/sell") for _ in range(50)),
+                *(ac.get(f"{URL}/{vehicle_id}") for _ in range(50)),
+            )
+        sells = Counter(response.status_code for response in responses[:50])
+        assert sells == {200: 1, 409: 49}
+        assert all(response.status_code == 200 for response in responses[50:])
+
+        async with Session() as session:
+            assert await session.scalar(select(func.count()).select_from(Vehicle)) == 50
+            assert (await session.get(Vehicle, vehicle_id)).version == 2
+    finally:
+        app.dependency_overrides.clear()
+        await queue.close()
+        await writer.dispose()
+        await readers.dispose()
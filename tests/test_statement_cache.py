@@ -0,0 +1,128 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.query_log import SlowQueryLog
+from app.core.statement_cache import engine_options, statement_cache_usage
+from app.database import AuthBase, Base
+from app.main import app
+from app.models.user import User
+from app.models.vehicle import Vehicle, VehicleStatus
+from app.schemas.schemas import UserLogin
+from app.services.user_service import UserService
+from app.services.vehicle_service import VehicleService
+from app.services.vehicle_catalog import vehicle_catalog
+from tests.conftest import promote_to_admin
+
+
+async def _fresh_engine(metadata):
+    """Engine novo, com cache de compiladas vazio"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+    return engine
+
+
+def _select_stats(log: SlowQueryLog, table: str) -> list[dict]:
+    return [
+        entry for entry in log.summary(limit=None)
+        if entry["fingerprint"].startswith("SELECT") and f"FROM {table}" in entry["fingerprint"]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_hot_vehicle_queries_compile_once():
+    engine = await _fresh_engine(Base.metadata)
+    log = SlowQueryLog(threshold_ms=10_000)
+    log.attach(engine, "vehicles")
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    
+    async with Session() as session:
+        await vehicle_catalog.register(session, ["Fiat"], ["Uno"])
+        session.add_all(
+            Vehicle(marca="Fiat", modelo="Uno", ano=2010 + i, cor="Branco", preco=10000.0 * (i + 1))
+            for i in range(5)
+        )
+        await session.commit()
+    
+    log.reset()
+    for i in range(10):
+        async with Session() as session:
+            service = VehicleService(session)
+            assert (await service.get_vehicle(i % 5 + 1)).id == i % 5 + 1
+            vehicles = await service.get_vehicles(
+                VehicleStatus.DISPONIVEL, preco_min=1000.0 * i, limit=i + 1
+            )
+            assert len(vehicles) <= i + 1
+    await engine.dispose()
+    
+    stats = _select_stats(log, "vehicles")
+    assert len(stats) == 2
+    for entry in stats:
+        # Primeira execução compila; as demais (com outros valores) vêm do cache
+        assert entry["count"] == 10
+        assert entry["compiles"] == 1
+        assert entry["cache_hits"] == 9
+
+
+@pytest.mark.asyncio
+@patch("app.services.user_service.verify_password", return_value=False)
+async def test_user_lookups_compile_once(mock_verify):
+    engine = await _fresh_engine(AuthBase.metadata)
+    log = SlowQueryLog(threshold_ms=10_000)
+    log.attach(engine, "auth")
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    
+    async with Session() as session:
+        session.add_all(
+            User(email=f"user{i}@example.com", hashed_password="x", is_active=True)
+            for i in range(3)
+        )
+        await session.commit()
+    
+    log.reset()
+    for i in range(6):
+        async with Session() as session:
+            service = UserService(session)
+            assert (await service.get_user_by_id(i % 3 + 1)) is not None
+            with pytest.raises(HTTPException):
+                await service._authenticate(UserLogin(email=f"user{i % 3}@example.com", password="errada"))
+    await engine.dispose()
+    
+    stats = _select_stats(log, "users")
+    assert {entry["compiles"] for entry in stats} == {1}
+    assert sum(entry["cache_hits"] for entry in stats) == 10
+
+
+def test_prepared_statement_cache_only_for_asyncpg():
+    options = engine_options("postgresql+asyncpg://u:p@db/vehicles")
+    assert options["connect_args"]["prepared_statement_cache_size"] > 0
+    assert "connect_args" not in engine_options("sqlite+aiosqlite:///./vehicles.db")
+
+
+@pytest.mark.asyncio
+async def test_statement_cache_usage_and_admin_endpoint(override_dependencies, auth_db_session):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", query_cache_size=10)
+    usage = statement_cache_usage(engine)
+    assert usage["compiled_capacity"] == 10
+    assert usage["prepared_statement_cache_size"] is None
+    await engine.dispose()
+    
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        assert (await ac.get("/admin/statement-cache")).status_code in (401, 403)
+        
+        await ac.post("/auth/register", json={"email": "dba@example.com", "password": "senha123"})
+        login = await ac.post("/auth/login", json={"email": "dba@example.com", "password": "senha123"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        assert (await ac.get("/admin/statement-cache", headers=headers)).status_code == 403
+        await promote_to_admin(auth_db_session, "dba@example.com")
+        
+        response = await ac.get("/admin/statement-cache", headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        assert set(body["engines"]) == {"vehicles", "auth"}
+        assert all({"compiles", "cache_hits"} <= set(q) for q in body["queries"])
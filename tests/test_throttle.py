@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+from unittest.mock import patch
+from fastapi import HTTPException
+from httpx import AsyncClient, ASGITransport
+from starlette.requests import Request
+
+from app.core.throttle import InMemoryThrottleBackend, LoginThrottle, client_address
+from app.main import app
+from app.schemas.schemas import UserLogin
+from app.services.user_service import UserService
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_weights_previous_window():
+    backend = InMemoryThrottleBackend()
+    for _ in range(10):
+        await backend.hit("k", 60, now=120.0)
+    assert await backend.estimate("k", 60, now=150.0) == 10
+    # Metade da janela seguinte: metade da contagem anterior ainda pesa
+    assert await backend.estimate("k", 60, now=210.0) == pytest.approx(5)
+    # Duas janelas depois: expirado
+    assert await backend.estimate("k", 60, now=300.0) == 0
+
+
+@pytest.mark.asyncio
+async def test_backend_memory_is_bounded():
+    backend = InMemoryThrottleBackend(max_keys=100)
+    for i in range(10_000):
+        await backend.hit(f"email:user{i}@example.com", 60, now=0.0)
+    assert len(backend) == 100
+    # as chaves mais recentes permanecem
+    assert await backend.estimate("email:user9999@example.com", 60, now=1.0) == 1
+    assert await backend.estimate("email:user0@example.com", 60, now=1.0) == 0
+
+
+@pytest.mark.asyncio
+async def test_login_throttle_limits_email_and_client():
+    throttle = LoginThrottle(InMemoryThrottleBackend(), email_limit=3, client_limit=5)
+    for _ in range(3):
+        await throttle.record_failure("a@example.com", "10.0.0.1")
+    with pytest.raises(HTTPException) as exc:
+        await throttle.check("A@example.com", "10.0.0.2")
+    assert exc.value.status_code == 429
+    assert "Retry-After" in exc.value.headers
+
+    for i in range(2):
+        await throttle.record_failure(f"other{i}@example.com", "10.0.0.1")
+    with pytest.raises(HTTPException):
+        await throttle.check("new@example.com", "10.0.0.1")
+    await throttle.check("new@example.com", "10.0.0.3")
+
+
+@pytest.mark.asyncio
+async def test_login_endpoint_returns_429_before_bcrypt(override_dependencies):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.post("/auth/register", json={"email": "alvo@example.com", "password": "senha123"})
+        for _ in range(5):
+            response = await ac.post("/auth/login", json={"email": "alvo@example.com", "password": "errada"})
+            assert response.status_code == 401
+
+        with patch("app.services.user_service.verify_password") as verify:
+            response = await ac.post("/auth/login", json={"email": "alvo@example.com", "password": "senha123"})
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+        verify.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_spoofed_forwarded_for_does_not_rotate_the_client_key(override_dependencies):
+    # Sem proxies confiáveis (padrão): o X-Forwarded-For do cliente é ignorado
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for i in range(20):
+            response = await ac.post(
+                "/auth/login",
+                json={"email": f"vitima{i}@example.com", "password": "chute"},
+                headers={"X-Forwarded-For": f"198.51.100.{i}"},
+            )
+            assert response.status_code == 401
+        response = await ac.post(
+            "/auth/login",
+            json={"email": "outra@example.com", "password": "chute"},
+            headers={"X-Forwarded-For": "198.51.100.200"},
+        )
+        assert response.status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_successful_logins_do_not_count(override_dependencies):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.post("/auth/register", json={"email": "ok@example.com", "password": "senha123"})
+        for _ in range(10):
+            response = await ac.post("/auth/login", json={"email": "ok@example.com", "password": "senha123"})
+            assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_concurrent_burst_is_limited_by_reservations():
+    service = UserService(None, throttle=LoginThrottle(InMemoryThrottleBackend(), email_limit=5))
+    checked = 0
+
+    async def wrong_password(login_data):
+        nonlocal checked
+        checked += 1
+        await asyncio.sleep(0.01)  # consulta + BCrypt: a rajada inteira chega antes da 1ª falha
+        raise HTTPException(status_code=401, detail="Credenciais inválidas")
+
+    with patch.object(service, "_authenticate", wrong_password):
+        results = await asyncio.gather(*(
+            service.authenticate_user(UserLogin(email="rajada@example.com", password=f"chute{i}"))
+            for i in range(20)
+        ), return_exceptions=True)
+    assert sorted(exc.status_code for exc in results) == [401] * 5 + [429] * 15
+    assert checked == 5
+
+
+@pytest.mark.asyncio
+async def test_release_returns_the_reserved_attempt():
+    backend = InMemoryThrottleBackend()
+    await backend.hit("k", 60, now=30.0)
+    await backend.hit("k", 60, now=30.0)
+    await backend.release("k", 60, now=40.0)
+    assert await backend.estimate("k", 60, now=40.0) == 1
+    # A reserva feita na janela anterior sai da contagem anterior
+    await backend.release("k", 60, now=70.0)
+    assert await backend.estimate("k", 60, now=70.0) == 0
+    await backend.release("k", 60, now=70.0)
+    assert await backend.estimate("k", 60, now=70.0) == 0
+
+
+def _request(peer: str, forwarded: str = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+
+def test_client_address_uses_forwarded_for_only_from_trusted_proxies():
+    proxies = ["10.0.0.0/8"]
+    assert client_address(_request("203.0.113.7"), proxies) == "203.0.113.7"
+    # Cliente direto não escolhe o próprio IP pelo header
+    assert client_address(_request("203.0.113.7", "1.2.3.4"), proxies) == "203.0.113.7"
+    assert client_address(_request("203.0.113.7", "1.2.3.4"), []) == "203.0.113.7"
+    assert client_address(_request("10.1.2.3", "1.2.3.4, 198.51.100.9, 10.9.9.9"), proxies) == "198.51.100.9"
+    # Proxy sem X-Forwarded-For: sem chave por cliente (não agrupa todos no IP do proxy)
+    assert client_address(_request("10.1.2.3"), proxies) is None
+    assert client_address(_request("10.1.2.3"), []) == "10.1.2.3"
@@ -0,0 +1,186 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core import tracing
+from app.core.security import create_access_token, decode_access_token, verify_password
+from app.core.tracing import (
+    Tracer, TracingMiddleware, format_traceparent, parse_traceparent, start_span,
+    trace_sql,
+)
+from app.main import app
+from app.services.write_queue import VehicleWriteQueue, create_writer_engine
+from tests.conftest import test_auth_engine, test_engine
+
+trace_sql(test_engine, "vehicles")
+trace_sql(test_auth_engine, "auth")
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+class ListExporter:
+    def __init__(self):
+        self.batches: list[list[dict]] = []
+
+    @property
+    def spans(self) -> list[dict]:
+        return [span for batch in self.batches for span in batch]
+
+    def export(self, spans: list[dict]) -> None:
+        self.batches.append(spans)
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _root(tracer: Tracer):
+    span = tracer.start_trace("teste", None)
+    return span, tracing._current_span.set(span)
+
+
+def test_traceparent_parsing():
+    parsed = parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01")
+    assert parsed == (TRACE_ID, PARENT_ID, True)
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00").sampled is False
+    assert format_traceparent(TRACE_ID, PARENT_ID) == f"00-{TRACE_ID}-{PARENT_ID}-01"
+    for invalid in (None, "", "lixo", f"ff-{TRACE_ID}-{PARENT_ID}-01",
+                    f"00-{'0' * 32}-{PARENT_ID}-01", f"00-{TRACE_ID}-{PARENT_ID}-01-extra",
+                    f"00-{TRACE_ID[:-1]}x-{PARENT_ID}-01"):
+        assert parse_traceparent(invalid) is None
+
+
+@pytest.mark.asyncio
+async def test_request_spans_continue_the_incoming_trace(override_dependencies):
+    exporter = ListExporter()
+    tracer = Tracer(exporter, sample_rate=0.0)
+    traced = TracingMiddleware(app, tracer)
+    header = {"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+
+    async with AsyncClient(transport=ASGITransport(app=traced), base_url="http://test") as ac:
+        user = {"email": "trace@example.com", "password": "senha123"}
+        await ac.post("/auth/register", json=user)
+        token = (await ac.post("/auth/login", json=user)).json()["access_token"]
+        await tracer.flush()
+        # Sem traceparent e com amostragem desligada: nenhum span
+        assert exporter.spans == []
+
+        me = await ac.get("/auth/me", headers={**header, "Authorization": f"Bearer {token}"})
+        assert me.status_code == 200
+        created = await ac.post("/api/v1/vehicles/", headers=header, json={
+            "marca": "Honda", "modelo": "Fit", "ano": 2018, "cor": "Cinza", "preco": 61000.0
+        })
+        assert created.status_code == 201
+        # Trace recebido como não amostrado segue sem spans
+        await ac.get("/auth/me", headers={
+            "traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00", "Authorization": f"Bearer {token}"
+        })
+    await tracer.flush()
+
+    spans = exporter.spans
+    assert {span["trace_id"] for span in spans} == {TRACE_ID}
+    roots = [span for span in spans if span["kind"] == "server"]
+    assert [root["name"] for root in roots] == ["HTTP GET /auth/me", "HTTP POST /api/v1/vehicles/"]
+    assert all(root["parent_span_id"] == PARENT_ID for root in roots)
+    assert roots[1]["attributes"]["http.status_code"] == 201
+
+    me_root, vehicle_root = (root["span_id"] for root in roots)
+    children = {}
+    for span in spans:
+        children.setdefault(span["parent_span_id"], []).append(span)
+    me_children = children[me_root]
+    assert "jwt.decode" in [span["name"] for span in me_children]
+    auth_sql = [span for span in me_children if span["name"] == "SQL"]
+    assert auth_sql and auth_sql[0]["attributes"]["db.name"] == "auth"
+    assert "?" in auth_sql[0]["attributes"]["db.statement"]
+    vehicle_sql = [span for span in children[vehicle_root] if span["name"] == "SQL"]
+    assert {span["attributes"]["db.name"] for span in vehicle_sql} == {"vehicles"}
+    assert any(span["attributes"]["db.statement"].startswith("INSERT") for span in vehicle_sql)
+
+
+@pytest.mark.asyncio
+async def test_auth_work_spans():
+    exporter = ListExporter()
+    tracer = Tracer(exporter, sample_rate=1.0)
+
+    root, token = _root(tracer)
+    try:
+        assert decode_access_token(create_access_token({"sub": "1"}))["sub"] == "1"
+        assert decode_access_token("invalido") is None
+        with pytest.raises(ValueError):
+            verify_password("senha", "nao-e-um-hash")
+    finally:
+        tracing._current_span.reset(token)
+        root.finish()
+    await tracer.flush()
+
+    by_name = {}
+    for span in exporter.spans:
+        by_name.setdefault(span["name"], []).append(span)
+    assert len(by_name["jwt.encode"]) == 1
+    assert [span["attributes"].get("jwt.valid") for span in by_name["jwt.decode"]] == [None, False]
+    assert by_name["bcrypt.verify"][0]["status"] == "error"
+    assert all(span["parent_span_id"] == root.span_id for name, spans in by_name.items()
+               if name != "teste" for span in spans)
+
+
+@pytest.mark.asyncio
+async def test_spans_are_exported_in_background_batches():
+    exporter = ListExporter()
+    tracer = Tracer(exporter, sample_rate=1.0, batch_size=2, export_interval=60, max_queue_size=5)
+    tracer.start()
+    root, token = _root(tracer)
+    try:
+        for number in range(3):
+            with start_span(f"passo {number}"):
+                pass
+        # O lote cheio acorda a exportação antes do intervalo
+        for _ in range(50):
+            if exporter.batches:
+                break
+            await asyncio.sleep(0.01)
+        assert exporter.batches and len(exporter.batches[0]) == 2
+        for number in range(10):
+            with start_span(f"excedente {number}"):
+                pass
+    finally:
+        tracing._current_span.reset(token)
+        root.finish()
+    await tracer.stop()
+    assert all(len(batch) <= 2 for batch in exporter.batches)
+    assert tracer.dropped > 0
+    assert tracer.exported == len(exporter.spans) == 14 - tracer.dropped
+
+
+@pytest.mark.asyncio
+async def test_writer_queue_sql_joins_the_callers_trace(tmp_path):
+    exporter = ListExporter()
+    tracer = Tracer(exporter, sample_rate=1.0)
+    writer = create_writer_engine(f"sqlite+aiosqlite:///{tmp_path}/writer.db")
+    queue = VehicleWriteQueue(async_sessionmaker(writer, class_=AsyncSession, expire_on_commit=False))
+
+    async def operation(session):
+        return (await session.execute(text("SELECT 1"))).scalar()
+
+    try:
+        assert await queue.run(operation) == 1  # fora de um trace
+        root, token = _root(tracer)
+        try:
+            # O escritor roda numa tarefa própria, iniciada fora desta requisição
+            assert await queue.run(operation) == 1
+        finally:
+            tracing._current_span.reset(token)
+            root.finish()
+        assert await queue.run(operation) == 1  # o span não vaza para a escrita seguinte
+    finally:
+        await queue.close()
+        await writer.dispose()
+    await tracer.flush()
+
+    sql = [span for span in exporter.spans if span["name"] == "SQL"]
+    assert [span["attributes"]["db.name"] for span in sql] == ["vehicles_writer"]
+    assert sql[0]["parent_span_id"] == root.span_id
+    assert sql[0]["trace_id"] == root.trace_id
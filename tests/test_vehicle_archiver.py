@@ -0,0 +1,139 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.future import select
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.models.vehicle import Vehicle, VehicleArchive, VehicleStatus
+from app.schemas.schemas import VehicleCreate, VehicleUpdate
+from app.services.vehicle_archiver import VehicleArchiver
+from app.services.vehicle_service import VehicleService
+from app.services.write_queue import VehicleWriteQueue
+
+
+async def _seed(session_factory, prices_and_status):
+    ids = []
+    async with session_factory() as session:
+        svc = VehicleService(session)
+        for preco, status in prices_and_status:
+            v = await svc.create_vehicle(VehicleCreate(marca="A", modelo="M", ano=2020, cor="X", preco=preco))
+            if status == VehicleStatus.VENDIDO:
+                await svc.update_vehicle(v.id, VehicleUpdate(status=status))
+            ids.append(v.id)
+    return ids
+
+
+@pytest.mark.asyncio
+async def test_archiver_moves_sold_in_batches(shared_session_factory):
+    await _seed(shared_session_factory, [
+        (50000, VehicleStatus.VENDIDO),
+        (10000, VehicleStatus.DISPONIVEL),
+        (30000, VehicleStatus.VENDIDO),
+        (20000, VehicleStatus.VENDIDO),
+    ])
+    archiver = VehicleArchiver(shared_session_factory, batch_size=2)
+
+    assert await archiver.archive_batch() == 2
+    assert await archiver.archive_all() == 1
+
+    async with shared_session_factory() as session:
+        hot = (await session.scalars(select(Vehicle))).all()
+        cold = (await session.scalars(select(VehicleArchive))).all()
+    assert [v.preco for v in hot] == [10000]
+    assert sorted(v.preco for v in cold) == [20000, 30000, 50000]
+
+
+@pytest.mark.asyncio
+async def test_archiver_writes_through_the_writer_queue(shared_session_factory):
+    await _seed(shared_session_factory, [(v, VehicleStatus.VENDIDO) for v in (1000, 2000, 3000)])
+    queue = VehicleWriteQueue(shared_session_factory)
+
+    def no_own_session():
+        raise AssertionError("com o escritor único o arquivador não abre sessão própria")
+
+    archiver = VehicleArchiver(no_own_session, batch_size=2, writer=queue)
+    try:
+        assert await archiver.archive_all() == 3
+    finally:
+        await queue.close()
+    # Um lote cheio e o restante, cada um uma escrita da fila
+    assert queue.writes == 2
+
+    async with shared_session_factory() as session:
+        assert (await session.scalars(select(Vehicle))).all() == []
+        assert len((await session.scalars(select(VehicleArchive))).all()) == 3
+
+
+@pytest.mark.asyncio
+async def test_service_reads_span_hot_and_archive(shared_session_factory):
+    ids = await _seed(shared_session_factory, [
+        (50000, VehicleStatus.VENDIDO),
+        (10000, VehicleStatus.DISPONIVEL),
+        (30000, VehicleStatus.VENDIDO),
+    ])
+    await VehicleArchiver(shared_session_factory).archive_all()
+
+    async with shared_session_factory() as session:
+        svc = VehicleService(session)
+        assert [v.preco for v in await svc.get_vehicles()] == [10000, 30000, 50000]
+        assert [v.preco for v in await svc.get_vehicles(VehicleStatus.VENDIDO)] == [30000, 50000]
+        assert [v.preco for v in await svc.get_vehicles(VehicleStatus.DISPONIVEL)] == [10000]
+        archived = await svc.get_vehicle(ids[0])
+        assert archived.preco == 50000
+        assert archived.status == VehicleStatus.VENDIDO
+
+
+@pytest.mark.asyncio
+async def test_restoring_archived_vehicle_keeps_id(shared_session_factory):
+    ids = await _seed(shared_session_factory, [(50000, VehicleStatus.VENDIDO)])
+    await VehicleArchiver(shared_session_factory).archive_all()
+
+    async with shared_session_factory() as session:
+        svc = VehicleService(session)
+        await svc.get_vehicles()  # carrega a versão somente leitura na sessão
+        restored = await svc.update_vehicle(ids[0], VehicleUpdate(status=VehicleStatus.DISPONIVEL, preco=45000))
+        assert isinstance(restored, Vehicle)
+        assert restored.id == ids[0]
+        assert restored.preco == 45000
+        assert (await session.scalars(select(VehicleArchive))).all() == []
+
+        # ids arquivados nunca são reutilizados por novos cadastros
+        await svc.update_vehicle(ids[0], VehicleUpdate(status=VehicleStatus.VENDIDO))
+        await VehicleArchiver(shared_session_factory).archive_all()
+        new = await svc.create_vehicle(VehicleCreate(marca="B", modelo="N", ano=2021, cor="Y", preco=1000))
+        assert new.id != ids[0]
+
+
+@pytest.mark.asyncio
+async def test_available_listing_uses_partial_index(shared_session_factory):
+    async with shared_session_factory() as session:
+        plan = (await session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM vehicles "
+            "WHERE status = 'DISPONIVEL' ORDER BY preco"
+        ))).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_vehicles_disponivel_preco" in details
+    assert "TEMP B-TREE" not in details
+
+
+@pytest.mark.asyncio
+async def test_update_retries_when_archiver_moves_row(shared_session_factory):
+    ids = await _seed(shared_session_factory, [(50000, VehicleStatus.VENDIDO)])
+
+    async with shared_session_factory() as session:
+        svc = VehicleService(session)
+        apply_update = svc._apply_update
+        attempts = []
+
+        async def racing_update(vehicle_id, update_data):
+            # Primeira tentativa: o arquivador move a linha antes do UPDATE
+            attempts.append(vehicle_id)
+            if len(attempts) == 1:
+                await VehicleArchiver(shared_session_factory).archive_all()
+                raise StaleDataError("linha movida")
+            return await apply_update(vehicle_id, update_data)
+
+        svc._apply_update = racing_update
+        updated = await svc.update_vehicle(ids[0], VehicleUpdate(preco=48000))
+        assert len(attempts) == 2
+        assert isinstance(updated, VehicleArchive)
+        assert updated.preco == 48000
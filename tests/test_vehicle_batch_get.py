@@ -0,0 +1,71 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.main import app
+from app.models.vehicle import Vehicle, VehicleArchive, VehicleStatus
+from app.schemas.schemas import VehicleCreate, VehicleUpdate
+from app.services.vehicle_archiver import VehicleArchiver
+from app.services.vehicle_service import VehicleService
+from tests.conftest import shared_engine, test_engine
+
+URL = "/api/v1/vehicles"
+
+
+def _vehicle(preco: float) -> dict:
+    return {"marca": "Renault", "modelo": "Kwid", "ano": 2021, "cor": "Vermelho", "preco": preco}
+
+
+@pytest.mark.asyncio
+async def test_batch_get_keeps_request_order_and_marks_missing(override_dependencies):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        ids = [(await ac.post(f"{URL}/", json=_vehicle(1000.0 * (i + 1)))).json()["id"] for i in range(3)]
+        
+        statements = []
+        
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        
+        event.listen(test_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            requested = [ids[2], 999, ids[0], ids[2]]
+            response = await ac.post(f"{URL}/batch-get", json={"ids": requested})
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", record)
+        
+        assert response.status_code == 200
+        body = response.json()
+        assert [r["id"] for r in body["results"]] == requested
+        assert [r["found"] for r in body["results"]] == [True, False, True, True]
+        assert body["results"][1]["vehicle"] is None
+        assert body["results"][0]["vehicle"]["preco"] == 3000.0
+        assert body["results"][2]["vehicle"]["id"] == ids[0]
+        assert (body["found"], body["missing"]) == (3, 1)
+        # Uma consulta para o lote inteiro
+        assert len(statements) == 1
+        assert " IN " in statements[0]
+
+
+@pytest.mark.asyncio
+async def test_batch_get_limits(override_dependencies, monkeypatch):
+    monkeypatch.setattr(settings, "VEHICLE_BATCH_GET_MAX_IDS", 3)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        assert (await ac.post(f"{URL}/batch-get", json={"ids": [1, 2, 3, 4]})).status_code == 413
+        assert (await ac.post(f"{URL}/batch-get", json={"ids": []})).status_code == 422
+        assert (await ac.post(f"{URL}/batch-get", json={"ids": [1, 2, 3]})).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_batch_get_includes_archived(shared_session_factory):
+    async with shared_session_factory() as session:
+        svc = VehicleService(session)
+        sold = await svc.create_vehicle(VehicleCreate(**_vehicle(500.0)))
+        available = await svc.create_vehicle(VehicleCreate(**_vehicle(700.0)))
+        await svc.update_vehicle(sold.id, VehicleUpdate(status=VehicleStatus.VENDIDO))
+    await VehicleArchiver(shared_session_factory).archive_all()
+    
+    async with shared_session_factory() as session:
+        found = await VehicleService(session).get_vehicles_by_ids([sold.id, available.id, 12345])
+    assert set(found) == {sold.id, available.id}
+    assert found[sold.id].status == VehicleStatus.VENDIDO
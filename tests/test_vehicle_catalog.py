@@ -0,0 +1,159 @@
+from unittest.mock import patch
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.main import _add_missing_columns, app
+from app.models.catalog import Marca, Modelo, marcas, modelos
+from app.models.vehicle import Vehicle
+from app.schemas.schemas import VehicleCreate, VehicleUpdate
+from app.services.vehicle_catalog import migrate_legacy_names, vehicle_catalog
+from app.services.vehicle_service import VehicleService
+from app.services.write_queue import VehicleWriteQueue
+
+URL = "/api/v1/vehicles"
+
+
+def _vehicle(marca: str, modelo: str, preco: float = 50000.0) -> dict:
+    return {"marca": marca, "modelo": modelo, "ano": 2021, "cor": "Prata", "preco": preco}
+
+
+@pytest.mark.asyncio
+async def test_names_are_stored_once_and_referenced_by_id(override_dependencies, db_session):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        first = (await ac.post(f"{URL}/", json=_vehicle("Toyota", "Corolla"))).json()
+        second = (await ac.post(f"{URL}/", json=_vehicle("  toyota ", "COROLLA"))).json()
+        third = (await ac.post(f"{URL}/", json=_vehicle("Honda", "Civic"))).json()
+        # Edição troca a marca pelo id de outra entrada do catálogo
+        edited = await ac.put(f"{URL}/{third['id']}", json={"marca": "TOYOTA"})
+        listing = (await ac.get(f"{URL}/")).json()
+
+    assert second["marca"] == "Toyota" and second["modelo"] == "Corolla"
+    assert edited.json()["marca"] == "Toyota"
+    assert [(v["marca"], v["modelo"]) for v in listing] == [("Toyota", "Corolla")] * 2 + [("Toyota", "Civic")]
+
+    rows = (await db_session.execute(select(Vehicle.marca_id, Vehicle.modelo_id).order_by(Vehicle.id))).all()
+    toyota = marcas.id_for("toyota")
+    assert [marca_id for marca_id, _ in rows] == [toyota] * 3
+    assert rows[0].modelo_id == rows[1].modelo_id == modelos.id_for("Corolla")
+    assert (await db_session.execute(select(Marca.nome).order_by(Marca.id))).scalars().all() == ["Toyota", "Honda"]
+    assert (await db_session.execute(select(Modelo.chave).order_by(Modelo.id))).scalars().all() == ["corolla", "civic"]
+    assert first["id"] != second["id"]
+
+
+@pytest.mark.asyncio
+async def test_catalog_endpoint_is_cached_and_etagged(override_dependencies):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.post(f"{URL}/", json=_vehicle("Fiat", "Uno"))
+        response = await ac.get(f"{URL}/catalog")
+        assert response.status_code == 200
+        assert response.json() == {
+            "marcas": [{"id": marcas.id_for("Fiat"), "nome": "Fiat"}],
+            "modelos": [{"id": modelos.id_for("Uno"), "nome": "Uno"}],
+        }
+        etag = response.headers["etag"]
+        assert "max-age=" in response.headers["cache-control"]
+
+        cached = await ac.get(f"{URL}/catalog", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+
+        # Um nome novo invalida o corpo em cache
+        await ac.post(f"{URL}/", json=_vehicle("Chery", "Tiggo"))
+        changed = await ac.get(f"{URL}/catalog", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert [marca["nome"] for marca in changed.json()["marcas"]] == ["Chery", "Fiat"]
+
+
+@pytest.mark.asyncio
+async def test_new_names_are_registered_through_the_writer_queue(shared_session_factory):
+    queue = VehicleWriteQueue(shared_session_factory)
+    register = vehicle_catalog.register
+    sessions = []
+
+    async def spy(session, marca_names=(), modelo_names=()):
+        if any(marcas.id_for(nome) is None for nome in marca_names) or \
+                any(modelos.id_for(nome) is None for nome in modelo_names):
+            sessions.append(session)
+        await register(session, marca_names, modelo_names)
+
+    try:
+        async with shared_session_factory() as request_session:
+            service = VehicleService(request_session, writer=queue)
+            with patch.object(vehicle_catalog, "register", side_effect=spy):
+                created = await service.create_vehicle(VehicleCreate(**_vehicle("Jeep", "Renegade")))
+                assert queue.writes == 2  # cadastro dos nomes + INSERT do veículo
+                await service.create_vehicle(VehicleCreate(**_vehicle("jeep", "RENEGADE")))
+                assert queue.writes == 3  # nomes conhecidos: só o veículo
+                edited = await service.update_vehicle(created.id, VehicleUpdate(marca="Ram"))
+                assert queue.writes == 5
+    finally:
+        await queue.close()
+
+    assert edited.marca == "Ram"
+    # Os cadastros de nomes novos rodaram em sessões do escritor, nunca na da requisição
+    assert len(sessions) == 2 and request_session not in sessions
+    async with shared_session_factory() as session:
+        assert (await session.execute(select(Marca.nome).order_by(Marca.id))).scalars().all() == ["Jeep", "Ram"]
+
+
+@pytest.mark.asyncio
+async def test_ids_registered_by_another_replica_are_loaded_on_read(db_session):
+    service = VehicleService(db_session)
+    created = await service.create_vehicle(VehicleCreate(**_vehicle("Renault", "Kwid")))
+    # Réplica nova: dicionários vazios, mesmo banco
+    vehicle_catalog.clear()
+    db_session.expunge_all()
+
+    vehicle = await service.get_vehicle(created.id)
+    assert (vehicle.marca, vehicle.modelo) == ("Renault", "Kwid")
+    assert [v.marca for v in await service.get_vehicles()] == ["Renault"]
+
+
+@pytest.mark.asyncio
+async def test_legacy_text_columns_are_migrated(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/legacy.db")
+    async with engine.begin() as conn:
+        for table in ("vehicles", "vehicles_archive"):
+            await conn.execute(text(
+                f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, marca VARCHAR NOT NULL, "
+                "modelo VARCHAR NOT NULL, ano INTEGER NOT NULL, cor VARCHAR NOT NULL, "
+                "preco FLOAT NOT NULL, status VARCHAR(10), data_cadastro DATETIME)"
+            ))
+            await conn.execute(text(f"CREATE INDEX ix_{table}_marca ON {table} (marca)"))
+        await conn.execute(text(
+            "INSERT INTO vehicles (id, marca, modelo, ano, cor, preco, status) VALUES "
+            "(1, 'Fiat', 'Uno', 2010, 'Prata', 10000, 'DISPONIVEL'), "
+            "(2, 'fiat', 'Palio', 2011, 'Preto', 12000, 'DISPONIVEL')"
+        ))
+        await conn.execute(text(
+            "INSERT INTO vehicles_archive (id, marca, modelo, ano, cor, preco, status) "
+            "VALUES (3, 'Ford', 'Ka', 2012, 'Azul', 15000, 'VENDIDO')"
+        ))
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with Session() as session:
+            assert await migrate_legacy_names(engine, session) is True
+            assert await migrate_legacy_names(engine, session) is False
+        vehicle_catalog.clear()
+
+        async with engine.connect() as conn:
+            columns = await conn.run_sync(
+                lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns("vehicles")}
+            )
+        assert {"marca_id", "modelo_id"} <= columns
+        assert not {"marca", "modelo"} & columns
+
+        async with Session() as session:
+            found = await VehicleService(session).get_vehicles_by_ids([1, 2, 3])
+        assert [(found[i].marca, found[i].modelo) for i in (1, 2, 3)] == [
+            ("Fiat", "Uno"), ("Fiat", "Palio"), ("Ford", "Ka")
+        ]
+    finally:
+        await engine.dispose()
@@ -0,0 +1,193 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.core.invalidation import InvalidationEvent
+from app.main import app
+from app.models.catalog import catalog_key, marcas, modelos
+from app.models.vehicle import Vehicle, VehicleStatus
+from app.schemas.schemas import VehicleCreate, VehicleUpdate
+from app.services.vehicle_events import (
+    CREATED, DELETED, UPDATED, EventFilter, VehicleEventHub, vehicle_event_hub,
+)
+from app.services.vehicle_service import VehicleService
+
+URL = "/api/v1/vehicles"
+
+
+def _vehicle(vehicle_id: int, marca: str = "Fiat", preco: float = 50000.0,
+             status: VehicleStatus = VehicleStatus.DISPONIVEL) -> Vehicle:
+    # Catálogo em memória apenas: estes testes não usam banco
+    marca_id = {"Fiat": 1, "Honda": 2}[marca]
+    marcas.add(marca_id, catalog_key(marca), marca)
+    modelos.add(1, "argo", "Argo")
+    return Vehicle(
+        id=vehicle_id, marca_id=marca_id, modelo_id=1, ano=2020, cor="Branco", preco=preco,
+        status=status, data_cadastro=datetime(2024, 1, 1), version=1,
+    )
+
+
+def _parse(frames: list[bytes]) -> list[dict]:
+    """Frames SSE -> [{"id", "event", "data"}] (comentários e retry ignorados)"""
+    parsed = []
+    for frame in frames:
+        fields = dict(
+            line.split(": ", 1) for line in frame.decode().strip().split("\n")
+            if ": " in line and not line.startswith(":")
+        )
+        if "event" in fields:
+            parsed.append(fields)
+    return parsed
+
+
+def _drain(subscriber) -> list[dict]:
+    frames = list(subscriber.buffer)
+    subscriber.buffer.clear()
+    return _parse(frames)
+
+
+def test_filters_apply_to_creations_but_not_to_updates_of_the_brand():
+    hub = VehicleEventHub()
+    everything = hub.subscribe(EventFilter())
+    cheap_fiat = hub.subscribe(EventFilter(VehicleStatus.DISPONIVEL, "fiat", 60000.0))
+    # Mesma normalização do catálogo: espaços e caixa não importam
+    spaced_fiat = hub.subscribe(EventFilter(marca="  FIAT "))
+
+    hub.publish(_vehicle(1), created=True)
+    hub.publish(_vehicle(2, preco=90000.0), created=True)
+    hub.publish(_vehicle(3, marca="Honda"), created=True)
+    # Preço subiu acima do teto: a edição chega para o cliente tirar o veículo da tela
+    hub.publish(_vehicle(1, preco=90000.0))
+    hub.publish(_vehicle(3, marca="Honda", status=VehicleStatus.VENDIDO))
+    hub.publish_deleted(3)
+
+    assert [(e["event"], json.loads(e["data"])["id"]) for e in _drain(everything)] == [
+        (CREATED, 1), (CREATED, 2), (CREATED, 3), (UPDATED, 1), (UPDATED, 3), (DELETED, 3),
+    ]
+    received = _drain(cheap_fiat)
+    assert [(e["event"], json.loads(e["data"])["id"]) for e in received] == [
+        (CREATED, 1), (UPDATED, 1), (DELETED, 3),
+    ]
+    assert json.loads(received[1]["data"])["preco"] == 90000.0
+    assert [(e["event"], json.loads(e["data"])["id"]) for e in _drain(spaced_fiat)] == [
+        (CREATED, 1), (CREATED, 2), (UPDATED, 1), (DELETED, 3),
+    ]
+
+
+def test_last_event_id_replays_missed_events_or_resets():
+    hub = VehicleEventHub(replay_size=3)
+    for vehicle_id in range(1, 4):
+        hub.publish(_vehicle(vehicle_id), created=True)
+
+    resumed = hub.subscribe(EventFilter(), f"{hub.epoch}-1")
+    assert [e["id"] for e in _drain(resumed)] == [f"{hub.epoch}-2", f"{hub.epoch}-3"]
+    up_to_date = hub.subscribe(EventFilter(), f"{hub.epoch}-3")
+    assert _drain(up_to_date) == []
+
+    hub.publish(_vehicle(4), created=True)  # descarta o evento 1 do histórico
+    for last_event_id in (f"{hub.epoch}-0", "outraepoca-3", f"{hub.epoch}-99", "lixo"):
+        stale = hub.subscribe(EventFilter(), last_event_id)
+        assert [e["event"] for e in _drain(stale)] == ["reset"]
+        hub.unsubscribe(stale)
+    assert [e["id"] for e in _drain(resumed)] == [f"{hub.epoch}-4"]
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_dropped_and_idle_stream_sends_keepalive():
+    hub = VehicleEventHub(subscriber_buffer=2, keepalive=0.01, max_subscribers=2)
+    slow = hub.subscribe(EventFilter())
+    idle = hub.subscribe(EventFilter(marca="Honda"))
+    assert hub.full
+
+    for vehicle_id in range(1, 4):
+        hub.publish(_vehicle(vehicle_id), created=True)
+    assert slow.dropped and hub.dropped_subscribers == 1
+    assert len(hub) == 1 and not hub.full
+
+    # O stream de quem caiu entrega o que já estava no buffer e termina
+    frames = [frame async for frame in hub.stream(slow)]
+    assert frames[0] == b"retry: 3000\n\n"
+    assert len(_parse(frames)) == 2
+
+    stream = hub.stream(idle)
+    assert await stream.__anext__() == b"retry: 3000\n\n"
+    assert await stream.__anext__() == b": keepalive\n\n"
+    await stream.aclose()
+    assert len(hub) == 0
+
+
+@pytest.mark.asyncio
+async def test_service_writes_and_bus_events_are_published(shared_session_factory):
+    hub = VehicleEventHub(session_factory=shared_session_factory)
+    subscriber = hub.subscribe(EventFilter())
+    async with shared_session_factory() as session:
+        service = VehicleService(session, events=hub)
+        vehicle = await service.create_vehicle(VehicleCreate(
+            marca="Toyota", modelo="Yaris", ano=2022, cor="Prata", preco=95000.0
+        ))
+        await service.update_vehicle(vehicle.id, VehicleUpdate(preco=93000.0))
+        await service.delete_vehicle(vehicle.id)
+        other = await VehicleService(session).create_vehicle(VehicleCreate(
+            marca="Toyota", modelo="Etios", ano=2019, cor="Preto", preco=55000.0
+        ))
+
+    events = _drain(subscriber)
+    assert [e["event"] for e in events] == [CREATED, UPDATED, DELETED]
+    assert json.loads(events[1]["data"])["preco"] == 93000.0
+
+    # Escrita de outra réplica chega pelo barramento de invalidação
+    await hub.refresh([InvalidationEvent("vehicle", other.id, 1), InvalidationEvent("vehicle", vehicle.id, None)])
+    assert [(e["event"], json.loads(e["data"])["id"]) for e in _drain(subscriber)] == [
+        (CREATED, other.id), (DELETED, vehicle.id),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_events_endpoint_streams_matching_changes(override_dependencies):
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": f"{URL}/events", "raw_path": f"{URL}/events".encode(), "root_path": "",
+        "query_string": b"marca=volkswagen", "headers": [(b"host", b"test")],
+        "server": ("test", 80), "client": ("127.0.0.1", 1234),
+    }
+    disconnect = asyncio.Event()
+    messages = []
+
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    stream = asyncio.create_task(app(scope, receive, send))
+    while len(vehicle_event_hub) == 0:
+        await asyncio.sleep(0.01)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for marca in ("Fiat", "Volkswagen"):
+            created = await ac.post(f"{URL}/", json={
+                "marca": marca, "modelo": "Gol", "ano": 2015, "cor": "Prata", "preco": 30000.0
+            })
+            assert created.status_code == 201
+
+    for _ in range(100):
+        if any(b"event: " in m.get("body", b"") for m in messages):
+            break
+        await asyncio.sleep(0.01)
+    disconnect.set()
+    await asyncio.wait_for(stream, 1)
+
+    start = messages[0]
+    assert start["status"] == 200
+    headers = dict(start["headers"])
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    assert headers[b"cache-control"] == b"no-cache"
+    events = _parse([m["body"] for m in messages[1:] if m.get("body")])
+    assert len(events) == 1
+    assert events[0]["event"] == CREATED
+    assert json.loads(events[0]["data"])["marca"] == "Volkswagen"
+    assert len(vehicle_event_hub) == 0
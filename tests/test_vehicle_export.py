@@ -0,0 +1,104 @@
+import csv
+import gzip
+import io
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import patch
+
+from app.database import get_session_factory
+from app.main import app
+from app.models.vehicle import Vehicle, VehicleArchive, VehicleStatus
+from app.services.vehicle_export import ExportFormat, VehicleExporter, columnar_available
+from app.services.vehicle_catalog import vehicle_catalog
+
+
+async def _seed(session_factory, count: int = 7):
+    async with session_factory() as session:
+        await vehicle_catalog.register(session, ["Fiat", "Ford"], [f"Uno {i}" for i in range(count)] + ["Ka"])
+        session.add_all([
+            Vehicle(marca="Fiat", modelo=f"Uno {i}", ano=2010 + i, cor="Prata", preco=10000.0 + i)
+            for i in range(count)
+        ])
+        session.add(VehicleArchive(
+            id=1000, marca="Ford", modelo="Ka", ano=2015, cor="Preto",
+            preco=25000.0, status=VehicleStatus.VENDIDO,
+        ))
+        await session.commit()
+
+
+@pytest.fixture
+def export_client(shared_session_factory, override_dependencies):
+    app.dependency_overrides[get_session_factory] = lambda: shared_session_factory
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_export_csv_streams_all_rows_in_batches(shared_session_factory, export_client):
+    await _seed(shared_session_factory)
+    
+    # Blocos pequenos: várias partições do cursor
+    with patch("app.services.vehicle_export.settings.VEHICLE_EXPORT_BATCH_SIZE", 3):
+        async with export_client as ac:
+            response = await ac.get("/api/v1/vehicles/export")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="veiculos.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 8
+    assert [row["id"] for row in rows][-1] == "1000"
+    assert rows[-1]["status"] == "VENDIDO"
+
+
+@pytest.mark.asyncio
+async def test_export_gzip_with_status_filter(shared_session_factory, export_client):
+    await _seed(shared_session_factory)
+    
+    async with export_client as ac:
+        response = await ac.get("/api/v1/vehicles/export?gzip=true&status=DISPONIVEL")
+    
+    assert response.headers["content-type"] == "application/gzip"
+    assert 'filename="veiculos.csv.gz"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode())))
+    assert len(rows) == 7
+    assert {row["status"] for row in rows} == {"DISPONIVEL"}
+
+
+@pytest.mark.asyncio
+async def test_export_empty_table_has_header(shared_session_factory):
+    chunks = [chunk async for chunk in VehicleExporter(shared_session_factory).export()]
+    assert b"".join(chunks).decode().strip() == "id,marca,modelo,ano,cor,preco,status,data_cadastro"
+
+
+@pytest.mark.asyncio
+async def test_export_yields_one_chunk_per_batch(shared_session_factory):
+    await _seed(shared_session_factory, count=10)
+    exporter = VehicleExporter(shared_session_factory, batch_size=4)
+    batches = [len(rows) async for rows in exporter.batches()]
+    assert batches == [4, 4, 3]
+
+
+@pytest.mark.skipif(not columnar_available(), reason="pyarrow não instalado")
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fmt", [ExportFormat.PARQUET, ExportFormat.ARROW])
+async def test_export_columnar(shared_session_factory, export_client, fmt):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    await _seed(shared_session_factory)
+    with patch("app.services.vehicle_export.settings.VEHICLE_EXPORT_BATCH_SIZE", 3):
+        async with export_client as ac:
+            response = await ac.get(f"/api/v1/vehicles/export?format={fmt.value}")
+    
+    assert response.status_code == 200
+    buffer = io.BytesIO(response.content)
+    if fmt == ExportFormat.PARQUET:
+        parquet_file = pq.ParquetFile(buffer)
+        assert parquet_file.metadata.num_row_groups == 3
+        table = parquet_file.read()
+    else:
+        table = pa.ipc.open_stream(buffer).read_all()
+    assert table.num_rows == 8
+    assert table.column("status").to_pylist()[-1] == "VENDIDO"
+    assert table.column("preco").to_pylist()[0] == 10000.0
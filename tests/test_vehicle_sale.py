@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base, get_db
+from app.main import app
+from app.models.vehicle import Vehicle, VehicleStatus
+from app.services.vehicle_catalog import vehicle_catalog
+
+VEHICLE = {"marca": "VW", "modelo": "Gol", "ano": 2019, "cor": "Branco", "preco": 35000.0}
+URL = "/api/v1/vehicles"
+
+
+@pytest.mark.asyncio
+async def test_sell_is_one_shot(override_dependencies):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        vehicle_id = (await ac.post(f"{URL}/", json=VEHICLE)).json()["id"]
+        
+        sold = await ac.post(f"{URL}/{vehicle_id}/sell")
+        assert sold.status_code == 200
+        assert sold.json()["status"] == "VENDIDO"
+        assert sold.headers["etag"] == f'"{vehicle_id}-2"'
+        
+        again = await ac.post(f"{URL}/{vehicle_id}/sell")
+        assert again.status_code == 409
+        assert again.json()["detail"] == "Veículo já vendido"
+        assert (await ac.post(f"{URL}/{vehicle_id}/reserve")).status_code == 409
+        
+        assert (await ac.post(f"{URL}/999/sell")).status_code == 404
+        assert (await ac.post(f"{URL}/999/reserve")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_reservation_gates_the_sale(override_dependencies, db_session):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        vehicle_id = (await ac.post(f"{URL}/", json=VEHICLE)).json()["id"]
+        
+        reserved = await ac.post(f"{URL}/{vehicle_id}/reserve", params={"ttl_seconds": 60})
+        assert reserved.status_code == 200
+        reservation = reserved.json()
+        assert reservation["status"] == "DISPONIVEL"
+        assert len(reservation["reserva_id"]) == 32
+        
+        assert (await ac.post(f"{URL}/{vehicle_id}/reserve")).status_code == 409
+        blocked = await ac.post(f"{URL}/{vehicle_id}/sell")
+        assert blocked.status_code == 409
+        assert blocked.json()["detail"] == "Veículo reservado por outro comprador"
+        assert (await ac.post(f"{URL}/{vehicle_id}/sell", params={"reserva_id": "outra"})).status_code == 409
+        
+        sold = await ac.post(f"{URL}/{vehicle_id}/sell", params={"reserva_id": reservation["reserva_id"]})
+        assert sold.status_code == 200
+        assert sold.json()["status"] == "VENDIDO"
+        
+        # Reserva expirada não segura mais o veículo
+        other_id = (await ac.post(f"{URL}/", json=VEHICLE)).json()["id"]
+        assert (await ac.post(f"{URL}/{other_id}/reserve")).status_code == 200
+        await db_session.execute(
+            update(Vehicle)
+            .where(Vehicle.id == other_id)
+            .values(reservado_ate=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await db_session.commit()
+        assert (await ac.post(f"{URL}/{other_id}/sell")).status_code == 200
+        
+        assert (await ac.post(f"{URL}/{other_id}/reserve", params={"ttl_seconds": 0})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_put_sold_status_respects_the_reservation(override_dependencies):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        vehicle_id = (await ac.post(f"{URL}/", json=VEHICLE)).json()["id"]
+        assert (await ac.post(f"{URL}/{vehicle_id}/reserve", params={"ttl_seconds": 60})).status_code == 200
+        
+        # Sem If-Match e com If-Match atual: a reserva segura o veículo do mesmo jeito
+        blocked = await ac.put(f"{URL}/{vehicle_id}", json={"status": "VENDIDO"})
+        assert blocked.status_code == 409
+        assert blocked.json()["detail"] == "Veículo reservado por outro comprador"
+        etag = (await ac.get(f"{URL}/{vehicle_id}")).headers["etag"]
+        blocked = await ac.put(f"{URL}/{vehicle_id}", json={"status": "VENDIDO"}, headers={"If-Match": etag})
+        assert blocked.status_code == 409
+        
+        # Outros campos continuam editáveis durante a reserva
+        edited = await ac.put(f"{URL}/{vehicle_id}", json={"preco": 34000.0})
+        assert edited.status_code == 200
+        assert edited.json()["status"] == "DISPONIVEL"
+        
+        # Sem reserva, o PUT vende e limpa a reserva
+        free_id = (await ac.post(f"{URL}/", json=VEHICLE)).json()["id"]
+        sold = await ac.put(f"{URL}/{free_id}", json={"status": "VENDIDO", "preco": 36000.0})
+        assert sold.status_code == 200
+        assert sold.json()["status"] == "VENDIDO"
+        assert sold.json()["preco"] == 36000.0
+        assert (await ac.post(f"{URL}/{free_id}/reserve")).status_code == 409
+        
+        assert (await ac.put(f"{URL}/999", json={"status": "VENDIDO"})).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_hundreds_of_concurrent_buyers_have_one_winner(tmp_path):
+    # Banco em arquivo com pool real: cada requisição tem a sua conexão
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/sale.db")
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with Session() as session:
+        await vehicle_catalog.register(session, [VEHICLE["marca"]], [VEHICLE["modelo"]])
+        session.add(Vehicle(**VEHICLE))
+        await session.commit()
+    
+    async def override_get_db():
+        async with Session() as session:
+            yield session
+    
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            responses = await asyncio.gather(*(ac.post(f"{URL}/1/sell") for _ in range(300)))
+    finally:
+        app.dependency_overrides.clear()
+    
+    codes = [response.status_code for response in responses]
+    assert codes.count(200) == 1
+    assert codes.count(409) == 299
+    
+    async with Session() as session:
+        vehicle = await session.get(Vehicle, 1)
+        assert vehicle.status == VehicleStatus.VENDIDO
+        # Uma única escrita efetiva: nenhuma atualização perdida
+        assert vehicle.version == 2
+    await engine.dispose()
@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app
+from app.models.catalog import marcas, modelos
+from app.models.vehicle import VehicleStatus
+from app.schemas.schemas import VehicleCreate
+from app.services.vehicle_catalog import vehicle_catalog
+from app.services.vehicle_service import VehicleService
+from app.services.write_batcher import VehicleWriteBatcher, get_vehicle_write_batcher
+
+
+@pytest_asyncio.fixture
+async def batcher(shared_session_factory):
+    async with shared_session_factory() as session:
+        await vehicle_catalog.register(session, ["Fiat"], ["Uno"])
+    batcher = VehicleWriteBatcher(shared_session_factory, window_ms=5, max_batch_size=10)
+    yield batcher
+    await batcher.close()
+
+
+def _vehicle(preco: float) -> dict:
+    """Colunas de um cadastro, com marca e modelo já codificados pelo catálogo"""
+    return {"marca_id": marcas.require("Fiat"), "modelo_id": modelos.require("Uno"),
+            "ano": 2020, "cor": "Branco", "preco": preco}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_creates_share_one_transaction(batcher):
+    with patch.object(batcher, "_execute", wraps=batcher._execute) as execute:
+        vehicles = await asyncio.gather(*(batcher.create(_vehicle(1000 + i)) for i in range(8)))
+
+    assert execute.call_count == 1
+    assert [v.preco for v in vehicles] == [1000 + i for i in range(8)]
+    assert len({v.id for v in vehicles}) == 8
+    assert all(v.status == VehicleStatus.DISPONIVEL for v in vehicles)
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size_splits_batches(batcher):
+    with patch.object(batcher, "_execute", wraps=batcher._execute) as execute:
+        vehicles = await asyncio.gather(*(batcher.create(_vehicle(1000 + i)) for i in range(25)))
+
+    assert len(vehicles) == 25
+    assert execute.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_updates_are_batched_with_creates(batcher):
+    created = await batcher.create(_vehicle(5000))
+    updated, missing, other = await asyncio.gather(
+        batcher.update(created.id, {"preco": 4500, "status": VehicleStatus.VENDIDO}),
+        batcher.update(999, {"preco": 1}),
+        batcher.create(_vehicle(7000)),
+    )
+    assert updated.preco == 4500
+    assert updated.status == VehicleStatus.VENDIDO
+    assert missing is None
+    assert other.id is not None
+
+
+@pytest.mark.asyncio
+async def test_failing_write_gets_its_own_error(batcher):
+    bad = {**_vehicle(1), "modelo_id": None}
+    results = await asyncio.gather(
+        batcher.create(_vehicle(1000)),
+        batcher.create(bad),
+        batcher.create(_vehicle(2000)),
+        return_exceptions=True,
+    )
+    assert results[0].preco == 1000
+    assert isinstance(results[1], Exception)
+    assert results[2].preco == 2000
+
+
+@pytest.mark.asyncio
+async def test_vehicle_service_uses_batcher(batcher, db_session):
+    svc = VehicleService(db_session, batcher=batcher)
+    vehicle = await svc.create_vehicle(
+        VehicleCreate(marca="Fiat", modelo="Uno", ano=2020, cor="Branco", preco=3000)
+    )
+    assert vehicle.id is not None
+    # escrito pelo batcher, não pela sessão da requisição
+    assert await VehicleService(db_session).get_vehicles() == []
+
+
+@pytest.mark.asyncio
+async def test_create_endpoint_with_batcher(batcher, override_dependencies, db_session):
+    # Os cadastros concorrentes compartilham a conexão única do banco de teste;
+    # a marca nova é cadastrada no catálogo antes deles
+    await vehicle_catalog.register(db_session, ["Ford"], ["Ka"])
+    app.dependency_overrides[get_vehicle_write_batcher] = lambda: batcher
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        responses = await asyncio.gather(*(
+            ac.post("/api/v1/vehicles/", json={
+                "marca": "Ford", "modelo": "Ka", "ano": 2019, "cor": "Azul", "preco": 30000 + i
+            })
+            for i in range(5)
+        ))
+    assert all(r.status_code == 201 for r in responses)
+    assert len({r.json()["id"] for r in responses}) == 5